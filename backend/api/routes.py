@@ -13,9 +13,13 @@ from fastapi import APIRouter, UploadFile, File, HTTPException
 from fastapi.responses import FileResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from backend.api.schemas import ProcessRequest, ProcessResponse
-from backend.core.processor import DocumentProcessor
+from backend.core.processor import DocumentProcessor, process_document_job
+from backend.core.executor import run_blocking
+from backend.core.batch_queue import batch_queue
+from backend.core.cache import get_result_cache
 from backend.core.config import settings
 from backend.core.preview_converter import DocxPreviewConverter
+from backend.core.profiler import PROFILE_FORMATS, profile_paths
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -78,12 +82,16 @@ async def upload_document(file: UploadFile = File(...)):
 @router.post("/process", response_model=ProcessResponse)
 async def process_document(request: ProcessRequest):
     try:
-        result = processor.process(
+        result = await run_blocking(
+            process_document_job,
             request.document_id,
             request.preset,
             request.preset_config,
             strict=request.strict,
             verbose=request.verbose,
+            metrics=request.metrics,
+            profile=request.profile,
+            fix_summary=request.fix_summary,
         )
         return result
     except FileNotFoundError:
@@ -154,6 +162,30 @@ async def download_document(document_id: str):
     )
 
 
+@router.get("/profile/{document_id}")
+async def download_profile(document_id: str, format: str = "collapsed"):
+    """
+    Download the profile of a job run with profile=true.
+    format: 'collapsed' (flamegraph collapsed stacks) or 'pstats'
+    """
+    import re
+
+    if not re.match(r"^[a-zA-Z0-9_.-]+$", document_id) or ".." in document_id:
+        raise HTTPException(400, "Invalid document ID format")
+    if format not in PROFILE_FORMATS:
+        raise HTTPException(400, f"Unknown profile format: {format}")
+
+    file_path = profile_paths(document_id)[format]
+    if not file_path.exists():
+        raise HTTPException(404, "Profile not found")
+
+    return FileResponse(
+        path=file_path,
+        filename=file_path.name,
+        media_type=PROFILE_FORMATS[format][1],
+    )
+
+
 # ===== History API =====
 
 
@@ -398,6 +430,7 @@ async def delete_rule(rule_id: str):
 class RuleTestRequest(BaseModel):
     markdown: str
     config: dict  # YAML parsed content
+    profile: bool = False  # 需要 settings.RULE_TEST_PROFILING
 
 
 @router.post("/rules/test")
@@ -405,7 +438,12 @@ async def test_rule(request: RuleTestRequest):
     """
     Test rules on markdown content.
     Returns: HTML preview of the processed document.
+    With profile=true the profile id is returned in the X-Profile-Id header
+    (download via GET /profile/{id}).
     """
+    if request.profile and not settings.RULE_TEST_PROFILING:
+        raise HTTPException(403, "Profiling is disabled for rule tests")
+
     # 1. Save markdown to temp file
     temp_id = f"test_{int(time.time())}_{uuid.uuid4().hex[:8]}.md"
     temp_path = settings.UPLOAD_DIR / temp_id
@@ -415,7 +453,12 @@ async def test_rule(request: RuleTestRequest):
             f.write(request.markdown)
 
         # 2. Process document with provided config
-        result = processor.process(temp_id, preset_config=request.config)
+        result = await run_blocking(
+            process_document_job,
+            temp_id,
+            preset_config=request.config,
+            profile=request.profile,
+        )
 
         # 3. Convert to HTML for preview
         # Use 'fixed' type to see the result of changes
@@ -425,11 +468,12 @@ async def test_rule(request: RuleTestRequest):
             raise HTTPException(500, "Processing failed to generate output")
 
         converter = DocxPreviewConverter()
-        html_content = converter.convert_to_html(
-            str(fixed_path), fixes=result.get("fixes")
+        html_content = await run_blocking(
+            converter.convert_to_html, str(fixed_path), fixes=result.get("fixes")
         )
 
-        return Response(content=html_content, media_type="text/html")
+        headers = {"X-Profile-Id": temp_id} if request.profile else None
+        return Response(content=html_content, media_type="text/html", headers=headers)
 
     except Exception as e:
         logger.error(f"Test rule error: {traceback.format_exc()}")
@@ -510,6 +554,22 @@ async def create_preset(request: PresetUpdateRequest):
         raise HTTPException(500, f"Error creating preset: {str(e)}")
 
 
+# ===== Result Cache API =====
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Get result cache statistics (hits, misses, size)"""
+    return get_result_cache().get_stats()
+
+
+@router.delete("/cache")
+async def clear_cache():
+    """Clear the result cache"""
+    get_result_cache().clear()
+    return {"success": True}
+
+
 # ===== Preview API =====
 
 
@@ -539,12 +599,13 @@ async def get_document_preview(document_id: str, type: str = "original"):
         # Check if original exists (uploaded)
         file_path = settings.UPLOAD_DIR / document_id
 
-        # If original was markdown, we might want to show the converted docx intermediate
-        # or just the raw markdown? For 'preview' consistency, let's look for converted docx or fallback
-        if document_id.endswith(".md"):
-            converted_path = settings.UPLOAD_DIR / f"{document_id}_converted.docx"
-            if converted_path.exists():
-                file_path = converted_path
+        # If original was markdown/text, show the converted docx intermediate.
+        # Processing keeps it in memory, so it is written here on first request.
+        if document_id.lower().endswith((".md", ".txt")) and file_path.exists():
+            try:
+                file_path = processor.get_converted_path(document_id)
+            except Exception as e:
+                logger.error(f"Failed to convert original for preview: {e}")
 
     if not file_path.exists():
         raise HTTPException(404, "Document file not found")
@@ -583,79 +644,33 @@ class BatchResponse(BaseModel):
     results: List[BatchItemResult]
 
 
-# In-memory batch job storage (use Redis/DB in production)
-batch_jobs = {}
-
-
 @router.post("/batch/start", response_model=BatchResponse)
 async def start_batch_processing(request: BatchRequest):
-    """Start a new batch processing job."""
-    batch_id = f"batch_{int(time.time())}_{uuid.uuid4().hex[:8]}"
-
-    results = []
-    completed = 0
-    failed = 0
-
-    for item in request.items:
-        try:
-            result = processor.process(item.document_id, item.preset)
-            results.append(
-                BatchItemResult(
-                    document_id=item.document_id,
-                    status="completed",
-                    total_fixes=result.get("total_fixes", 0),
-                )
-            )
-            completed += 1
-        except FileNotFoundError:
-            results.append(
-                BatchItemResult(
-                    document_id=item.document_id,
-                    status="error",
-                    error="Document not found",
-                )
-            )
-            failed += 1
-        except Exception as e:
-            results.append(
-                BatchItemResult(
-                    document_id=item.document_id, status="error", error=str(e)
-                )
-            )
-            failed += 1
-
-    batch_result = BatchResponse(
-        batch_id=batch_id,
-        status="completed" if failed == 0 else "partial",
-        total=len(request.items),
-        completed=completed,
-        failed=failed,
-        results=results,
-    )
-
-    # Store for later retrieval
-    batch_jobs[batch_id] = batch_result.model_dump()
-
-    return batch_result
+    """
+    Enqueue a batch processing job and return immediately.
+    Poll GET /batch/{batch_id} or listen for "batch_progress" events on
+    /ws/progress for per-item status.
+    """
+    return batch_queue.submit([item.model_dump() for item in request.items])
 
 
 @router.get("/batch/{batch_id}", response_model=BatchResponse)
 async def get_batch_status(batch_id: str):
     """Get the status of a batch processing job."""
-    if batch_id not in batch_jobs:
+    job = batch_queue.get(batch_id)
+    if job is None:
         raise HTTPException(404, "Batch job not found")
 
-    return batch_jobs[batch_id]
+    return job
 
 
 @router.get("/batch/{batch_id}/download")
 async def download_batch_results(batch_id: str):
     """Download all processed documents from a batch as a zip file."""
-    if batch_id not in batch_jobs:
+    job = batch_queue.get(batch_id)
+    if job is None:
         raise HTTPException(404, "Batch job not found")
 
-    job = batch_jobs[batch_id]
-
     # Create zip file in memory
     zip_buffer = io.BytesIO()
     with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
@@ -9,12 +9,19 @@ class ProcessRequest(BaseModel):
     preset_config: Optional[Dict[str, Any]] = None
     strict: bool = False
     verbose: bool = False
+    metrics: bool = False
+    profile: bool = False
+    fix_summary: bool = False
 
 
 class FixItem(BaseModel):
     id: str
     rule_id: str
     description: str
+    # 受影响的段落/表格，半开区间 [start, stop) 列表
+    paragraph_ranges: Optional[List[List[int]]] = None
+    table_ranges: Optional[List[List[int]]] = None
+    # 旧格式：逐个下标列表
     paragraph_indices: Optional[List[int]] = None
     table_indices: Optional[List[int]] = None
     before: Optional[str] = None
@@ -28,3 +35,5 @@ class ProcessResponse(BaseModel):
     total_fixes: int
     fixes: List[FixItem]
     duration_ms: int
+    metrics: Optional[Dict[str, Any]] = None
+    profile: Optional[Dict[str, str]] = None
@@ -0,0 +1,159 @@
+"""
+Asynchronous batch job queue.
+
+/batch/start enqueues a job and returns its id immediately. Worker tasks on
+the event loop drain the queue, run each job's items on the batch process
+pool and publish per-item progress through a notifier (the WebSocket
+ConnectionManager in backend/main.py).
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+from backend.core.config import settings
+from backend.core.executor import batch_worker_count, run_batch
+from backend.core.processor import process_batch_item
+
+logger = logging.getLogger(__name__)
+
+Notifier = Callable[[dict], Awaitable[None]]
+
+
+class BatchJobQueue:
+    """In-memory batch job queue (use Redis/DB in production)."""
+
+    def __init__(self):
+        self.jobs: Dict[str, dict] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        # Shared by all jobs: only as many items "running" as pool workers
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._notifier: Optional[Notifier] = None
+
+    def set_notifier(self, notifier: Optional[Notifier]):
+        """Set the coroutine called with every progress event."""
+        self._notifier = notifier
+
+    def submit(self, items: List[dict]) -> dict:
+        """
+        Enqueue a batch job. Must be called from the event loop.
+
+        Args:
+            items: list of {"document_id": ..., "preset": ...}
+
+        Returns:
+            The job record (same shape as BatchResponse)
+        """
+        self._ensure_workers()
+
+        batch_id = f"batch_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+        job = {
+            "batch_id": batch_id,
+            "status": "queued",
+            "total": len(items),
+            "completed": 0,
+            "failed": 0,
+            "results": [
+                {
+                    "document_id": item["document_id"],
+                    "status": "queued",
+                    "total_fixes": 0,
+                    "error": None,
+                }
+                for item in items
+            ],
+        }
+        self.jobs[batch_id] = job
+        self._queue.put_nowait((job, [item.get("preset") for item in items]))
+        return job
+
+    def get(self, batch_id: str) -> Optional[dict]:
+        return self.jobs.get(batch_id)
+
+    def queue_depth(self) -> int:
+        """Number of jobs waiting to be picked up by a worker."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def stop(self):
+        """Cancel worker tasks (called on application shutdown)."""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+        self._slots = None
+
+    def _ensure_workers(self):
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(batch_worker_count())
+        for _ in range(max(1, int(settings.BATCH_JOB_CONCURRENCY))):
+            self._workers.append(asyncio.create_task(self._worker()))
+
+    async def _worker(self):
+        while True:
+            job, presets = await self._queue.get()
+            try:
+                await self._run_job(job, presets)
+            except Exception:
+                logger.exception(f"Batch job {job['batch_id']} crashed")
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job: dict, presets: List[Optional[str]]):
+        job["status"] = "running"
+        await self._publish(job, None)
+
+        await asyncio.gather(
+            *(
+                self._run_item(job, item, preset)
+                for item, preset in zip(job["results"], presets)
+            )
+        )
+
+        job["status"] = "completed" if job["failed"] == 0 else "partial"
+        await self._publish(job, None)
+
+    async def _run_item(self, job: dict, item: dict, preset: Optional[str]):
+        async with self._slots:
+            item["status"] = "running"
+            await self._publish(job, item)
+            try:
+                item["total_fixes"] = await run_batch(
+                    process_batch_item, item["document_id"], preset
+                )
+                item["status"] = "completed"
+                job["completed"] += 1
+            except FileNotFoundError:
+                item["status"] = "error"
+                item["error"] = "Document not found"
+                job["failed"] += 1
+            except Exception as e:
+                item["status"] = "error"
+                item["error"] = str(e)
+                job["failed"] += 1
+            await self._publish(job, item)
+
+    async def _publish(self, job: dict, item: Optional[dict]):
+        if self._notifier is None:
+            return
+        event = {
+            "type": "batch_progress",
+            "batch_id": job["batch_id"],
+            "status": job["status"],
+            "total": job["total"],
+            "completed": job["completed"],
+            "failed": job["failed"],
+            "item": dict(item) if item is not None else None,
+        }
+        try:
+            await self._notifier(event)
+        except Exception as e:
+            logger.error(f"Failed to publish batch progress: {e}")
+
+
+# Global batch queue instance
+batch_queue = BatchJobQueue()
@@ -3,9 +3,18 @@ Cache mechanism for rule engine optimization
 """
 
 from functools import lru_cache
-from typing import Dict, Any, Optional
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+import atexit
 import hashlib
 import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from backend.core.config import settings
 
 
 class RuleCache:
@@ -92,3 +101,418 @@ def compute_table_hash(table) -> str:
             cells_text.append(cell.text)
     combined = "|".join(cells_text)
     return hashlib.md5(combined.encode()).hexdigest()[:8]
+
+
+class ResultCache:
+    """
+    Content-addressed cache of document processing results.
+
+    Entries are keyed on the input bytes, the resolved rule plan, the strict
+    flag and the engine version, and stored on disk as
+    ``<cache_dir>/<key>/{fixed.docx,result.json}`` so that every worker
+    process shares them. Once the total size exceeds the byte budget the
+    least recently used entries are evicted.
+
+    The entry count and total size are written to ``<cache_dir>/.stats.json``
+    by put() (through _evict()) and clear(), so get_stats() does not scan the
+    cache directory.
+    """
+
+    FIXED_NAME = "fixed.docx"
+    RESULT_NAME = "result.json"
+    STATS_NAME = ".stats.json"
+
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def make_key(
+        self, input_path: Path, plan, strict: bool, fix_summary: bool = False
+    ) -> str:
+        """Generate cache key from input content, rule plan and options"""
+        content_hash = hashlib.sha256()
+        with open(input_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                content_hash.update(chunk)
+
+        # Canonical form of the resolved rule config (params already merged)
+        config_str = json.dumps(
+            [[rule.id, params] for rule, params in plan],
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+        key_str = "\n".join(
+            [
+                content_hash.hexdigest(),
+                hashlib.sha256(config_str.encode()).hexdigest(),
+                Path(input_path).suffix.lower(),
+                "strict" if strict else "normal",
+                "summary" if fix_summary else "detailed",
+                settings.ENGINE_VERSION,
+            ]
+        )
+        return hashlib.sha256(key_str.encode()).hexdigest()
+
+    def get(self, key: str, output_path: Path) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached result. On a hit the cached document is hard-linked
+        (or copied) to output_path and the stored result dict is returned.
+        """
+        entry = self.cache_dir / key
+        try:
+            with open(entry / self.RESULT_NAME, "r", encoding="utf-8") as f:
+                result = json.load(f)
+            _link_or_copy(entry / self.FIXED_NAME, output_path)
+            os.utime(entry)  # Mark as recently used
+        except (OSError, ValueError):
+            self._record(hit=False)
+            return None
+
+        self._record(hit=True)
+        return result
+
+    def put(self, key: str, fixed_path: Path, result: Dict[str, Any]):
+        """Store a processed document and its result dict"""
+        entry = self.cache_dir / key
+        if entry.exists():
+            return
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_dir = Path(tempfile.mkdtemp(dir=self.cache_dir, prefix=".tmp-"))
+        try:
+            shutil.copyfile(fixed_path, tmp_dir / self.FIXED_NAME)
+            with open(tmp_dir / self.RESULT_NAME, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False)
+            # Atomic publish; fails if another process stored the same key first
+            os.rename(tmp_dir, entry)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+
+        self._evict()
+
+    def clear(self):
+        """Clear all cache"""
+        for _, _, entry in self._scan():
+            shutil.rmtree(entry, ignore_errors=True)
+        self._write_stats(0, 0)
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics (hit/miss counters are per process)"""
+        entries, size = self._read_stats()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": settings.RESULT_CACHE_ENABLED,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": entries,
+                "size_bytes": size,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _read_stats(self) -> Tuple[int, int]:
+        """(entries, size_bytes), scanning only if no stats were written yet"""
+        try:
+            with open(self.cache_dir / self.STATS_NAME, "r", encoding="utf-8") as f:
+                stats = json.load(f)
+            return stats["entries"], stats["size_bytes"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        entries = self._scan()
+        size = sum(size for _, size, _ in entries)
+        self._write_stats(len(entries), size)
+        return len(entries), size
+
+    def _write_stats(self, entries: int, size: int):
+        """Atomically replace the stats file shared by all processes"""
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, prefix=".tmp-")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"entries": entries, "size_bytes": size}, f)
+            os.replace(tmp, self.cache_dir / self.STATS_NAME)
+        except OSError:
+            pass
+
+    def _record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _scan(self):
+        """Return (last_used_ns, size, path) for every entry"""
+        if not self.cache_dir.exists():
+            return []
+        entries = []
+        for entry in self.cache_dir.iterdir():
+            if entry.name.startswith("."):
+                continue
+            try:
+                size = sum(f.stat().st_size for f in entry.iterdir())
+                entries.append((entry.stat().st_mtime_ns, size, entry))
+            except OSError:
+                continue  # Evicted concurrently
+        return entries
+
+    def _evict(self):
+        """Remove least recently used entries until under the byte budget"""
+        entries = sorted(self._scan())
+        total = sum(size for _, size, _ in entries)
+        remaining = len(entries)
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            remaining -= 1
+            with self._lock:
+                self.evictions += 1
+        self._write_stats(remaining, total)
+
+
+def _link_or_copy(src: Path, dst: Path):
+    """Hard-link src to dst, falling back to a copy across filesystems"""
+    dst = Path(dst)
+    dst.unlink(missing_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+# Global result cache instance
+_result_cache = ResultCache(settings.RESULT_CACHE_DIR, settings.RESULT_CACHE_MAX_BYTES)
+
+
+def get_result_cache() -> ResultCache:
+    """Get global result cache instance"""
+    return _result_cache
+
+
+class FormulaCache:
+    """
+    Persistent cache of formula conversions (LaTeX source -> serialized
+    OMML) in an SQLite file shared by all worker processes and kept across
+    restarts.
+
+    Entries are keyed on a hash of the source and the converter version, so
+    a new converter never reads stale output. Failed conversions are stored
+    as NULL. Once the stored bytes exceed the budget the least recently used
+    entries are evicted; the total is kept up to date by triggers, in the
+    same transaction as each insert and delete. Hits only read the database:
+    their last_used updates are buffered with the new entries and written
+    by flush(), so lookups never wait for the write lock.
+
+    The database runs in WAL mode (readers do not block the writer) with a
+    busy timeout; every thread and process opens its own connection. Any
+    database error counts as a miss, so a broken cache never fails a
+    conversion.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS formulas (
+            key TEXT PRIMARY KEY,
+            omml BLOB,
+            size INTEGER NOT NULL,
+            last_used INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS formulas_last_used ON formulas (last_used);
+        CREATE TABLE IF NOT EXISTS totals (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            bytes INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO totals VALUES (0, 0);
+        CREATE TRIGGER IF NOT EXISTS formulas_insert AFTER INSERT ON formulas
+        BEGIN
+            UPDATE totals SET bytes = bytes + NEW.size WHERE id = 0;
+        END;
+        CREATE TRIGGER IF NOT EXISTS formulas_delete AFTER DELETE ON formulas
+        BEGIN
+            UPDATE totals SET bytes = bytes - OLD.size WHERE id = 0;
+        END;
+    """
+    # Approximate bytes of a row besides the OMML
+    _ROW_OVERHEAD = 96
+    # Entries (or hit timestamps) buffered before committing them
+    _WRITE_BATCH = 64
+
+    def __init__(self, path: Path, max_bytes: int, timeout: float = 5.0):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[str, Optional[bytes]]] = []
+        # key -> last hit time, written to last_used by flush()
+        self._touched: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Buffered entries are committed when the process exits normally
+        atexit.register(self.flush)
+
+    @staticmethod
+    def make_key(source: str, version: str) -> str:
+        """Cache key of a formula source for a converter version"""
+        return hashlib.sha256(f"{version}\n{source}".encode()).hexdigest()
+
+    def get(self, key: str) -> Tuple[bool, Optional[bytes]]:
+        """(found, serialized OMML or None for a failed conversion)"""
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT omml FROM formulas WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error:
+            row = None
+        self._record(hit=row is not None)
+        if row is None:
+            return False, None
+        with self._lock:
+            self._touched[key] = time.time_ns()
+            full = len(self._touched) >= self._WRITE_BATCH
+        if full:
+            self.flush()
+        return True, row[0]
+
+    def put(self, key: str, omml: Optional[bytes]):
+        """
+        Store a conversion (None if it failed). Writes are buffered and
+        committed together every ``_WRITE_BATCH`` entries or on flush().
+        """
+        with self._lock:
+            self._pending.append((key, omml))
+            if len(self._pending) < self._WRITE_BATCH:
+                return
+        self.flush()
+
+    def flush(self):
+        """
+        Commit buffered entries and hit timestamps, and evict beyond the
+        byte budget
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+            touched, self._touched = self._touched, {}
+        if not pending and not touched:
+            return
+        now = time.time_ns()
+        rows = [
+            (key, omml, len(key) + len(omml or b"") + self._ROW_OVERHEAD, now)
+            for key, omml in pending
+        ]
+        try:
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO formulas VALUES (?, ?, ?, ?)", rows
+                )
+                conn.executemany(
+                    "UPDATE formulas SET last_used = ? WHERE key = ?",
+                    [(used, key) for key, used in touched.items()],
+                )
+                self._evict(conn)
+        except sqlite3.Error:
+            pass
+
+    def clear(self):
+        """Clear all cache"""
+        with self._lock:
+            self._pending = []
+            self._touched = {}
+        try:
+            with self._connection() as conn:
+                conn.execute("DELETE FROM formulas")
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics (hit/miss counters are per process)"""
+        entries = size = 0
+        try:
+            conn = self._connection()
+            entries = conn.execute("SELECT COUNT(*) FROM formulas").fetchone()[0]
+            size = conn.execute("SELECT bytes FROM totals").fetchone()[0]
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": settings.FORMULA_CACHE_ENABLED,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": entries,
+                "size_bytes": size,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _connection(self) -> sqlite3.Connection:
+        """This thread's connection; connections are not reused after fork"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=self.timeout)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(self._SCHEMA)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Delete least recently used entries until under the byte budget"""
+        total = conn.execute("SELECT bytes FROM totals").fetchone()[0]
+        excess = total - self.max_bytes
+        if excess <= 0:
+            return
+        victims = []
+        rows = conn.execute("SELECT key, size FROM formulas ORDER BY last_used")
+        for key, size in rows:
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        rows.close()
+        conn.executemany("DELETE FROM formulas WHERE key = ?", victims)
+        with self._lock:
+            self.evictions += len(victims)
+
+    def _record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+
+# Global formula cache instance
+_formula_cache = FormulaCache(
+    settings.FORMULA_CACHE_PATH, settings.FORMULA_CACHE_MAX_BYTES
+)
+
+
+def get_formula_cache() -> Optional[FormulaCache]:
+    """Get global formula cache instance (None when disabled)"""
+    if not settings.FORMULA_CACHE_ENABLED:
+        return None
+    return _formula_cache
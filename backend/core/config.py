@@ -20,6 +20,42 @@ class Settings:
     PORT = 8000
     DEBUG = False  # 生产环境应为False，开发时可通过环境变量覆盖
 
+    # Processing - 文档处理在独立的执行器中运行，避免阻塞事件循环
+    PROCESS_EXECUTOR = "thread"  # "thread" 或 "process"
+    PROCESS_MAX_WORKERS = 4
+    BATCH_MAX_WORKERS = None  # 批量处理进程数，None 表示使用 CPU 核心数
+    BATCH_JOB_CONCURRENCY = 1  # 同时执行的批量任务数，其余任务排队
+    # Markdown 转换后端: "ooxml" 直接生成 XML，"docx" 使用 python-docx API
+    MARKDOWN_BACKEND = "ooxml"
+    # Markdown 文件达到该大小时边读边写入 .docx，None 表示关闭
+    MARKDOWN_STREAMING_MIN_BYTES = 32 * 1024 * 1024
+    # 按表格分隔行中 "-" 的数量分配列宽，关闭时各列等宽
+    MARKDOWN_TABLE_WIDTH_HINTS = False
+    LAZY_PACKAGE_LOADING = True  # 只加载规则声明需要的包部件，其余保持为原始 zip 条目
+    # 大文档分区并行 - 正文块数达到阈值时，可分区的规则在多个进程中分段执行
+    PARTITION_MIN_BLOCKS = 5000  # 触发分区的最少正文块 (段落/表格) 数
+    PARTITION_MAX_WORKERS = None  # 分区进程数，None 表示使用 CPU 核心数，1 表示不分区
+    # 流式处理 - 所有规则都支持逐块执行时，边解析 document.xml 边执行规则并写出
+    # document.xml 解压后达到该大小时流式处理，None 表示关闭
+    STREAMING_MIN_BYTES = 64 * 1024 * 1024
+
+    # Formula conversion - LaTeX → OMML
+    FORMULA_BACKEND = "native"  # LaTeX→OMML 转换后端: "native" 直接生成 OMML (无法处理的公式回退到 MathML)，"mathml" 经 latex2mathml + XSLT
+    FORMULA_MEMO_SIZE = 4096  # 进程内缓存的 LaTeX→OMML 转换结果条数 (LRU)，0 表示关闭
+    FORMULA_CACHE_ENABLED = True  # 持久化公式缓存 (SQLite)，多进程共享且重启后保留
+    FORMULA_CACHE_PATH = DATA_DIR / "formula_cache.sqlite3"
+    FORMULA_CACHE_MAX_BYTES = 64 * 1024 * 1024  # 64MB
+
+    # Result cache - 相同内容 + 相同规则配置的文档直接复用上次的处理结果
+    ENGINE_VERSION = "1.0.0"  # 规则行为变化时递增，使旧的缓存结果失效
+    RESULT_CACHE_ENABLED = True
+    RESULT_CACHE_DIR = DATA_DIR / "result_cache"
+    RESULT_CACHE_MAX_BYTES = 512 * 1024 * 1024  # 512MB
+
+    # Profiling - 按需对单个处理任务做性能分析，结果保存在输出目录
+    PROFILE_SAMPLE_INTERVAL = 0.005  # 调用栈采样间隔 (秒)
+    RULE_TEST_PROFILING = False  # 是否允许 /rules/test 请求性能分析
+
     # CORS - 开发环境允许本地访问，生产环境应限制为具体域名
     CORS_ORIGINS = [
         "http://localhost:5173",  # Vite dev server
@@ -0,0 +1,358 @@
+"""
+Loading and saving python-docx documents without touching unused parts.
+
+open_document() can leave package parts that no enabled rule reads or writes
+(headers, footers, comments, settings, media...) as raw zip entries: they
+are not read, inflated or parsed unless something asks for them. Rules
+declare the parts they need in BaseRule.package_parts.
+
+Document.save() re-serializes and re-deflates every member of the package,
+including large images under word/media that the rules never touch.
+save_document() writes the same package, but every member whose bytes are
+unchanged from the source archive (same size and CRC-32 as the source zip
+entry) is copied as its existing compressed data, without inflating or
+deflating it. Only modified parts (typically word/document.xml and
+word/styles.xml) are compressed again.
+"""
+
+import shutil
+import struct
+import zipfile
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, FrozenSet, Iterable, Optional, Union
+
+from docx import Document
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.opc.package import Unmarshaller
+from docx.opc.packuri import PACKAGE_URI
+from docx.opc.part import Part, PartFactory
+from docx.opc.phys_pkg import PhysPkgReader
+from docx.opc.pkgreader import PackageReader, _ContentTypeMap, _SerializedPart
+from docx.opc.pkgwriter import PackageWriter
+from docx.package import Package
+
+# Part names rules can declare in package_parts -> relationship types.
+# The main document part is always loaded.
+PACKAGE_PARTS = {
+    "document": (RT.OFFICE_DOCUMENT,),
+    "styles": (RT.STYLES,),
+    "numbering": (RT.NUMBERING,),
+    "settings": (RT.SETTINGS,),
+    "headers": (RT.HEADER, RT.FOOTER),
+    "notes": (RT.FOOTNOTES, RT.ENDNOTES),
+    "comments": (RT.COMMENTS,),
+    "media": (RT.IMAGE,),
+}
+
+# Chunk size for copying raw member data between archives
+_COPY_CHUNK = 1024 * 1024
+
+# Private zipfile names the raw member copy relies on. They are not part of
+# zipfile's API; if a Python release drops any of them, members are copied by
+# decompressing and recompressing instead.
+_ZIPFILE_NAMES = (
+    "structFileHeader",
+    "sizeFileHeader",
+    "_FH_FILENAME_LENGTH",
+    "_FH_EXTRA_FIELD_LENGTH",
+)
+_ZIPFILE_WRITER_NAMES = ("_lock", "_writecheck", "_didModify", "start_dir", "fp")
+
+
+def _can_copy_raw(zipf: zipfile.ZipFile) -> bool:
+    """Whether compressed member data can be appended to ``zipf`` as-is."""
+    return (
+        all(hasattr(zipfile, name) for name in _ZIPFILE_NAMES)
+        and all(hasattr(zipf, name) for name in _ZIPFILE_WRITER_NAMES)
+        and hasattr(zipfile.ZipInfo, "FileHeader")
+    )
+
+
+class LazyPart(Part):
+    """
+    Package part kept as its raw zip entry.
+
+    ``blob`` reads the entry without parsing it. Any other attribute of the
+    real part class (``element``, ``styles``, ``image``...) loads the part
+    through python-docx's PartFactory and turns this object into it, so
+    relationships pointing here stay valid.
+    """
+
+    def __init__(self, partname, content_type, reltype, package, source_path):
+        super().__init__(partname, content_type, package=package)
+        self._reltype = reltype
+        self._source_path = source_path
+
+    @property
+    def blob(self) -> bytes:
+        with zipfile.ZipFile(self._source_path) as zf:
+            return zf.read(self.partname.membername)
+
+    def load(self) -> Part:
+        """Parse the part, replacing this placeholder in place."""
+        real = PartFactory(
+            self.partname, self.content_type, self._reltype, self.blob, self.package
+        )
+        state = dict(real.__dict__)
+        for key in ("rels", "_rels"):  # relationships were loaded with the package
+            if key in self.__dict__:
+                state[key] = self.__dict__[key]
+        self.__dict__.clear()
+        self.__dict__.update(state)
+        self.__class__ = real.__class__
+        return self
+
+    def __getattr__(self, name):
+        # Only reached for attributes LazyPart itself does not have
+        if name.startswith("__") or "_source_path" not in self.__dict__:
+            raise AttributeError(name)
+        return getattr(self.load(), name)
+
+
+def required_parts(plan) -> Optional[FrozenSet[str]]:
+    """
+    Package parts needed by a compiled rule plan.
+
+    Returns:
+        Union of the rules' package_parts, or None if any rule does not
+        declare them (the whole package must be loaded)
+    """
+    parts = set()
+    for rule, _ in plan:
+        declared = getattr(rule, "package_parts", None)
+        if declared is None:
+            return None
+        parts.update(declared)
+    return frozenset(parts)
+
+
+def open_document(
+    path: Union[str, Path],
+    parts: Optional[Iterable[str]] = None,
+    document_xml: Optional[bytes] = None,
+):
+    """
+    Open a .docx, loading only the given package parts.
+
+    Args:
+        path: .docx file
+        parts: Names from PACKAGE_PARTS to load; other parts become LazyPart
+            placeholders. None loads everything, like Document(path).
+        document_xml: Parsed instead of the archive's main document part,
+            e.g. a skeleton with an empty body (see backend.core.streaming)
+    """
+    if parts is None and document_xml is None:
+        return Document(path)
+
+    eager = {RT.OFFICE_DOCUMENT}
+    for name in parts or ():
+        eager.update(PACKAGE_PARTS[name])
+
+    phys_reader = PhysPkgReader(path)
+    try:
+        content_types = _ContentTypeMap.from_xml(phys_reader.content_types_xml)
+        pkg_srels = PackageReader._srels_for(phys_reader, PACKAGE_URI)
+        sparts = []
+        visited = set()
+        pending = list(pkg_srels)
+        # Same walk as PackageReader._walk_phys_parts, without reading lazy blobs
+        while pending:
+            srel = pending.pop(0)
+            if srel.is_external or srel.target_partname in visited:
+                continue
+            partname = srel.target_partname
+            visited.add(partname)
+            part_srels = PackageReader._srels_for(phys_reader, partname)
+            if srel.reltype == RT.OFFICE_DOCUMENT and document_xml is not None:
+                blob = document_xml
+            elif parts is None or srel.reltype in eager:
+                blob = phys_reader.blob_for(partname)
+            else:
+                blob = None
+            sparts.append(
+                _SerializedPart(
+                    partname, content_types[partname], srel.reltype, blob, part_srels
+                )
+            )
+            pending[:0] = list(part_srels)
+    finally:
+        phys_reader.close()
+
+    def part_factory(partname, content_type, reltype, blob, package):
+        if blob is None:
+            return LazyPart(partname, content_type, reltype, package, path)
+        return PartFactory(partname, content_type, reltype, blob, package)
+
+    package = Package()
+    reader = PackageReader(content_types, pkg_srels, tuple(sparts))
+    Unmarshaller.unmarshal(reader, package, part_factory)
+    return package.main_document_part.document
+
+
+class _CopyingZipWriter:
+    """
+    Physical package writer (the interface of docx.opc.phys_pkg._ZipPkgWriter)
+    that copies members unchanged from ``source`` instead of recompressing them.
+
+    The raw copy uses zipfile internals; without them (see _can_copy_raw)
+    unchanged members are streamed through zipfile and recompressed.
+    """
+
+    def __init__(self, pkg_file, source: zipfile.ZipFile, raw: BinaryIO):
+        self._zipf = zipfile.ZipFile(pkg_file, "w", compression=zipfile.ZIP_DEFLATED)
+        self._source = source
+        self._raw = raw
+        self._copy_raw = _can_copy_raw(self._zipf)
+        self.copied = 0
+        self.written = 0
+
+    def write(self, pack_uri, blob: bytes):
+        name = pack_uri.membername
+        info = self._source_member(name)
+        if (
+            info is not None
+            and info.file_size == len(blob)
+            and info.CRC == zlib.crc32(blob)
+        ):
+            self._copy_member(info)
+        else:
+            self._zipf.writestr(name, blob)
+            self.written += 1
+
+    def open(self, pack_uri, large: bool = False) -> BinaryIO:
+        """Writable stream for a new member; ``large`` if it may exceed 2 GiB."""
+        self.written += 1
+        return self._zipf.open(pack_uri.membername, "w", force_zip64=large)
+
+    def copy(self, pack_uri) -> bool:
+        """Copy a member unchanged from the source, if it is there."""
+        info = self._source_member(pack_uri.membername)
+        if info is None:
+            return False
+        self._copy_member(info)
+        return True
+
+    def close(self):
+        self._zipf.close()
+
+    def _source_member(self, name: str) -> Optional[zipfile.ZipInfo]:
+        try:
+            info = self._source.getinfo(name)
+        except KeyError:
+            return None
+        # Encrypted or ZIP64 members are rare in .docx; let zipfile handle them
+        if info.flag_bits & 0x1 or max(info.file_size, info.compress_size) >= (
+            zipfile.ZIP64_LIMIT
+        ):
+            return None
+        return info
+
+    def _copy_member(self, info: zipfile.ZipInfo):
+        """Append ``info``'s compressed data to the output archive as-is."""
+        if not self._copy_raw:
+            with self._source.open(info) as src, self._zipf.open(
+                info.filename, "w"
+            ) as dst:
+                shutil.copyfileobj(src, dst, _COPY_CHUNK)
+            self.written += 1
+            return
+
+        # Locate the data: it follows the local header's name and extra fields
+        self._raw.seek(info.header_offset)
+        header = struct.unpack(
+            zipfile.structFileHeader, self._raw.read(zipfile.sizeFileHeader)
+        )
+        self._raw.seek(
+            header[zipfile._FH_FILENAME_LENGTH]
+            + header[zipfile._FH_EXTRA_FIELD_LENGTH],
+            1,
+        )
+
+        zinfo = zipfile.ZipInfo(info.filename, info.date_time)
+        zinfo.compress_type = info.compress_type
+        zinfo.CRC = info.CRC
+        zinfo.file_size = info.file_size
+        zinfo.compress_size = info.compress_size
+        zinfo.external_attr = info.external_attr
+
+        # Mirrors ZipFile.writestr's bookkeeping, minus the compressor
+        zipf = self._zipf
+        with zipf._lock:
+            zipf._writecheck(zinfo)
+            zipf._didModify = True
+            zipf.fp.seek(zipf.start_dir)
+            zinfo.header_offset = zipf.fp.tell()
+            zipf.fp.write(zinfo.FileHeader(False))
+            remaining = info.compress_size
+            while remaining:
+                chunk = self._raw.read(min(remaining, _COPY_CHUNK))
+                if not chunk:
+                    raise zipfile.BadZipFile(f"Truncated member {info.filename!r}")
+                zipf.fp.write(chunk)
+                remaining -= len(chunk)
+            zipf.filelist.append(zinfo)
+            zipf.NameToInfo[zinfo.filename] = zinfo
+            zipf.start_dir = zipf.fp.tell()
+        self.copied += 1
+
+
+def save_document(
+    doc,
+    output_path: Union[str, Path],
+    source_path: Union[str, Path, None] = None,
+    document_writer: Optional[Callable[[BinaryIO, zipfile.ZipFile], None]] = None,
+    large_document: Optional[bool] = None,
+) -> Dict[str, int]:
+    """
+    Save ``doc`` to ``output_path``, copying unmodified members from the
+    archive it was loaded from. Parts still held as LazyPart are copied
+    without being read.
+
+    Args:
+        doc: python-docx Document
+        output_path: Where to write the .docx
+        source_path: The .docx ``doc`` was opened from; without it (documents
+            built in memory, e.g. converted Markdown) this is a plain save
+        document_writer: Called with a writable stream for the main document
+            part and the source archive, instead of serializing
+            ``doc.element``. Requires ``source_path``.
+        large_document: Whether the part document_writer writes may exceed
+            the ZIP64 limit; by default, whether its source member is large
+
+    Returns:
+        {"copied": members copied verbatim, "written": members recompressed}
+    """
+    package = doc.part.package
+    if source_path is None or not zipfile.is_zipfile(source_path):
+        if document_writer is not None:
+            raise ValueError("document_writer needs the source archive")
+        doc.save(output_path)
+        with zipfile.ZipFile(output_path) as written:
+            return {"copied": 0, "written": len(written.namelist())}
+
+    parts = list(package.parts)
+    for part in parts:
+        part.before_marshal()
+
+    with zipfile.ZipFile(source_path) as source, open(source_path, "rb") as raw:
+        writer = _CopyingZipWriter(output_path, source, raw)
+        try:
+            PackageWriter._write_content_types_stream(writer, parts)
+            PackageWriter._write_pkg_rels(writer, package.rels)
+            for part in parts:
+                if part is doc.part and document_writer is not None:
+                    large = large_document
+                    if large is None:
+                        source_info = source.getinfo(part.partname.membername)
+                        large = source_info.file_size >= zipfile.ZIP64_LIMIT // 2
+                    with writer.open(part.partname, large=large) as stream:
+                        document_writer(stream, source)
+                elif not (isinstance(part, LazyPart) and writer.copy(part.partname)):
+                    writer.write(part.partname, part.blob)
+                if len(part.rels):
+                    writer.write(part.partname.rels_uri, part.rels.xml)
+        finally:
+            writer.close()
+
+    return {"copied": writer.copied, "written": writer.written}
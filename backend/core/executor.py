@@ -0,0 +1,167 @@
+"""
+Executors for running blocking document processing off the asyncio event loop.
+
+- The processing executor handles single requests (/process, /rules/test).
+- The batch executor is a process pool sized to the machine's cores that
+  /batch/start fans items out over.
+- The partition executor is a process pool that runs the partitions of one
+  large document (see backend.core.partition).
+"""
+
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+from backend.core.config import settings
+from backend.core.metrics import processing_metrics
+
+_executor: Optional[Executor] = None
+_batch_executor: Optional[Executor] = None
+_partition_executor: Optional[Executor] = None
+_executor_lock = threading.Lock()
+# True in processes started by _new_process_pool
+_in_pool_worker = False
+
+
+def _init_worker():
+    """Import the rule engine once per worker process so rules are registered."""
+    global _in_pool_worker
+    import backend.engine  # noqa: F401
+
+    _in_pool_worker = True
+
+    # /metrics is served by the parent; ship observations back to it
+    processing_metrics.forward_to_parent()
+
+
+def _call_in_worker(func: Callable[..., Any], args, kwargs):
+    """Run func in a pool worker and return its result with buffered metrics."""
+    return func(*args, **kwargs), processing_metrics.drain()
+
+
+def _new_process_pool(max_workers: int) -> ProcessPoolExecutor:
+    # spawn: safe to start from a threaded server and behaves the same on Windows
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+    )
+
+
+def get_executor() -> Executor:
+    """Get the shared processing executor, creating it on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                max_workers = max(1, int(settings.PROCESS_MAX_WORKERS))
+                if settings.PROCESS_EXECUTOR == "process":
+                    _executor = _new_process_pool(max_workers)
+                else:
+                    _executor = ThreadPoolExecutor(
+                        max_workers=max_workers, thread_name_prefix="md2docx-worker"
+                    )
+    return _executor
+
+
+def batch_worker_count() -> int:
+    """Number of worker processes in the batch pool."""
+    return max(1, int(settings.BATCH_MAX_WORKERS or os.cpu_count() or 1))
+
+
+def get_batch_executor() -> Executor:
+    """Get the batch process pool, creating it on first use."""
+    global _batch_executor
+    if _batch_executor is None:
+        with _executor_lock:
+            if _batch_executor is None:
+                _batch_executor = _new_process_pool(batch_worker_count())
+    return _batch_executor
+
+
+def in_pool_worker() -> bool:
+    """Whether this process is a worker of one of the process pools."""
+    return _in_pool_worker
+
+
+def partition_worker_count() -> int:
+    """Number of worker processes a large document is partitioned over."""
+    return max(1, int(settings.PARTITION_MAX_WORKERS or os.cpu_count() or 1))
+
+
+def get_partition_executor() -> Executor:
+    """Get the partition process pool, creating it on first use."""
+    global _partition_executor
+    if _partition_executor is None:
+        with _executor_lock:
+            if _partition_executor is None:
+                _partition_executor = _new_process_pool(partition_worker_count())
+    return _partition_executor
+
+
+def discard_partition_executor(executor: Executor):
+    """Drop a broken partition pool so the next document starts a fresh one."""
+    global _partition_executor
+    with _executor_lock:
+        if _partition_executor is executor:
+            _partition_executor = None
+    executor.shutdown(wait=False)
+
+
+async def _run_on(executor: Executor, func: Callable[..., Any], *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    if not isinstance(executor, ProcessPoolExecutor):
+        return await loop.run_in_executor(
+            executor, functools.partial(func, *args, **kwargs)
+        )
+
+    result, runs = await loop.run_in_executor(
+        executor, functools.partial(_call_in_worker, func, args, kwargs)
+    )
+    processing_metrics.merge(runs)
+    return result
+
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run a blocking callable on the processing executor and await its result.
+
+    With the process executor, ``func`` and its arguments must be picklable
+    (module-level functions, not closures).
+    """
+    return await _run_on(get_executor(), func, *args, **kwargs)
+
+
+async def run_batch(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run a picklable callable on the batch process pool and await its result.
+
+    If a worker process dies the pool is discarded so the next call starts a
+    fresh one; the failing call still raises.
+    """
+    global _batch_executor
+    executor = get_batch_executor()
+    try:
+        return await _run_on(executor, func, *args, **kwargs)
+    except BrokenProcessPool:
+        with _executor_lock:
+            if _batch_executor is executor:
+                _batch_executor = None
+        executor.shutdown(wait=False)
+        raise
+
+
+def shutdown_executor(wait: bool = True):
+    """Shut down the shared executors (called on application shutdown)."""
+    global _executor, _batch_executor, _partition_executor
+    with _executor_lock:
+        for executor in (_executor, _batch_executor, _partition_executor):
+            if executor is not None:
+                executor.shutdown(wait=wait)
+        _executor = None
+        _batch_executor = None
+        _partition_executor = None
@@ -3,12 +3,24 @@ LaTeX to OMML Converter
 Converts LaTeX math expressions to Word OMML format.
 """
 
+import copy
+import hashlib
 import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from importlib import metadata
+from typing import Dict, List, Optional, Tuple
+
 from lxml import etree
 from docx import Document
 from docx.oxml.ns import qn
 from docx.oxml import OxmlElement
 
+from backend.core.cache import FormulaCache, get_formula_cache
+from backend.core.config import settings
+from backend.core.metrics import count
+
 # Try to import latex2mathml, fall back to basic conversion if not available
 try:
     import latex2mathml.converter as latex2mathml
@@ -91,16 +103,633 @@ MATHML_TO_OMML_XSLT = """<?xml version="1.0" encoding="UTF-8"?>
 """
 
 
+# Increment when the conversion output changes for reasons converter_version()
+# cannot see (e.g. post-processing of the OMML)
+CONVERTER_VERSION = "1"
+
+
+@lru_cache(maxsize=None)
+def converter_version(backend: str) -> str:
+    """
+    Version of the LaTeX -> OMML conversion, part of the persistent cache
+    key: CONVERTER_VERSION, the backend (settings.FORMULA_BACKEND), the
+    latex2mathml version and the stylesheet.
+    """
+    try:
+        latex2mathml_version = metadata.version("latex2mathml")
+    except metadata.PackageNotFoundError:
+        latex2mathml_version = "none"
+    stylesheet = hashlib.sha256(MATHML_TO_OMML_XSLT.encode()).hexdigest()[:16]
+    return (
+        f"{CONVERTER_VERSION}/{backend}/latex2mathml-{latex2mathml_version}"
+        f"/{stylesheet}"
+    )
+
+
+# Compiled transforms are not shared between threads (one per thread)
+_thread_state = threading.local()
+
+
+@lru_cache(maxsize=None)
+def _stylesheet() -> etree._Element:
+    return etree.fromstring(MATHML_TO_OMML_XSLT.encode())
+
+
+def xslt_transform() -> Optional[etree.XSLT]:
+    """
+    The MathML to OMML transform of the calling thread, compiled on first use
+    (None if the stylesheet cannot be compiled).
+    """
+    try:
+        return _thread_state.transform
+    except AttributeError:
+        pass
+    transform = None
+    try:
+        transform = etree.XSLT(_stylesheet())
+    except Exception as e:
+        print(f"Warning: Could not initialize XSLT transform: {e}")
+    _thread_state.transform = transform
+    return transform
+
+
+class OmmlMemo:
+    """
+    Bounded LRU memo of LaTeX source -> OMML element, shared by all threads.
+
+    Failed conversions are remembered as None. Stored elements must never be
+    inserted into a document; LaTeXConverter hands out deep copies.
+    """
+
+    def __init__(self, maxsize: Optional[int] = None):
+        """
+        Args:
+            maxsize: Most entries kept; None for settings.FORMULA_MEMO_SIZE
+                at the time of each insertion, 0 disables the memo
+        """
+        self._maxsize = maxsize
+        self._items: "OrderedDict[str, Optional[etree._Element]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def maxsize(self) -> int:
+        if self._maxsize is None:
+            return settings.FORMULA_MEMO_SIZE
+        return self._maxsize
+
+    def get(self, key: str) -> Tuple[bool, Optional[etree._Element]]:
+        """(found, element) for ``key``, marking it as recently used."""
+        with self._lock:
+            try:
+                self._items.move_to_end(key)
+            except KeyError:
+                return False, None
+            return True, self._items[key]
+
+    def put(self, key: str, omml: Optional[etree._Element]):
+        maxsize = self.maxsize
+        if maxsize <= 0:
+            return
+        with self._lock:
+            self._items[key] = omml
+            self._items.move_to_end(key)
+            while len(self._items) > maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+# Process-wide memo used by LaTeXConverter.latex_to_omml
+omml_memo = OmmlMemo()
+
+
+class LatexSyntaxError(ValueError):
+    """A formula the native OMML builder cannot compile."""
+
+
+_M = f"{{{OMML_NS}}}"
+_VAL = f"{_M}val"
+_XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+
+# Commands, escaped characters, numbers, whitespace and single characters
+_TOKEN = re.compile(r"\\(?:[A-Za-z]+|.)|\d+(?:\.\d+)?|\s+|.", re.DOTALL)
+
+# Run styles: (m:sty, m:scr)
+_UPRIGHT = ("p", None)
+
+# fmt: off
+_GREEK = {
+    "alpha": "α", "beta": "β", "gamma": "γ", "delta": "δ", "epsilon": "ϵ",
+    "varepsilon": "ε", "zeta": "ζ", "eta": "η", "theta": "θ", "vartheta": "ϑ",
+    "iota": "ι", "kappa": "κ", "lambda": "λ", "mu": "μ", "nu": "ν", "xi": "ξ",
+    "pi": "π", "varpi": "ϖ", "rho": "ρ", "varrho": "ϱ", "sigma": "σ",
+    "varsigma": "ς", "tau": "τ", "upsilon": "υ", "phi": "ϕ", "varphi": "φ",
+    "chi": "χ", "psi": "ψ", "omega": "ω", "Gamma": "Γ", "Delta": "Δ",
+    "Theta": "Θ", "Lambda": "Λ", "Xi": "Ξ", "Pi": "Π", "Sigma": "Σ",
+    "Upsilon": "Υ", "Phi": "Φ", "Psi": "Ψ", "Omega": "Ω",
+}
+_SYMBOLS = {
+    **_GREEK,
+    # Binary operators
+    "pm": "±", "mp": "∓", "times": "×", "div": "÷", "cdot": "⋅", "ast": "∗",
+    "star": "⋆", "circ": "∘", "bullet": "∙", "oplus": "⊕", "ominus": "⊖",
+    "otimes": "⊗", "oslash": "⊘", "odot": "⊙", "cup": "∪", "cap": "∩",
+    "setminus": "∖", "wedge": "∧", "land": "∧", "vee": "∨", "lor": "∨",
+    "neg": "¬", "lnot": "¬",
+    # Relations
+    "leq": "≤", "le": "≤", "geq": "≥", "ge": "≥", "neq": "≠", "ne": "≠",
+    "approx": "≈", "equiv": "≡", "sim": "∼", "simeq": "≃", "cong": "≅",
+    "propto": "∝", "ll": "≪", "gg": "≫", "prec": "≺", "succ": "≻",
+    "preceq": "⪯", "succeq": "⪰", "perp": "⊥", "parallel": "∥", "mid": "∣",
+    "in": "∈", "notin": "∉", "ni": "∋", "subset": "⊂", "supset": "⊃",
+    "subseteq": "⊆", "supseteq": "⊇", "models": "⊨", "vdash": "⊢",
+    # Arrows
+    "to": "→", "rightarrow": "→", "leftarrow": "←", "gets": "←",
+    "leftrightarrow": "↔", "Rightarrow": "⇒", "Leftarrow": "⇐",
+    "Leftrightarrow": "⇔", "implies": "⟹", "iff": "⟺", "mapsto": "↦",
+    "longrightarrow": "⟶", "longleftarrow": "⟵", "uparrow": "↑",
+    "downarrow": "↓",
+    # Other symbols
+    "infty": "∞", "partial": "∂", "nabla": "∇", "forall": "∀", "exists": "∃",
+    "nexists": "∄", "emptyset": "∅", "varnothing": "∅", "angle": "∠",
+    "triangle": "△", "hbar": "ℏ", "ell": "ℓ", "Re": "ℜ", "Im": "ℑ",
+    "aleph": "ℵ", "wp": "℘", "prime": "′", "degree": "°", "ldots": "…",
+    "dots": "…", "cdots": "⋯", "vdots": "⋮", "ddots": "⋱",
+    # Delimiters and escaped characters
+    "langle": "⟨", "rangle": "⟩", "lceil": "⌈", "rceil": "⌉", "lfloor": "⌊",
+    "rfloor": "⌋", "lvert": "|", "rvert": "|", "vert": "|", "lVert": "‖",
+    "rVert": "‖", "Vert": "‖", "backslash": "\\", "{": "{", "}": "}",
+    "|": "‖", "$": "$", "%": "%", "&": "&", "#": "#", "_": "_",
+}
+# Characters written differently in math (as latex2mathml does)
+_CHARS = {"-": "−", "*": "∗", "'": "′", "~": "\u00a0"}
+_SPACES = {
+    ",": "\u2009", ":": "\u205f", ">": "\u205f", ";": "\u2005", "!": "",
+    " ": " ", "quad": "\u2003", "qquad": "\u2003\u2003", "enspace": "\u2002",
+    "thinspace": "\u2009",
+}
+# Upright function names; the second set takes limits below (\lim_{x \to 0})
+_FUNCTIONS = {
+    "sin", "cos", "tan", "cot", "sec", "csc", "arcsin", "arccos", "arctan",
+    "sinh", "cosh", "tanh", "coth", "log", "ln", "lg", "exp", "deg", "dim",
+    "ker", "hom", "arg",
+}
+_LIMIT_FUNCTIONS = {
+    "lim": "lim", "limsup": "lim sup", "liminf": "lim inf", "max": "max",
+    "min": "min", "sup": "sup", "inf": "inf", "det": "det", "gcd": "gcd",
+    "Pr": "Pr",
+}
+_NARY = {
+    "sum": "∑", "prod": "∏", "coprod": "∐", "int": "∫", "iint": "∬",
+    "iiint": "∭", "oint": "∮", "bigcup": "⋃", "bigcap": "⋂", "bigoplus": "⨁",
+    "bigotimes": "⨂", "bigodot": "⨀", "bigvee": "⋁", "bigwedge": "⋀",
+}
+_INTEGRALS = {"int", "iint", "iiint", "oint"}
+# The operand of an n-ary operator ends at these tokens (\sum_i a_i + b)
+_OPERAND_ENDS = frozenset(
+    ["+", "-", "=", "<", ">", ","]
+    + [f"\\{name}" for name in ("pm", "mp", "leq", "le", "geq", "ge", "neq")]
+    + [f"\\{name}" for name in ("ne", "approx", "equiv", "sim", "to", "quad")]
+)
+_ACCENTS = {
+    "hat": "\u0302", "widehat": "\u0302", "bar": "\u0305", "vec": "\u20d7",
+    "overrightarrow": "\u20d7", "dot": "\u0307", "ddot": "\u0308",
+    "tilde": "\u0303", "widetilde": "\u0303", "check": "\u030c",
+    "breve": "\u0306", "acute": "\u0301", "grave": "\u0300",
+}
+_BARS = {"overline": "top", "underline": "bot"}
+_GROUP_CHARS = {"overbrace": ("⏞", "top", "bot"), "underbrace": ("⏟", "bot", "top")}
+_FONTS = {
+    "mathrm": ("p", None), "mathbf": ("b", None), "boldsymbol": ("bi", None),
+    "mathit": ("i", None), "mathbb": (None, "double-struck"),
+    "mathcal": (None, "script"), "mathscr": (None, "script"),
+    "mathfrak": (None, "fraktur"), "mathsf": ("p", "sans-serif"),
+    "mathtt": ("p", "monospace"),
+}
+_TEXT = {
+    "text": _UPRIGHT, "textrm": _UPRIGHT, "textnormal": _UPRIGHT,
+    "mbox": _UPRIGHT, "operatorname": _UPRIGHT, "textbf": ("b", None),
+    "textit": ("i", None),
+}
+# fmt: on
+_FRACTIONS = {"frac", "dfrac", "tfrac", "cfrac"}
+_BINOMS = {"binom", "dbinom", "tbinom"}
+_SIZES = {f"{size}{side}" for size in ("big", "Big", "bigg", "Bigg") for side in "lrm"}
+_SIZES.update(("big", "Big", "bigg", "Bigg"))
+_IGNORED = {"displaystyle", "textstyle", "scriptstyle", "limits", "nolimits"}
+_DELIMITERS = {"(": "(", ")": ")", "[": "[", "]": "]", "|": "|", "/": "/"}
+_DELIMITERS.update({"<": "⟨", ">": "⟩"})
+# Matrix environments and their (opening, closing) delimiters
+_MATRICES = {"matrix": ("", ""), "smallmatrix": ("", ""), "array": ("", "")}
+_MATRICES.update({"pmatrix": ("(", ")"), "bmatrix": ("[", "]"), "Bmatrix": ("{", "}")})
+_MATRICES.update({"vmatrix": ("|", "|"), "Vmatrix": ("‖", "‖"), "cases": ("{", "")})
+_EQUATION_ARRAYS = {"aligned", "align", "align*", "gathered", "split", "eqnarray"}
+
+# Tokens that end a row; any other place they appear in is a syntax error
+_ROW_ENDS = frozenset(["}", "&", "\\\\", "\\end", "\\right", "\\middle"])
+_GROUP_END = frozenset(["}"])
+_OPTION_END = frozenset(["]"])
+_DELIMITER_END = frozenset(["\\right", "\\middle"])
+_CELL_END = frozenset(["&", "\\\\", "\\end"])
+
+
+def _command_name(token: str) -> Optional[str]:
+    return token[1:] if len(token) > 1 and token[0] == "\\" else None
+
+
+def _sub(parent, name: str, val: Optional[str] = None) -> etree._Element:
+    element = etree.SubElement(parent, _M + name)
+    if val is not None:
+        element.set(_VAL, val)
+    return element
+
+
+def _last_child(parent) -> Optional[etree._Element]:
+    return next(parent.iterchildren(reversed=True), None)
+
+
+class OmmlBuilder:
+    """
+    Compiles LaTeX math straight to an m:oMath element, without the
+    LaTeX -> MathML -> XSLT round trip (two serializations and parses).
+
+    A recursive descent parser over the formula's tokens appends m:
+    elements to their parent as it goes: fractions, scripts, radicals,
+    n-ary operators, limits, matrices and cases, accents and bars,
+    \\left...\\right delimiters, font and text commands and the usual
+    symbols. Anything else raises LatexSyntaxError, so the caller can fall
+    back to the MathML path.
+    """
+
+    def __init__(self, latex: str):
+        self._tokens = _TOKEN.findall(latex)
+        self._pos = 0
+        # Font styles of the enclosing \mathbf{...} etc., innermost last
+        self._styles: List[Tuple[Optional[str], Optional[str]]] = []
+
+    def build(self) -> etree._Element:
+        root = etree.Element(_M + "oMath", nsmap={"m": OMML_NS})
+        end = self._row(root, frozenset())
+        if end is not None:
+            raise LatexSyntaxError(f"unexpected {end}")
+        return root
+
+    # ===== Tokens =====
+
+    def _peek(self) -> Optional[str]:
+        """The next token that is not whitespace (None at the end)."""
+        tokens = self._tokens
+        while self._pos < len(tokens) and tokens[self._pos].isspace():
+            self._pos += 1
+        return tokens[self._pos] if self._pos < len(tokens) else None
+
+    def _take(self) -> str:
+        token = self._peek()
+        if token is None:
+            raise LatexSyntaxError("unexpected end of formula")
+        self._pos += 1
+        return token
+
+    def _expect(self, token: str):
+        if self._take() != token:
+            raise LatexSyntaxError(f"expected {token}")
+
+    # ===== Rows and terms =====
+
+    def _row(self, parent, ends) -> Optional[str]:
+        """Append terms to parent up to one of ``ends`` (not consumed)."""
+        while True:
+            token = self._peek()
+            if token is None or token in ends:
+                return token
+            if token in _ROW_ENDS:
+                raise LatexSyntaxError(f"unexpected {token}")
+            self._term(parent, ends)
+
+    def _term(self, parent, ends):
+        """An atom with its scripts, or an n-ary operator with its operand."""
+        token = self._take()
+        name = _command_name(token)
+        if name in _NARY:
+            self._nary(parent, name, ends)
+            return
+        if name in _LIMIT_FUNCTIONS and self._peek() == "_":
+            self._pos += 1
+            lim_low = _sub(parent, "limLow")
+            self._run(_sub(lim_low, "e"), _LIMIT_FUNCTIONS[name], _UPRIGHT)
+            self._argument(_sub(lim_low, "lim"))
+            return
+
+        last = _last_child(parent)
+        self._atom(parent, token)
+        if self._peek() not in ("^", "_"):
+            return
+        base = list(last.itersiblings() if last is not None else parent)
+        scripts = self._scripts(parent)
+        if "sub" in scripts and "sup" in scripts:
+            wrapper = _sub(parent, "sSubSup")
+        else:
+            wrapper = _sub(parent, "sSub" if "sub" in scripts else "sSup")
+        _sub(wrapper, "e").extend(base)
+        wrapper.extend(scripts[kind] for kind in ("sub", "sup") if kind in scripts)
+
+    def _scripts(self, parent) -> Dict[str, etree._Element]:
+        """Parse ^ and _ arguments into m:sup / m:sub elements, by kind."""
+        scripts = {}
+        while self._peek() in ("^", "_"):
+            token = self._take()
+            kind = "sup" if token == "^" else "sub"
+            if kind in scripts:
+                raise LatexSyntaxError(f"double {token}")
+            scripts[kind] = _sub(parent, kind)
+            self._argument(scripts[kind])
+        return scripts
+
+    def _argument(self, parent):
+        """A braced group or a single atom (the first digit of a number)."""
+        token = self._take()
+        if token == "{":
+            self._group(parent)
+            return
+        if len(token) > 1 and token[0].isdigit():
+            # \frac12, x^23: only the first digit is the argument
+            self._tokens[self._pos - 1] = token[1:]
+            self._pos -= 1
+            token = token[0]
+        if token in ("^", "_") or token in _ROW_ENDS:
+            raise LatexSyntaxError(f"unexpected {token}")
+        self._atom(parent, token)
+
+    def _group(self, parent):
+        """The rest of a group whose "{" was taken."""
+        if self._row(parent, _GROUP_END) is None:
+            raise LatexSyntaxError("missing }")
+        self._pos += 1
+
+    def _atom(self, parent, token: str):
+        if token == "{":
+            self._group(parent)
+        elif token in ("^", "_"):
+            # Scripts without a base
+            self._pos -= 1
+        elif _command_name(token) is not None:
+            self._command(parent, _command_name(token))
+        else:
+            self._run(parent, _CHARS.get(token, token))
+
+    def _run(self, parent, text: str, style=None):
+        r = _sub(parent, "r")
+        if style is None and self._styles:
+            style = self._styles[-1]
+        if style is not None:
+            sty, scr = style
+            r_pr = _sub(r, "rPr")
+            if scr is not None:
+                _sub(r_pr, "scr", scr)
+            if sty is not None:
+                _sub(r_pr, "sty", sty)
+        t = _sub(r, "t")
+        t.text = text
+        if text != text.strip():
+            t.set(_XML_SPACE, "preserve")
+
+    # ===== Commands =====
+
+    def _command(self, parent, name: str):
+        if name in _SYMBOLS:
+            self._run(parent, _SYMBOLS[name])
+        elif name in _FRACTIONS:
+            f = _sub(parent, "f")
+            self._argument(_sub(f, "num"))
+            self._argument(_sub(f, "den"))
+        elif name in _BINOMS:
+            f = _sub(self._delimited(parent, "(", ")"), "f")
+            _sub(_sub(f, "fPr"), "type", "noBar")
+            self._argument(_sub(f, "num"))
+            self._argument(_sub(f, "den"))
+        elif name == "sqrt":
+            self._radical(parent)
+        elif name == "left":
+            self._fenced(parent)
+        elif name in _SIZES:
+            self._run(parent, self._delimiter())
+        elif name in _ACCENTS:
+            acc = _sub(parent, "acc")
+            _sub(_sub(acc, "accPr"), "chr", _ACCENTS[name])
+            self._argument(_sub(acc, "e"))
+        elif name in _BARS:
+            bar = _sub(parent, "bar")
+            _sub(_sub(bar, "barPr"), "pos", _BARS[name])
+            self._argument(_sub(bar, "e"))
+        elif name in _GROUP_CHARS:
+            char, pos, vert_jc = _GROUP_CHARS[name]
+            group_chr = _sub(parent, "groupChr")
+            group_chr_pr = _sub(group_chr, "groupChrPr")
+            _sub(group_chr_pr, "chr", char)
+            _sub(group_chr_pr, "pos", pos)
+            _sub(group_chr_pr, "vertJc", vert_jc)
+            self._argument(_sub(group_chr, "e"))
+        elif name in _FONTS:
+            self._styles.append(_FONTS[name])
+            try:
+                self._argument(parent)
+            finally:
+                self._styles.pop()
+        elif name in _TEXT:
+            self._run(parent, self._text(), _TEXT[name])
+        elif name in _FUNCTIONS:
+            self._run(parent, name, _UPRIGHT)
+        elif name in _LIMIT_FUNCTIONS:
+            self._run(parent, _LIMIT_FUNCTIONS[name], _UPRIGHT)
+        elif name in _NARY:
+            self._run(parent, _NARY[name])
+        elif name in _SPACES:
+            if _SPACES[name]:
+                self._run(parent, _SPACES[name], _UPRIGHT)
+        elif name == "not":
+            self._run(parent, self._symbol(self._take()) + "\u0338")
+        elif name == "begin":
+            self._environment(parent)
+        elif name not in _IGNORED:
+            raise LatexSyntaxError(f"unsupported command \\{name}")
+
+    def _symbol(self, token: str) -> str:
+        name = _command_name(token)
+        if name is None:
+            return _CHARS.get(token, token)
+        if name in _SYMBOLS:
+            return _SYMBOLS[name]
+        raise LatexSyntaxError(f"unsupported symbol \\{name}")
+
+    def _text(self) -> str:
+        """The raw text of a braced argument (\\text{...}), spaces collapsed."""
+        token = self._take()
+        if token != "{":
+            return token
+        parts = []
+        depth = 0
+        tokens = self._tokens
+        while self._pos < len(tokens):
+            token = tokens[self._pos]
+            self._pos += 1
+            name = _command_name(token)
+            if token == "{":
+                depth += 1
+            elif token == "}":
+                if depth == 0:
+                    return "".join(parts)
+                depth -= 1
+            elif token.isspace():
+                parts.append(" ")
+            elif name is None:
+                parts.append(token)
+            elif name in ("{", "}", "$", "%", "&", "#", "_", " "):
+                parts.append(name)
+            else:
+                raise LatexSyntaxError(f"unsupported command \\{name} in text")
+        raise LatexSyntaxError("missing }")
+
+    def _delimited(self, parent, begin: str, end: str) -> etree._Element:
+        """An m:d with the given delimiters; returns its m:e."""
+        d = _sub(parent, "d")
+        d_pr = _sub(d, "dPr")
+        _sub(d_pr, "begChr", begin)
+        _sub(d_pr, "endChr", end)
+        return _sub(d, "e")
+
+    def _delimiter(self) -> str:
+        """The delimiter after \\left, \\right, \\middle or \\big ("" for ".")."""
+        token = self._take()
+        if token == ".":
+            return ""
+        if token in _DELIMITERS:
+            return _DELIMITERS[token]
+        return self._symbol(token)
+
+    def _fenced(self, parent):
+        """\\left ... \\middle ... \\right, after \\left was taken."""
+        d = _sub(parent, "d")
+        d_pr = _sub(d, "dPr")
+        _sub(d_pr, "begChr", self._delimiter())
+        separator = None
+        while True:
+            end = self._row(_sub(d, "e"), _DELIMITER_END)
+            if end is None:
+                raise LatexSyntaxError("missing \\right")
+            self._pos += 1
+            if end == "\\right":
+                break
+            separator = self._delimiter()
+        if separator is not None:
+            _sub(d_pr, "sepChr", separator)
+        _sub(d_pr, "endChr", self._delimiter())
+
+    def _radical(self, parent):
+        rad = _sub(parent, "rad")
+        rad_pr = _sub(rad, "radPr")
+        deg = _sub(rad, "deg")
+        if self._peek() == "[":
+            self._pos += 1
+            if self._row(deg, _OPTION_END) is None:
+                raise LatexSyntaxError("missing ]")
+            self._pos += 1
+        else:
+            _sub(rad_pr, "degHide", "1")
+        self._argument(_sub(rad, "e"))
+
+    def _nary(self, parent, name: str, ends):
+        """\\sum, \\int etc. with their limits; the operand runs to the next
+        relation, + or - (see _OPERAND_ENDS) or the end of the row."""
+        nary = _sub(parent, "nary")
+        nary_pr = _sub(nary, "naryPr")
+        _sub(nary_pr, "chr", _NARY[name])
+        lim_loc = "subSup" if name in _INTEGRALS else "undOvr"
+        while self._peek() in ("\\limits", "\\nolimits"):
+            lim_loc = "undOvr" if self._take() == "\\limits" else "subSup"
+        _sub(nary_pr, "limLoc", lim_loc)
+
+        scripts = self._scripts(parent)
+        for kind in ("sub", "sup"):
+            if kind in scripts:
+                nary.append(scripts[kind])
+            else:
+                _sub(nary_pr, f"{kind}Hide", "1")
+                _sub(nary, kind)
+        self._row(_sub(nary, "e"), ends | _OPERAND_ENDS)
+
+    def _environment(self, parent):
+        """\\begin{...} ... \\end{...} for matrices, cases and aligned rows."""
+        env = self._text()
+        if env in _MATRICES:
+            begin, end = _MATRICES[env]
+            if env == "array" and self._peek() == "{":
+                self._text()
+            if begin or end:
+                parent = self._delimited(parent, begin, end)
+            m = _sub(parent, "m")
+            m_pr = _sub(m, "mPr")
+            rows = self._cells(m, "mr")
+            columns = max(len(row) for row in rows)
+            for row in rows:
+                for _ in range(columns - len(row)):
+                    _sub(row[0].getparent(), "e")
+            mc_pr = _sub(_sub(_sub(m_pr, "mcs"), "mc"), "mcPr")
+            _sub(mc_pr, "count", str(columns))
+            _sub(mc_pr, "mcJc", "left" if env == "cases" else "center")
+        elif env in _EQUATION_ARRAYS:
+            # One m:e per row; the alignment points (&) are dropped
+            eq_arr = _sub(parent, "eqArr")
+            for row in self._cells(eq_arr, None):
+                for cell in row[1:]:
+                    row[0].extend(cell)
+                    eq_arr.remove(cell)
+        else:
+            raise LatexSyntaxError(f"unsupported environment {env}")
+        if self._text() != env:
+            raise LatexSyntaxError(f"\\begin{{{env}}} ended by another environment")
+
+    def _cells(self, parent, row_tag: Optional[str]) -> List[List[etree._Element]]:
+        """
+        Parse rows of &-separated cells up to \\end (consumed) into m:e
+        elements, each row in a ``row_tag`` element (or directly in parent).
+        """
+        rows = []
+        while True:
+            row_parent = _sub(parent, row_tag) if row_tag else parent
+            row = []
+            rows.append(row)
+            while True:
+                row.append(_sub(row_parent, "e"))
+                end = self._row(row[-1], _CELL_END)
+                if end is None:
+                    raise LatexSyntaxError("missing \\end")
+                self._pos += 1
+                if end != "&":
+                    break
+            if end == "\\end":
+                return rows
+            # A trailing \\ before \end does not start a row
+            if self._peek() == "\\end":
+                self._pos += 1
+                return rows
+
+
+def build_omml(latex: str) -> etree._Element:
+    """Compile LaTeX math to an m:oMath element (see OmmlBuilder)."""
+    return OmmlBuilder(latex).build()
+
+
 class LaTeXConverter:
     """Converts LaTeX math expressions to Word OMML format."""
 
-    def __init__(self):
-        self.xslt_transform = None
-        try:
-            xslt_doc = etree.fromstring(MATHML_TO_OMML_XSLT.encode())
-            self.xslt_transform = etree.XSLT(xslt_doc)
-        except Exception as e:
-            print(f"Warning: Could not initialize XSLT transform: {e}")
+    @property
+    def xslt_transform(self) -> Optional[etree.XSLT]:
+        return xslt_transform()
 
     def latex_to_mathml(self, latex: str) -> str:
         """Convert LaTeX to MathML."""
@@ -131,7 +760,55 @@ class LaTeXConverter:
             return None
 
     def latex_to_omml(self, latex: str) -> etree.Element:
-        """Convert LaTeX directly to OMML."""
+        """
+        Convert LaTeX directly to OMML.
+
+        Results are memoized per process (omml_memo) under the stripped
+        source, backed by the persistent formula cache shared by all
+        processes (backend.core.cache.FormulaCache); every call returns a
+        new element. Lookups are reported as formula_memo_* and
+        formula_cache_* hits / misses rule counters.
+        """
+        key = latex.strip()
+        found, omml = omml_memo.get(key)
+        if found:
+            count("formula_memo_hits")
+        else:
+            count("formula_memo_misses")
+            omml = self._cached_latex_to_omml(key)
+            omml_memo.put(key, omml)
+        return copy.deepcopy(omml) if omml is not None else None
+
+    def _cached_latex_to_omml(self, latex: str) -> Optional[etree._Element]:
+        """Convert through the persistent formula cache, if it is enabled."""
+        cache = get_formula_cache()
+        if cache is None:
+            return self._convert(latex)
+
+        cache_key = FormulaCache.make_key(
+            latex, converter_version(settings.FORMULA_BACKEND)
+        )
+        found, data = cache.get(cache_key)
+        if found:
+            count("formula_cache_hits")
+            return etree.fromstring(data) if data is not None else None
+
+        count("formula_cache_misses")
+        omml = self._convert(latex)
+        cache.put(cache_key, etree.tostring(omml) if omml is not None else None)
+        return omml
+
+    def _convert(self, latex: str) -> Optional[etree._Element]:
+        """
+        Convert LaTeX to OMML without caching: with the native builder
+        (FORMULA_BACKEND "native"), falling back to MathML for formulas it
+        cannot compile (counted as formula_native_fallbacks).
+        """
+        if settings.FORMULA_BACKEND == "native":
+            try:
+                return build_omml(latex)
+            except (LatexSyntaxError, RecursionError):
+                count("formula_native_fallbacks")
         mathml = self.latex_to_mathml(latex)
         if mathml:
             return self.mathml_to_omml(mathml)
@@ -155,137 +832,208 @@ class LaTeXConverter:
     def replace_latex_with_omml(self, para, match_start, match_end, omml_element):
         """
         Replace text in paragraph with OMML element.
-        This is a complex operation in python-docx because we need to split runs.
+
+        The offsets index the text of the paragraph's runs (see text_nodes);
+        runs are split at the match boundaries so the surrounding text keeps
+        its formatting.
         """
-        p = para._p
+        splice_omml(
+            para._p, text_nodes(para._p), [(match_start, match_end, omml_element)]
+        )
 
-        # 1. Remove the original text
-        # This is a simplification. robust implementation needs to handle runs carefully.
-        # For now, we'll assume the simple case where we can just clear the paragraph text
-        # around the match, but that's risky.
+    def process_document(self, doc: Document, paragraphs=None) -> list:
+        """
+        Find and convert LaTeX expressions in document.
 
-        # Better approach:
-        # 1. Clear the paragraph text (or the specific runs)
-        # 2. Rebuild the paragraph with: Text Before -> OMML -> Text After
+        ``paragraphs`` limits the scan to the given (index, paragraph) pairs,
+        e.g. the candidates of backend.engine.math_index; by default every
+        body paragraph is scanned.
 
-        original_text = para.text
-        text_before = original_text[:match_start]
-        text_after = original_text[match_end:]
+        Each paragraph's text is scanned once for every $$...$$, \\[...\\],
+        equation environment and $...$ span (FORMULA_PATTERN); the converted
+        formulas are spliced in at run boundaries. Formulas that fail to
+        convert are left as text.
 
-        # Clear all runs
-        for run in para.runs:
-            p.remove(run._r)
+        Returns list of fixes applied.
+        """
+        # 延迟导入：backend.engine 的规则模块反过来依赖本模块
+        from backend.engine.fixes import Fix
 
-        # Add text before
-        if text_before:
-            para.add_run(text_before)
+        fixes = []
 
-        # Add OMML
-        # We need to wrap OMML in a run-like structure or append directly to p
-        # Microsoft Word expects m:oMathPara for display math or m:oMath for inline
-        # inside the paragraph.
+        if paragraphs is None:
+            paragraphs = enumerate(doc.paragraphs)
+        for para_idx, para in paragraphs:
+            nodes = text_nodes(para._p)
+            text = "".join(t.text for _, t, _ in nodes)
+            # Every pattern needs a "$" or a backslash
+            if "$" not in text and "\\" not in text:
+                continue
 
-        # If display math, we might want a new paragraph, but here we stay in same para
-        # to minimize disruption.
+            spans = []
+            converted = []
+            for match in FORMULA_PATTERN.finditer(text):
+                math_type = match.lastgroup
+                latex_expr = match.group(math_type).strip()
+                omml = self.latex_to_omml(latex_expr)
+                if omml is None:
+                    continue
+                start, end = match.span()
+                spans.append((start, end, omml))
+                suffix = f"_{len(spans) - 1}" if len(spans) > 1 else ""
+                converted.append(
+                    Fix(
+                        id=f"fix_latex_{para_idx}{suffix}",
+                        rule_id="latex_to_omml",
+                        description=f"Converted LaTeX: {latex_expr[:30]}",
+                        paragraphs=para_idx,
+                        before=match.group(0),
+                        location={
+                            "paragraph_index": para_idx,
+                            "start": start,
+                            "end": end,
+                            "math_type": _MATH_TYPES[math_type],
+                        },
+                    )
+                )
+            if not spans:
+                continue
 
-        p.append(omml_element)
+            try:
+                splice_omml(para._p, nodes, spans)
+                fixes.extend(converted)
+            except Exception as e:
+                print(f"Error inserting OMML: {e}")
+                fixes.append(
+                    Fix(
+                        id=f"err_latex_{para_idx}",
+                        rule_id="latex_to_omml",
+                        description=f"Failed to insert formula: {e}",
+                        paragraphs=para_idx,
+                        location={
+                            "paragraph_index": para_idx,
+                            "status": "failed",
+                        },
+                    )
+                )
 
-        # Add text after
-        if text_after:
-            para.add_run(text_after)
+        # Commit the conversions buffered by the persistent formula cache
+        cache = get_formula_cache()
+        if cache is not None:
+            cache.flush()
+        return fixes
 
-    def process_document(self, doc: Document) -> list:
-        """
-        Find and convert LaTeX expressions in document.
 
-        Returns list of fixes applied.
-        """
-        fixes = []
+# All LaTeX delimiters in one pattern, so a paragraph is scanned once from
+# left to right. At the same position display math wins over inline math.
+FORMULA_PATTERN = re.compile(
+    r"\$\$(?P<dollars>.+?)\$\$"
+    r"|\\\[(?P<brackets>.+?)\\\]"
+    r"|\\begin\{equation\}(?P<equation>.+?)\\end\{equation\}"
+    r"|\$(?P<inline>.+?)\$",
+    re.DOTALL,
+)
+_MATH_TYPES = {
+    "dollars": "display",
+    "brackets": "display",
+    "equation": "display",
+    "inline": "inline",
+}
 
-        # LaTeX patterns
-        # Order matters! Check for display math first
-        patterns = [
-            (r"\$\$(.+?)\$\$", "display"),  # Display math $$...$$
-            (r"\\\[(.+?)\\\]", "display"),  # Display math \[...\]
-            (r"\\begin\{equation\}(.+?)\\end\{equation\}", "display"),  # equation env
-            (r"\$(.+?)\$", "inline"),  # Inline math $...$
-        ]
-
-        # Iterate backwards to avoid index shifting issues when replacing
-        # But python-docx doesn't support easy replacement, so we might need a different strategy.
-        # Since we are modifying the paragraph content entirely in replace_latex_with_omml,
-        # we need to be careful not to invalidate iteration.
-
-        # Safe strategy: Find one match, replace it, restart search in that paragraph?
-        # Or just one match per paragraph for MVP safety.
-
-        for para_idx, para in enumerate(doc.paragraphs):
-            # Skip if empty
-            if not para.text.strip():
-                continue
 
-            original_text = para.text
-
-            for pattern, math_type in patterns:
-                # Find *one* match per paragraph to keep it safe for MVP
-                # A full recurring search is harder because we modify valid ranges
-                match = re.search(pattern, original_text, re.DOTALL)
-
-                if match:
-                    latex_expr = match.group(1).strip()
-                    match.group(0)
-                    start, end = match.span()
-
-                    # Try OMML conversion
-                    omml = self.latex_to_omml(latex_expr)
-
-                    if omml is not None:
-                        try:
-                            self.replace_latex_with_omml(para, start, end, omml)
-
-                            fixes.append(
-                                {
-                                    "id": f"fix_latex_{para_idx}",
-                                    "rule_id": "latex_to_omml",
-                                    "description": f"Converted LaTeX: {latex_expr[:30]}",
-                                    "paragraph_indices": [para_idx],
-                                    "before": match.group(0),
-                                    "after": None,
-                                    "location": {
-                                        "paragraph_index": para_idx,
-                                        "start": start,
-                                        "end": end,
-                                        "math_type": math_type,
-                                    },
-                                }
-                            )
-
-                            # Break inner loop to move to next paragraph
-                            # (Limitation: Only 1 formula per paragraph supported in MVP)
-                            break
-                        except Exception as e:
-                            print(f"Error inserting OMML: {e}")
-                            fixes.append(
-                                {
-                                    "id": f"err_latex_{para_idx}",
-                                    "rule_id": "latex_to_omml",
-                                    "description": f"Failed to insert formula: {e}",
-                                    "status": "failed",
-                                }
-                            )
+def text_nodes(p) -> List[Tuple[etree._Element, etree._Element, int]]:
+    """
+    (run, w:t, offset) of the non-empty text nodes of a paragraph's runs, in
+    document order; offsets index the concatenated text. Text in fields,
+    hyperlinks and other containers is not included.
+    """
+    nodes = []
+    offset = 0
+    for run in p.iterchildren(qn("w:r")):
+        for t in run.iterchildren(qn("w:t")):
+            if t.text:
+                nodes.append((run, t, offset))
+                offset += len(t.text)
+    return nodes
 
-        return fixes
+
+def splice_omml(p, nodes, spans):
+    """
+    Replace text spans of a paragraph with OMML elements.
+
+    ``nodes`` comes from text_nodes(p) and ``spans`` is a list of
+    non-overlapping (start, end, omml) in ascending order. Runs are split at
+    the span boundaries (keeping their properties) and the runs between them
+    are replaced by the OMML, so the rest of the paragraph is untouched.
+    Spans are spliced from the last to the first, which leaves the nodes
+    before each boundary valid; the whole paragraph is walked once.
+    """
+    index = len(nodes) - 1
+
+    def boundary(position):
+        # First paragraph child after the text position (None at the end)
+        nonlocal index
+        while index > 0 and nodes[index][2] >= position:
+            index -= 1
+        run, t, offset = nodes[index]
+        return _split_run(run, t, position - offset)
+
+    for start, end, omml in reversed(spans):
+        after = boundary(end)
+        first = boundary(start)
+        first.addprevious(omml)
+        element = first
+        while element is not None and element is not after:
+            following = element.getnext()
+            if element.tag == qn("w:r"):
+                p.remove(element)
+            element = following
+
+
+def _split_run(run, t, k: int):
+    """
+    Split ``run`` before character ``k`` of its text node ``t`` and return
+    the paragraph child that follows the split point (None at the end).
+    """
+    children = list(run)
+    index = children.index(t)
+    if k == 0:
+        if all(child.tag == qn("w:rPr") for child in children[:index]):
+            return run
+        tail = children[index:]
+    elif k >= len(t.text):
+        tail = children[index + 1 :]
+        if not tail:
+            return run.getnext()
+    else:
+        rest = OxmlElement("w:t")
+        rest.text = t.text[k:]
+        t.text = t.text[:k]
+        for node in (t, rest):
+            if node.text != node.text.strip():
+                node.set(qn("xml:space"), "preserve")
+        tail = [rest] + children[index + 1 :]
+
+    new_run = OxmlElement("w:r")
+    r_pr = run.find(qn("w:rPr"))
+    if r_pr is not None:
+        new_run.append(copy.deepcopy(r_pr))
+    new_run.extend(tail)
+    run.addnext(new_run)
+    return new_run
 
 
-def convert_latex_in_document(doc: Document) -> list:
+def convert_latex_in_document(doc: Document, paragraphs=None) -> list:
     """
     Convenience function to process LaTeX in a document.
 
     Args:
         doc: python-docx Document object
+        paragraphs: optional (index, paragraph) pairs to scan instead of
+            all body paragraphs
 
     Returns:
         List of fixes applied
     """
     converter = LaTeXConverter()
-    return converter.process_document(doc)
+    return converter.process_document(doc, paragraphs)
@@ -3,12 +3,114 @@ Markdown to Word Converter
 Converts Markdown files to Word documents with proper formatting.
 """
 
+import copy
+import io
 import re
+import threading
+import zipfile
 from pathlib import Path
+from typing import Iterable, Iterator, Optional, TextIO, Tuple
+
+import docx
 from docx import Document
-from docx.shared import Pt, Inches, RGBColor
+from docx.shared import Emu, Pt, Inches, RGBColor
 from docx.oxml.ns import qn
 from docx.oxml import OxmlElement
+from docx.oxml.table import CT_Tbl
+from docx.text.run import Run
+from lxml import etree
+from backend.core.config import settings
+from backend.core.markdown_inline import BOLD, CODE, ITALIC, LINK, tokenize_inline
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.+)$")
+_UNORDERED_ITEM = re.compile(r"^[\s]*[-*+]\s+")
+_ORDERED_ITEM = re.compile(r"^[\s]*\d+\.\s+")
+
+# Block kind (statistics key) -> MarkdownConverter method adding it
+_BLOCK_HANDLERS = {
+    "headings": "_add_heading",
+    "paragraphs": "_add_paragraph",
+    "code_blocks": "_add_code_block",
+    "lists": "_add_list_item",
+    "tables": "_add_table",
+    "blockquotes": "_add_blockquote",
+}
+
+
+def read_lines(f: TextIO) -> Iterator[str]:
+    """
+    Lines of an open text file without their line ends, read incrementally.
+
+    Yields the same lines as ``f.read().split("\\n")``, including the empty
+    last line after a trailing newline.
+    """
+    line = ""
+    for line in f:
+        if line.endswith("\n"):
+            yield line[:-1]
+        else:
+            yield line
+    if not line or line.endswith("\n"):
+        yield ""
+
+
+def parse_blocks(lines: Iterable[str]) -> Iterator[Tuple[str, tuple]]:
+    """
+    Split Markdown lines into blocks.
+
+    The lines are consumed as the blocks are produced, with one line of
+    lookahead (a table starts at a line followed by its separator); only the
+    lines of the current block are held.
+
+    Yields:
+        (kind, arguments of the _BLOCK_HANDLERS method for that kind)
+    """
+    lines = iter(lines)
+    line = next(lines, None)
+    while line is not None:
+        following = next(lines, None)
+
+        # Skip empty lines
+        if not line.strip():
+            line = following
+            continue
+
+        # Code block (the closing fence is consumed)
+        if line.strip().startswith("```"):
+            lang = line.strip()[3:]
+            code_lines = []
+            while following is not None and not following.strip().startswith("```"):
+                code_lines.append(following)
+                following = next(lines, None)
+            yield "code_blocks", ("\n".join(code_lines), lang)
+            line = next(lines, None) if following is not None else None
+            continue
+
+        # Heading
+        heading_match = _HEADING.match(line)
+        if heading_match:
+            level = len(heading_match.group(1))
+            yield "headings", (heading_match.group(2), level)
+        # Blockquote
+        elif line.strip().startswith(">"):
+            yield "blockquotes", (line.strip()[1:].strip(),)
+        # Unordered list
+        elif _UNORDERED_ITEM.match(line):
+            yield "lists", (line, False)
+        # Ordered list
+        elif _ORDERED_ITEM.match(line):
+            yield "lists", (line, True)
+        # Table
+        elif "|" in line and following is not None and "---" in following:
+            table_lines = [line]
+            while following is not None and "|" in following:
+                table_lines.append(following)
+                following = next(lines, None)
+            yield "tables", (table_lines,)
+        # Regular paragraph
+        else:
+            yield "paragraphs", (line,)
+        line = following
 
 
 class MarkdownConverter:
@@ -18,21 +120,30 @@ class MarkdownConverter:
         self.doc = None
         self.current_list_level = 0
 
-    def convert(self, markdown_path: Path, output_path: Path) -> dict:
+    def convert(self, markdown_path: Path, output_path: Optional[Path] = None) -> dict:
         """
         Convert Markdown file to Word document.
 
+        The resulting document stays available as ``self.doc``; it is only
+        written to disk when ``output_path`` is given.
+
         Args:
             markdown_path: Path to the Markdown file
-            output_path: Path for the output Word document
+            output_path: Optional path for the output Word document
 
         Returns:
             dict with conversion statistics
         """
+        self.doc = self._new_document()
         with open(markdown_path, "r", encoding="utf-8") as f:
-            content = f.read()
+            stats = self._add_blocks(f)
+        self._finish_document()
+        if output_path is not None:
+            self.doc.save(output_path)
+        return stats
 
-        self.doc = Document()
+    def _add_blocks(self, f: TextIO) -> dict:
+        """Add the blocks of an open Markdown file; return the statistics."""
         stats = {
             "headings": 0,
             "paragraphs": 0,
@@ -41,150 +152,56 @@ class MarkdownConverter:
             "tables": 0,
             "blockquotes": 0,
         }
-
-        lines = content.split("\n")
-        i = 0
-
-        while i < len(lines):
-            line = lines[i]
-
-            # Skip empty lines
-            if not line.strip():
-                i += 1
-                continue
-
-            # Code block
-            if line.strip().startswith("```"):
-                code_lines = []
-                lang = line.strip()[3:]
-                i += 1
-                while i < len(lines) and not lines[i].strip().startswith("```"):
-                    code_lines.append(lines[i])
-                    i += 1
-                self._add_code_block("\n".join(code_lines), lang)
-                stats["code_blocks"] += 1
-                i += 1
-                continue
-
-            # Heading
-            heading_match = re.match(r"^(#{1,6})\s+(.+)$", line)
-            if heading_match:
-                level = len(heading_match.group(1))
-                text = heading_match.group(2)
-                self._add_heading(text, level)
-                stats["headings"] += 1
-                i += 1
-                continue
-
-            # Blockquote
-            if line.strip().startswith(">"):
-                quote_text = line.strip()[1:].strip()
-                self._add_blockquote(quote_text)
-                stats["blockquotes"] += 1
-                i += 1
-                continue
-
-            # Unordered list
-            if re.match(r"^[\s]*[-*+]\s+", line):
-                self._add_list_item(line, ordered=False)
-                stats["lists"] += 1
-                i += 1
-                continue
-
-            # Ordered list
-            if re.match(r"^[\s]*\d+\.\s+", line):
-                self._add_list_item(line, ordered=True)
-                stats["lists"] += 1
-                i += 1
-                continue
-
-            # Table
-            if "|" in line and i + 1 < len(lines) and "---" in lines[i + 1]:
-                table_lines = [line]
-                i += 1
-                while i < len(lines) and "|" in lines[i]:
-                    table_lines.append(lines[i])
-                    i += 1
-                self._add_table(table_lines)
-                stats["tables"] += 1
-                continue
-
-            # Regular paragraph
-            self._add_paragraph(line)
-            stats["paragraphs"] += 1
-            i += 1
-
-        self.doc.save(output_path)
+        for kind, args in parse_blocks(read_lines(f)):
+            getattr(self, _BLOCK_HANDLERS[kind])(*args)
+            stats[kind] += 1
+            self._block_added()
         return stats
 
+    def _new_document(self) -> Document:
+        """Empty document the content is added to."""
+        return Document()
+
+    def _block_added(self):
+        """Called after each Markdown block has been added."""
+
+    def _finish_document(self):
+        """Called once all content has been added."""
+
+    def _new_paragraph(self, style: str = None):
+        """Append an empty paragraph with the given style name."""
+        return self.doc.add_paragraph(style=style)
+
     def _add_heading(self, text: str, level: int):
         """Add heading to document."""
         style_name = f"Heading {level}"
-        para = self.doc.add_paragraph(style=style_name)
+        para = self._new_paragraph(style_name)
         self._add_formatted_text(para, text)
 
     def _add_paragraph(self, text: str):
         """Add paragraph with inline formatting."""
-        para = self.doc.add_paragraph()
+        para = self._new_paragraph()
         self._add_formatted_text(para, text)
 
     def _add_formatted_text(self, para, text: str):
         """Parse and add formatted text (bold, italic, code, links)."""
-        # Pattern for inline formatting
-        patterns = [
-            (r"\*\*\*(.+?)\*\*\*", "bold_italic"),  # Bold italic
-            (r"\*\*(.+?)\*\*", "bold"),  # Bold
-            (r"\*(.+?)\*", "italic"),  # Italic
-            (r"`(.+?)`", "code"),  # Inline code
-            (r"\[(.+?)\]\((.+?)\)", "link"),  # Link
-        ]
-
-        # Simple approach: just add text with basic formatting detection
-        remaining = text
-
-        while remaining:
-            # Find the earliest match
-            earliest_match = None
-            earliest_type = None
-            earliest_pos = len(remaining)
-
-            for pattern, fmt_type in patterns:
-                match = re.search(pattern, remaining)
-                if match and match.start() < earliest_pos:
-                    earliest_match = match
-                    earliest_type = fmt_type
-                    earliest_pos = match.start()
-
-            if earliest_match:
-                # Add text before match
-                if earliest_pos > 0:
-                    para.add_run(remaining[:earliest_pos])
-
-                # Add formatted text
-                if earliest_type == "bold":
-                    run = para.add_run(earliest_match.group(1))
-                    run.bold = True
-                elif earliest_type == "italic":
-                    run = para.add_run(earliest_match.group(1))
-                    run.italic = True
-                elif earliest_type == "bold_italic":
-                    run = para.add_run(earliest_match.group(1))
-                    run.bold = True
-                    run.italic = True
-                elif earliest_type == "code":
-                    run = para.add_run(earliest_match.group(1))
-                    run.font.name = "Consolas"
-                    run.font.size = Pt(10)
-                elif earliest_type == "link":
-                    run = para.add_run(earliest_match.group(1))
-                    run.font.color.rgb = RGBColor(0, 102, 204)
-                    run.underline = True
-
-                remaining = remaining[earliest_match.end() :]
-            else:
-                # No more matches, add remaining text
-                para.add_run(remaining)
-                break
+        # One run per formatted segment (see backend.core.markdown_inline)
+        for segment, style in tokenize_inline(text):
+            self._format_run(para.add_run(segment), style)
+
+    @staticmethod
+    def _format_run(run, style: int):
+        """Apply inline style flags (see backend.core.markdown_inline) to a run."""
+        if style & BOLD:
+            run.bold = True
+        if style & ITALIC:
+            run.italic = True
+        if style & CODE:
+            run.font.name = "Consolas"
+            run.font.size = Pt(10)
+        if style & LINK:
+            run.font.color.rgb = RGBColor(0, 102, 204)
+            run.underline = True
 
     def _add_code_block(self, code: str, language: str = None):
         """Add code block with monospace font."""
@@ -220,11 +237,12 @@ class MarkdownConverter:
         if match:
             text = match.group(1)
             style = "List Number" if ordered else "List Bullet"
-            para = self.doc.add_paragraph(style=style)
+            para = self._new_paragraph(style)
             self._add_formatted_text(para, text)
 
-    def _add_table(self, lines: list):
-        """Add table from Markdown table syntax."""
+    @staticmethod
+    def _parse_table(lines: list) -> Tuple[list, list]:
+        """Markdown table lines -> (header cells, data rows of cells)."""
         # Parse header row
         headers = [cell.strip() for cell in lines[0].split("|") if cell.strip()]
 
@@ -236,37 +254,329 @@ class MarkdownConverter:
                 cells = [cell.strip() for cell in line.split("|") if cell.strip()]
                 if cells:
                     data_rows.append(cells)
+        return headers, data_rows
+
+    @staticmethod
+    def _column_hints(lines: list) -> Optional[list]:
+        """
+        Relative column widths from the dashes of the separator row, if
+        settings.MARKDOWN_TABLE_WIDTH_HINTS is on and there is one per column.
+        """
+        if not settings.MARKDOWN_TABLE_WIDTH_HINTS or len(lines) < 2:
+            return None
+        columns = [cell.strip() for cell in lines[1].split("|") if cell.strip()]
+        return [column.count("-") or 1 for column in columns]
 
+    def _add_table(self, lines: list):
+        """Add table from Markdown table syntax."""
+        headers, data_rows = self._parse_table(lines)
         if not headers:
             return
 
-        # Create table
-        table = self.doc.add_table(rows=len(data_rows) + 1, cols=len(headers))
+        # Rows are built in bulk: table.rows[i] and row.cells walk the table
+        # on every access, which made large tables quadratic
+        table = self.doc.add_table(rows=0, cols=len(headers))
         table.style = "Table Grid"
+        fill_table(table._tbl, headers, data_rows, self._column_hints(lines))
+
+
+# Process-wide templates for OoxmlMarkdownConverter (built on first use)
+_templates = None
+_templates_lock = threading.Lock()
+
+_W_P = qn("w:p")
+_W_R = qn("w:r")
+_W_T = qn("w:t")
+_W_TAB = qn("w:tab")
+_W_BR = qn("w:br")
+_W_TR = qn("w:tr")
+_W_TC = qn("w:tc")
+_W_TCPR = qn("w:tcPr")
+_W_TCW = qn("w:tcW")
+_W_TYPE = qn("w:type")
+_W_W = qn("w:w")
+_XML_SPACE = qn("xml:space")
+_RUN_BREAKS = re.compile(r"([\t\r\n])")
+
+
+class _Templates:
+    """
+    The default template package and property elements for
+    OoxmlMarkdownConverter.
+
+    The elements are produced once by MarkdownConverter itself on a scratch
+    document, so both backends format content identically. They are shared
+    between threads and only ever deep-copied.
+    """
+
+    def __init__(self):
+        self.path = Path(docx.__file__).parent / "templates" / "default.docx"
+        self.package = self.path.read_bytes()
+
+        scratch = MarkdownConverter()
+        scratch.doc = Document(io.BytesIO(self.package))
+        self._scratch = scratch
+        self._paragraph_properties = {}
+
+        # w:rPr for every combination of inline style flags (None if empty)
+        self.run_properties = []
+        for style in range((BOLD | ITALIC | CODE | LINK) + 1):
+            r = OxmlElement("w:r")
+            MarkdownConverter._format_run(Run(r, None), style)
+            self.run_properties.append(r.rPr)
+
+        scratch._add_code_block("x")
+        self.code_block = self._last_block(scratch.doc)
+        scratch._add_blockquote("x")
+        self.blockquote = self._last_block(scratch.doc)
+        scratch._add_table(["| x |", "|---|"])
+        self.table_properties = scratch.doc.tables[-1]._tbl.tblPr
+
+        section = scratch.doc.sections[-1]
+        self.block_width = Emu(
+            (section.page_width or Inches(8.5))
+            - (section.left_margin or Inches(1))
+            - (section.right_margin or Inches(1))
+        )
+
+    @staticmethod
+    def _last_block(doc) -> Tuple[object, object]:
+        """(w:pPr, w:rPr) of the last paragraph of ``doc``."""
+        p = doc.paragraphs[-1]._p
+        return p.pPr, p.r_lst[0].rPr
+
+    def paragraph_properties(self, style: Optional[str]):
+        """w:pPr of a paragraph with the given style name (None if empty)."""
+        if style not in self._paragraph_properties:
+            with _templates_lock:
+                p = self._scratch._new_paragraph(style)._p
+                self._paragraph_properties[style] = p.pPr
+        return self._paragraph_properties[style]
+
+
+def _get_templates() -> _Templates:
+    global _templates
+    if _templates is None:
+        with _templates_lock:
+            if _templates is None:
+                _templates = _Templates()
+    return _templates
+
+
+def _append_run(p, text: str, rPr):
+    """
+    Append a w:r with a copy of ``rPr`` and ``text`` to ``p``, with the
+    same content python-docx creates for Paragraph.add_run(text).
+    """
+    r = etree.SubElement(p, _W_R)
+    if rPr is not None:
+        r.append(copy.deepcopy(rPr))
+    if not text:
+        return
+    pieces = _RUN_BREAKS.split(text) if _RUN_BREAKS.search(text) else (text,)
+    for piece in pieces:
+        if piece == "\t":
+            etree.SubElement(r, _W_TAB)
+        elif piece == "\r" or piece == "\n":
+            etree.SubElement(r, _W_BR)
+        elif piece:
+            t = etree.SubElement(r, _W_T)
+            t.text = piece
+            if len(piece.strip()) < len(piece):
+                t.set(_XML_SPACE, "preserve")
+
+
+def fill_table(tbl, headers: list, data_rows: list, column_widths: list = None):
+    """
+    Append a bold header row and the data rows to a w:tbl without rows, in
+    one pass over the cells.
 
-        # Add headers
-        header_row = table.rows[0]
-        for i, header in enumerate(headers):
-            if i < len(header_row.cells):
-                cell = header_row.cells[i]
-                cell.text = header
-                # Bold header
-                for para in cell.paragraphs:
-                    for run in para.runs:
-                        run.bold = True
-
-        # Add data
-        for row_idx, row_data in enumerate(data_rows):
-            row = table.rows[row_idx + 1]
-            for col_idx, cell_text in enumerate(row_data):
-                if col_idx < len(row.cells):
-                    row.cells[col_idx].text = cell_text
+    Every row gets a cell per column; missing cells stay empty and extra
+    cells are dropped.
+
+    Args:
+        tbl: w:tbl with its grid, e.g. from CT_Tbl.new_tbl(0, columns, width)
+        headers: Header cell texts
+        data_rows: Cell texts of each data row
+        column_widths: Relative column widths; the total width of the grid is
+            split accordingly. By default the grid is kept as it is.
+    """
+    grid = tbl.tblGrid.gridCol_lst
+    if column_widths is not None and len(column_widths) == len(grid):
+        total = sum(int(col.get(_W_W)) for col in grid)
+        weight = sum(column_widths)
+        for col, width in zip(grid, column_widths):
+            col.set(_W_W, str(total * width // weight))
+    widths = [col.get(_W_W) for col in grid]
+
+    bold = OxmlElement("w:rPr")
+    bold.append(OxmlElement("w:b"))
+    rows = [(headers, bold)]
+    rows.extend((cells, None) for cells in data_rows)
+    for cells, rPr in rows:
+        tr = etree.SubElement(tbl, _W_TR)
+        for i, width in enumerate(widths):
+            tc = etree.SubElement(tr, _W_TC)
+            tcW = etree.SubElement(etree.SubElement(tc, _W_TCPR), _W_TCW)
+            tcW.set(_W_TYPE, "dxa")
+            tcW.set(_W_W, width)
+            p = etree.SubElement(tc, _W_P)
+            if i < len(cells):
+                _append_run(p, cells[i], rPr)
+
+
+class OoxmlMarkdownConverter(MarkdownConverter):
+    """
+    MarkdownConverter that builds w:body with lxml element factories.
+
+    The python-docx backend creates proxy objects and walks the body for
+    every paragraph, run and formatting property it adds. Here paragraphs
+    and runs are appended to the body directly, with copies of pre-built
+    w:pPr / w:rPr templates, into a document opened from the cached
+    template package. The resulting XML is the same as MarkdownConverter's.
+    """
+
+    def _new_document(self) -> Document:
+        self._templates = _get_templates()
+        doc = Document(io.BytesIO(self._templates.package))
+        self._body = doc.element.body
+        # Content is appended; the section properties go back to the end
+        self._sect_pr = self._body.sectPr
+        if self._sect_pr is not None:
+            self._body.remove(self._sect_pr)
+        return doc
+
+    def _finish_document(self):
+        if self._sect_pr is not None:
+            self._body.append(self._sect_pr)
+
+    def _new_paragraph(self, style: str = None):
+        p = etree.SubElement(self._body, _W_P)
+        pPr = self._templates.paragraph_properties(style)
+        if pPr is not None:
+            p.append(copy.deepcopy(pPr))
+        return p
+
+    def _add_formatted_text(self, para, text: str):
+        run_properties = self._templates.run_properties
+        for segment, style in tokenize_inline(text):
+            _append_run(para, segment, run_properties[style])
+
+    def _add_block(self, text: str, template):
+        pPr, rPr = template
+        p = etree.SubElement(self._body, _W_P)
+        p.append(copy.deepcopy(pPr))
+        _append_run(p, text, rPr)
+
+    def _add_code_block(self, code: str, language: str = None):
+        self._add_block(code, self._templates.code_block)
+
+    def _add_blockquote(self, text: str):
+        self._add_block(text, self._templates.blockquote)
+
+    def _add_table(self, lines: list):
+        headers, data_rows = self._parse_table(lines)
+        if not headers:
+            return
+
+        tbl = CT_Tbl.new_tbl(0, len(headers), self._templates.block_width)
+        tbl.replace(tbl.tblPr, copy.deepcopy(self._templates.table_properties))
+        fill_table(tbl, headers, data_rows, self._column_hints(lines))
+        self._body.append(tbl)
+
+
+# Body children StreamingMarkdownConverter serializes together
+_FLUSH_BLOCKS = 256
+
+
+class StreamingMarkdownConverter(OoxmlMarkdownConverter):
+    """
+    OoxmlMarkdownConverter that writes the output package while the Markdown
+    file is read.
+
+    Blocks are built in a backend.core.streaming.BodyWriter and serialized
+    into word/document.xml of the output archive in batches of _FLUSH_BLOCKS,
+    so memory does not grow with the size of the input. ``self.doc`` ends up
+    with an empty body.
+    """
+
+    def convert(self, markdown_path: Path, output_path: Optional[Path] = None) -> dict:
+        from backend.core.docx_package import save_document
+        from backend.core.streaming import BodyWriter
+
+        if output_path is None:
+            raise ValueError("Streaming conversion needs an output path")
+
+        self.doc = self._new_document()
+        stats = {}
+
+        def write_document(output, source):
+            self._writer = BodyWriter(self._body, output)
+            # Blocks are built in the writer's stand-in for w:body
+            self._body = self._writer.body
+            self._pending = 0
+            with open(markdown_path, "r", encoding="utf-8") as f:
+                stats.update(self._add_blocks(f))
+            self._finish_document()
+            self._writer.flush()
+            self._writer.close()
+
+        # The body XML is several times the size of the Markdown
+        large = Path(markdown_path).stat().st_size >= zipfile.ZIP64_LIMIT // 8
+        save_document(
+            self.doc,
+            output_path,
+            source_path=self._templates.path,
+            document_writer=write_document,
+            large_document=large,
+        )
+        return stats
+
+    def _block_added(self):
+        self._pending += 1
+        if self._pending >= _FLUSH_BLOCKS:
+            self._writer.flush()
+            self._pending = 0
+
+
+def should_stream_markdown(md_path: Path) -> bool:
+    """Whether ``md_path`` reaches settings.MARKDOWN_STREAMING_MIN_BYTES."""
+    if settings.MARKDOWN_STREAMING_MIN_BYTES is None:
+        return False
+    if settings.MARKDOWN_BACKEND != "ooxml":
+        return False
+    return Path(md_path).stat().st_size >= settings.MARKDOWN_STREAMING_MIN_BYTES
+
+
+def markdown_converter() -> MarkdownConverter:
+    """Converter for the backend selected by settings.MARKDOWN_BACKEND."""
+    if settings.MARKDOWN_BACKEND == "ooxml":
+        return OoxmlMarkdownConverter()
+    return MarkdownConverter()
+
+
+def markdown_to_document(md_path: Path) -> Tuple[Document, dict]:
+    """
+    Convert Markdown to an in-memory Word document without touching disk.
+
+    Args:
+        md_path: Path to Markdown file
+
+    Returns:
+        (document, conversion statistics)
+    """
+    converter = markdown_converter()
+    stats = converter.convert(md_path)
+    return converter.doc, stats
 
 
 def convert_markdown_to_docx(md_path: Path, docx_path: Path) -> dict:
     """
     Convenience function to convert Markdown to Word.
 
+    Files of settings.MARKDOWN_STREAMING_MIN_BYTES and more are converted
+    with StreamingMarkdownConverter.
+
     Args:
         md_path: Path to Markdown file
         docx_path: Path for output Word file
@@ -274,23 +584,22 @@ def convert_markdown_to_docx(md_path: Path, docx_path: Path) -> dict:
     Returns:
         Conversion statistics
     """
-    converter = MarkdownConverter()
+    if should_stream_markdown(md_path):
+        return StreamingMarkdownConverter().convert(md_path, docx_path)
+    converter = markdown_converter()
     return converter.convert(md_path, docx_path)
 
 
-def convert_text_to_docx(txt_path: Path, docx_path: Path) -> dict:
+def text_to_document(txt_path: Path) -> Tuple[Document, dict]:
     """
-    Convert plain text file to Word document.
+    Convert plain text file to an in-memory Word document.
 
     Args:
         txt_path: Path to the text file
-        docx_path: Path for the output Word document
 
     Returns:
-        dict with conversion statistics
+        (document, conversion statistics)
     """
-    from docx import Document
-
     doc = Document()
     stats = {
         "paragraphs": 0,
@@ -320,5 +629,20 @@ def convert_text_to_docx(txt_path: Path, docx_path: Path) -> dict:
         doc.add_paragraph("\n".join(current_paragraph))
         stats["paragraphs"] += 1
 
+    return doc, stats
+
+
+def convert_text_to_docx(txt_path: Path, docx_path: Path) -> dict:
+    """
+    Convert plain text file to Word document.
+
+    Args:
+        txt_path: Path to the text file
+        docx_path: Path for the output Word document
+
+    Returns:
+        dict with conversion statistics
+    """
+    doc, stats = text_to_document(txt_path)
     doc.save(docx_path)
     return stats
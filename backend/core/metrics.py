@@ -0,0 +1,279 @@
+"""
+Process-wide processing metrics, served in Prometheus text format at /metrics.
+
+DocumentProcessor.process reports one "run" per document: stage timings
+(load/convert/rules/save) and per-rule timings and visit counters. Runs are
+aggregated here into histograms and counters.
+
+Code running inside a rule can report its own counters (e.g. cache hits)
+with count(); the processor collects them per rule with rule_counters().
+
+Pool worker processes do not serve /metrics: they buffer their runs
+(forward_to_parent) and the executor merges them into the parent process
+after each call (see backend.core.executor).
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Prometheus default buckets, extended for long documents
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# Per-thread stack of the counters being collected by rule_counters()
+_collecting = threading.local()
+
+
+@contextmanager
+def rule_counters() -> Iterator[Dict[str, float]]:
+    """
+    Collect the counters reported with count() by the code running in this
+    thread until the block exits.
+    """
+    stack = getattr(_collecting, "stack", None)
+    if stack is None:
+        stack = _collecting.stack = []
+    counters: Dict[str, float] = {}
+    stack.append(counters)
+    try:
+        yield counters
+    finally:
+        stack.pop()
+
+
+def count(name: str, amount: float = 1):
+    """Add to a counter of the innermost rule_counters() block, if any."""
+    stack = getattr(_collecting, "stack", None)
+    if stack:
+        counters = stack[-1]
+        counters[name] = counters.get(name, 0) + amount
+
+
+def hit_rates(counters: Dict[str, float]) -> Dict[str, float]:
+    """{"<x>": hits / lookups} for every "<x>_hits" / "<x>_misses" pair."""
+    rates = {}
+    for name, hits in counters.items():
+        if name.endswith("_hits"):
+            prefix = name[: -len("_hits")]
+            lookups = hits + counters.get(prefix + "_misses", 0)
+            if lookups:
+                rates[prefix] = round(hits / lookups, 4)
+    return rates
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+        for k, v in pairs
+    )
+    return "{" + body + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter family keyed by label values."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Histogram:
+    """Cumulative histogram family keyed by label values."""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        # labels -> [bucket counts..., sum, count]
+        self._values: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        entry = self._values.get(key)
+        if entry is None:
+            entry = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                entry[i] += 1
+        entry[-2] += value
+        entry[-1] += 1
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, entry in sorted(self._values.items()):
+            for bound, count in zip(self.buckets, entry):
+                le = ("le", _format_value(float(bound)))
+                lines.append(f"{self.name}_bucket{_format_labels(key, le)} {count}")
+            inf = ("le", "+Inf")
+            lines.append(f"{self.name}_bucket{_format_labels(key, inf)} {entry[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {entry[-2]!r}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {entry[-1]}")
+        return lines
+
+
+class ProcessingMetrics:
+    """Aggregated metrics for document processing runs."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._forwarding = False
+        self._pending: List[Dict[str, Any]] = []
+
+        self.documents = Counter(
+            "md2docx_documents_processed_total", "Documents processed."
+        )
+        self.stage_seconds = Histogram(
+            "md2docx_stage_duration_seconds",
+            "Time spent in each processing stage (load, convert, rules, save).",
+        )
+        self.rule_seconds = Histogram(
+            "md2docx_rule_duration_seconds", "Time spent executing each rule."
+        )
+        self.rule_paragraphs = Counter(
+            "md2docx_rule_paragraphs_visited_total",
+            "Paragraphs visited by traversal rules.",
+        )
+        self.rule_runs = Counter(
+            "md2docx_rule_runs_visited_total", "Runs visited by traversal rules."
+        )
+        self.rule_tables = Counter(
+            "md2docx_rule_tables_visited_total", "Tables visited by traversal rules."
+        )
+        self.rule_fixes = Counter(
+            "md2docx_rule_fixes_total", "Fix records produced by each rule."
+        )
+        self.rule_errors = Counter(
+            "md2docx_rule_errors_total", "Rule executions that raised an error."
+        )
+        self.rule_events = Counter(
+            "md2docx_rule_events_total",
+            "Events counted by rules, e.g. formula cache hits and misses.",
+        )
+        self.result_cache = Counter(
+            "md2docx_result_cache_lookups_total",
+            "Result cache lookups by outcome (hit or miss).",
+        )
+        self._families = [
+            self.documents,
+            self.stage_seconds,
+            self.rule_seconds,
+            self.rule_paragraphs,
+            self.rule_runs,
+            self.rule_tables,
+            self.rule_fixes,
+            self.rule_errors,
+            self.rule_events,
+            self.result_cache,
+        ]
+
+    def observe_run(self, run: Dict[str, Any]):
+        """
+        Record one processing run.
+
+        Args:
+            run: {"stages": {stage: ms}, "rules": [per-rule metrics]} as built
+                 by DocumentProcessor.process, with "result_cache": "hit" or
+                 "miss" when the result cache was consulted
+        """
+        with self._lock:
+            if self._forwarding:
+                self._pending.append(run)
+                return
+
+            self.documents.inc()
+            if run.get("result_cache"):
+                self.result_cache.inc(result=run["result_cache"])
+            for stage, ms in run.get("stages", {}).items():
+                self.stage_seconds.observe(ms / 1000, stage=stage)
+            for rule in run.get("rules", []):
+                rule_id = rule["rule_id"]
+                self.rule_seconds.observe(rule["duration_ms"] / 1000, rule=rule_id)
+                self.rule_fixes.inc(rule["fixes"], rule=rule_id)
+                if rule.get("error"):
+                    self.rule_errors.inc(rule=rule_id)
+                for counter, field in (
+                    (self.rule_paragraphs, "paragraphs"),
+                    (self.rule_runs, "runs"),
+                    (self.rule_tables, "tables"),
+                ):
+                    if rule.get(field) is not None:
+                        counter.inc(rule[field], rule=rule_id)
+                for event, amount in rule.get("counters", {}).items():
+                    self.rule_events.inc(amount, rule=rule_id, event=event)
+
+    def forward_to_parent(self):
+        """Buffer runs instead of aggregating them (pool worker processes)."""
+        with self._lock:
+            self._forwarding = True
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """Return and clear runs buffered since the last drain."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            return pending
+
+    def merge(self, runs: List[Dict[str, Any]]):
+        """Aggregate runs drained from a worker process."""
+        for run in runs:
+            self.observe_run(run)
+
+    def render(self, gauges: Optional[Dict[str, Tuple[str, float]]] = None) -> str:
+        """
+        Render all metrics in Prometheus text exposition format.
+
+        Args:
+            gauges: extra point-in-time values, {name: (help, value)}
+        """
+        lines = []
+        with self._lock:
+            for family in self._families:
+                lines.append(f"# HELP {family.name} {family.help}")
+                lines.append(f"# TYPE {family.name} {family.type_name}")
+                lines.extend(family.samples())
+        for name, (help_text, value) in (gauges or {}).items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Global metrics instance
+processing_metrics = ProcessingMetrics()
@@ -0,0 +1,331 @@
+"""
+Partitioned rule execution for a single large document.
+
+Partition-safe rules (BaseRule.can_partition) only touch the paragraph or
+table they visit, so the body of a large document can be cut into contiguous
+block ranges that are processed independently:
+
+1. The body's blocks are split into one range per worker, and each range is
+   serialized once, with namespaces declared on a wrapper root instead of
+   on every block.
+2. A worker process opens a *skeleton* package (the document with an empty
+   body, written once per rule group), inserts its blocks and runs the rules
+   with run_traversal(). Paragraph and table indices are offset so that fix
+   records match a whole-document run.
+3. The processed blocks are parsed back and spliced into the body in order,
+   and each rule's fix records are merged across partitions (merge_fixes).
+
+Everything else runs in the parent, in plan order, on the spliced body. That
+covers traversal rules that are not partition-safe (e.g. table_width, which
+reads the first section) and the document-global apply() rules (image caption
+and formula numbering counters, page layout). This sequential reconciliation
+step is cheap compared to the per-run rules.
+"""
+
+import copy
+import pickle
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Executor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, List, Optional, Tuple, Union
+
+from docx.oxml import parse_xml
+from docx.oxml.ns import qn
+from lxml import etree
+
+from backend.core.config import settings
+from backend.core.docx_package import open_document, required_parts, save_document
+from backend.core.executor import (
+    discard_partition_executor,
+    get_partition_executor,
+    in_pool_worker,
+    partition_worker_count,
+)
+from backend.engine.fixes import merge_fixes
+from backend.engine.traversal import run_traversal
+
+_P = qn("w:p")
+_TBL = qn("w:tbl")
+_SECT_PR = qn("w:sectPr")
+_BODY = qn("w:body")
+
+# (rule, fixes, error, elapsed seconds, (paragraphs, runs, tables))
+RuleOutcome = Tuple[Any, list, Optional[Exception], float, tuple]
+
+# Skeleton document cached per worker thread: ((path, parts), Document)
+_worker = threading.local()
+
+
+def traversal_outcomes(contexts) -> List[RuleOutcome]:
+    """RuleContexts from run_traversal() -> per-rule outcomes."""
+    return [
+        (
+            ctx.rule,
+            ctx.fixes,
+            ctx.error,
+            ctx.elapsed,
+            (ctx.paragraphs, ctx.runs, ctx.tables),
+        )
+        for ctx in contexts
+    ]
+
+
+def split_group(group) -> List[Tuple[bool, list]]:
+    """
+    Split a traversal group into consecutive runs of partitionable and
+    sequential rules, keeping priority order.
+
+    Traversal rules only modify the block they visit, so running the runs
+    one after another gives every block the same sequence of changes as one
+    fused walk.
+    """
+    runs: List[Tuple[bool, list]] = []
+    for rule, params in group:
+        partitionable = rule.can_partition(params)
+        if runs and runs[-1][0] == partitionable:
+            runs[-1][1].append((rule, params))
+        else:
+            runs.append((partitionable, [(rule, params)]))
+    return runs
+
+
+def partition_bounds(count: int, partitions: int) -> List[Tuple[int, int]]:
+    """Split range(count) into at most ``partitions`` contiguous, even ranges."""
+    partitions = max(1, min(partitions, count))
+    size, extra = divmod(count, partitions)
+    bounds = []
+    start = 0
+    for i in range(partitions):
+        stop = start + size + (1 if i < extra else 0)
+        bounds.append((start, stop))
+        start = stop
+    return bounds
+
+
+def _blocks(body) -> list:
+    """Body children, without the trailing section properties."""
+    blocks = list(body)
+    if blocks and blocks[-1].tag == _SECT_PR:
+        blocks.pop()
+    return blocks
+
+
+def _move_blocks(blocks, body):
+    """Move ``blocks`` to the end of ``body``, before its section properties."""
+    anchor = body[-1] if len(body) and body[-1].tag == _SECT_PR else None
+    if anchor is None:
+        body.extend(blocks)
+    else:
+        for block in blocks:
+            anchor.addprevious(block)
+
+
+def _portable(error: Optional[Exception]) -> Optional[Exception]:
+    """Rule errors cross the process boundary; keep them picklable."""
+    if error is None:
+        return None
+    try:
+        pickle.dumps(error)
+    except Exception:
+        return RuntimeError(f"{type(error).__name__}: {error}")
+    return error
+
+
+def run_partition(
+    skeleton_path: str,
+    parts,
+    group,
+    blocks_xml: bytes,
+    para_start: int,
+    table_start: int,
+):
+    """
+    Worker entry point: run ``group`` over one serialized block range.
+
+    Returns:
+        (processed blocks as serialized by the parent, per-rule
+        (fixes, error, elapsed, visits) in group order)
+    """
+    cached = getattr(_worker, "skeleton", None)
+    if cached is None or cached[0] != (skeleton_path, parts):
+        cached = ((skeleton_path, parts), open_document(skeleton_path, parts))
+        _worker.skeleton = cached
+    doc = cached[1]
+
+    body = doc.element.body
+    wrapper = parse_xml(blocks_xml)
+    _move_blocks(list(wrapper[0]), body)
+    try:
+        contexts = run_traversal(doc, group, para_start, table_start)
+    finally:
+        # Leave the cached skeleton empty for the next partition
+        _move_blocks(_blocks(body), wrapper[0])
+
+    results = [
+        (fixes, _portable(error), elapsed, visits)
+        for _, fixes, error, elapsed, visits in traversal_outcomes(contexts)
+    ]
+    return etree.tostring(wrapper), results
+
+
+class DocumentPartitioner:
+    """
+    Runs partition-safe traversal rules of one document on a process pool.
+
+    Use create() to get a partitioner only when partitioning pays off, and
+    close() it when the rules are done to remove the skeleton packages.
+    """
+
+    def __init__(
+        self,
+        doc,
+        executor: Executor,
+        partitions: int,
+        source_path: Union[str, Path, None] = None,
+    ):
+        self.doc = doc
+        self.executor = executor
+        self.partitions = partitions
+        self.source_path = source_path
+        self.groups = 0  # rule groups run partitioned
+        self._tmpdir: Optional[Path] = None
+
+    @classmethod
+    def create(
+        cls, doc, plan, source_path: Union[str, Path, None] = None
+    ) -> Optional["DocumentPartitioner"]:
+        """
+        Partitioner for ``doc``, or None if there is a single worker, the
+        body is smaller than settings.PARTITION_MIN_BLOCKS or no rule in the
+        plan can be partitioned.
+
+        Jobs already running in a pool worker (process executor or batch)
+        are never partitioned: each worker would start its own pool of
+        partition processes.
+        """
+        if in_pool_worker():
+            return None
+        workers = partition_worker_count()
+        if workers < 2 or len(doc.element.body) < settings.PARTITION_MIN_BLOCKS:
+            return None
+        if not any(rule.can_partition(params) for rule, params in plan):
+            return None
+        return cls(doc, get_partition_executor(), workers, source_path)
+
+    def close(self):
+        if self._tmpdir is not None:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+            self._tmpdir = None
+
+    def run(self, group) -> List[RuleOutcome]:
+        """
+        Run a group of partition-safe traversal rules over the body.
+
+        If the pool fails (e.g. a worker process died), the body is restored
+        and the group runs sequentially in this process instead.
+        """
+        if self.executor is None:
+            return traversal_outcomes(run_traversal(self.doc, group))
+
+        body = self.doc.element.body
+        blocks = _blocks(body)
+        skeleton = str(self._write_skeleton())
+        parts = required_parts(group)
+
+        # Move each range out of the body into its own wrapper and serialize it
+        root = self.doc.element
+        wrappers = []
+        jobs = []
+        para_index = table_index = 0
+        for start, stop in partition_bounds(len(blocks), self.partitions):
+            chunk = blocks[start:stop]
+            wrapper = etree.Element(root.tag, nsmap=root.nsmap)
+            etree.SubElement(wrapper, body.tag).extend(chunk)
+            wrappers.append(wrapper)
+            jobs.append((etree.tostring(wrapper), para_index, table_index))
+            for block in chunk:
+                if block.tag == _P:
+                    para_index += 1
+                elif block.tag == _TBL:
+                    table_index += 1
+
+        futures = []
+        try:
+            for blocks_xml, para_start, table_start in jobs:
+                futures.append(
+                    self.executor.submit(
+                        run_partition,
+                        skeleton,
+                        parts,
+                        group,
+                        blocks_xml,
+                        para_start,
+                        table_start,
+                    )
+                )
+            results = [future.result() for future in futures]
+        except Exception as e:
+            for future in futures:
+                future.cancel()
+            for wrapper in wrappers:
+                _move_blocks(list(wrapper[0]), body)
+            if isinstance(e, BrokenProcessPool):
+                discard_partition_executor(self.executor)
+            print(f"Partitioned processing failed, running sequentially: {e}")
+            self.executor = None
+            return traversal_outcomes(run_traversal(self.doc, group))
+
+        del wrappers
+        for blocks_xml, _ in results:
+            _move_blocks(list(parse_xml(blocks_xml)[0]), body)
+        self.groups += 1
+
+        outcomes = []
+        for i, (rule, _) in enumerate(group):
+            partials = [rule_results[i] for _, rule_results in results]
+            errors = [error for _, error, _, _ in partials if error is not None]
+            outcomes.append(
+                (
+                    rule,
+                    merge_fixes(fixes for fixes, _, _, _ in partials),
+                    errors[0] if errors else None,
+                    sum(elapsed for _, _, elapsed, _ in partials),
+                    tuple(map(sum, zip(*(visits for _, _, _, visits in partials)))),
+                )
+            )
+        return outcomes
+
+    def _write_skeleton(self) -> Path:
+        """
+        Save the document with an empty body for the workers to open.
+
+        Written again for every group, so rules that ran in between (e.g.
+        style edits) are visible to the workers.
+        """
+        if self._tmpdir is None:
+            self._tmpdir = Path(tempfile.mkdtemp(prefix="md2docx-partition-"))
+        path = self._tmpdir / f"skeleton-{self.groups}.docx"
+
+        # Swap a copy of the root with an empty body into the document part;
+        # detaching the real body from its tree would walk every element
+        root = self.doc.element
+        skeleton = etree.Element(root.tag, attrib=dict(root.attrib), nsmap=root.nsmap)
+        for child in root:
+            if child.tag != _BODY:
+                skeleton.append(copy.deepcopy(child))
+                continue
+            body = etree.SubElement(skeleton, _BODY)
+            if len(child) and child[-1].tag == _SECT_PR:
+                body.append(copy.deepcopy(child[-1]))
+
+        part = self.doc.part
+        element = part._element
+        part._element = skeleton
+        try:
+            save_document(self.doc, path, source_path=self.source_path)
+        finally:
+            part._element = element
+        return path
@@ -7,11 +7,50 @@ from docx.oxml.text.paragraph import CT_P
 from docx.text.paragraph import Paragraph
 from docx.oxml.table import CT_Tbl
 from docx.table import Table
+from backend.engine.fixes import fix_ranges
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
 
+class _RangeLookup:
+    """
+    Maps indices, queried in ascending order, to the fixes covering them.
+
+    Fix ranges are swept in order rather than expanded into a per-index
+    dict, so memory stays proportional to the number of ranges.
+    """
+
+    def __init__(self):
+        self._entries = []  # (start, order, stop, info)
+        self._sorted = False
+        self._pos = 0
+        self._active = []
+
+    def add(self, ranges, info):
+        order = len(self._entries)
+        for start, stop in ranges:
+            self._entries.append((start, order, stop, info))
+        self._sorted = False
+
+    def get(self, index):
+        if not self._sorted:
+            self._entries.sort(key=lambda entry: (entry[0], entry[1]))
+            self._sorted = True
+
+        entries = self._entries
+        while self._pos < len(entries) and entries[self._pos][0] <= index:
+            self._active.append(entries[self._pos])
+            self._pos += 1
+        if not self._active:
+            return None
+
+        self._active = [entry for entry in self._active if entry[2] > index]
+        if not self._active:
+            return None
+        return [entry[3] for entry in sorted(self._active, key=lambda e: e[1])]
+
+
 class DocxPreviewConverter:
     """
     Converts a DOCX file to a simplified HTML representation for preview purposes.
@@ -22,33 +61,19 @@ class DocxPreviewConverter:
             doc = Document(docx_path)
             html_parts = ['<div class="docx-preview">']
 
-            # Map fixes to indices for O(1) lookup
-            para_map = {}
-            table_map = {}
+            # Map fix ranges to paragraph/table indices (queried in order)
+            para_map = _RangeLookup()
+            table_map = _RangeLookup()
 
             if fixes:
                 for fix in fixes:
-                    rule_id = fix.get("rule_id", "unknown")
-                    desc = fix.get("description", "")
-                    fix_id = fix.get("id")
-
-                    # Map paragraph indices
-                    if "paragraph_indices" in fix:
-                        for idx in fix["paragraph_indices"]:
-                            if idx not in para_map:
-                                para_map[idx] = []
-                            para_map[idx].append(
-                                {"id": fix_id, "rule": rule_id, "desc": desc}
-                            )
-
-                    # Map table indices
-                    if "table_indices" in fix:
-                        for idx in fix["table_indices"]:
-                            if idx not in table_map:
-                                table_map[idx] = []
-                            table_map[idx].append(
-                                {"id": fix_id, "rule": rule_id, "desc": desc}
-                            )
+                    info = {
+                        "id": fix.get("id"),
+                        "rule": fix.get("rule_id", "unknown"),
+                        "desc": fix.get("description", ""),
+                    }
+                    para_map.add(fix_ranges(fix, "paragraph"), info)
+                    table_map.add(fix_ranges(fix, "table"), info)
 
             # Simple styles
             html_parts.append(
@@ -3,13 +3,22 @@ import shutil
 import uuid
 import json
 import os
+from pathlib import Path
 from fastapi import UploadFile
-from docx import Document
+from backend.core.cache import get_formula_cache, get_result_cache
 from backend.core.config import settings
+from backend.core.docx_package import open_document, required_parts, save_document
+from backend.core.metrics import hit_rates, processing_metrics, rule_counters
+from backend.core.partition import DocumentPartitioner, split_group, traversal_outcomes
+from backend.core.profiler import JobProfiler
+from backend.core.streaming import should_stream, stream_document
+from backend.engine.fixes import fix_to_dict, summarize_fixes
 from backend.engine.parser import RuleParser
 from backend.core.markdown_converter import (
     convert_markdown_to_docx,
-    convert_text_to_docx,
+    markdown_to_document,
+    should_stream_markdown,
+    text_to_document,
 )
 
 
@@ -35,6 +44,9 @@ class DocumentProcessor:
         preset_config: dict = None,
         strict: bool = False,
         verbose: bool = False,
+        metrics: bool = False,
+        profile: bool = False,
+        fix_summary: bool = False,
     ):
         """
         Process document with specified preset and options.
@@ -45,7 +57,47 @@ class DocumentProcessor:
             preset_config: Custom preset configuration (overrides preset_id)
             strict: Enable strict mode for more aggressive fixes
             verbose: Enable verbose logging
+            metrics: Include stage and per-rule timings/counters in the result
+            profile: Run under the profiler and save the profile next to the
+                     result (see backend.core.profiler)
+            fix_summary: Report one summary fix per rule instead of one per
+                         change
         """
+        # verbose/metrics/profile runs bypass the result cache so they
+        # describe a real run
+        use_cache = settings.RESULT_CACHE_ENABLED and not (
+            verbose or metrics or profile
+        )
+        options = dict(
+            strict=strict, verbose=verbose, metrics=metrics, fix_summary=fix_summary
+        )
+        if not profile:
+            return self._process(
+                document_id, preset_id, preset_config, use_cache=use_cache, **options
+            )
+
+        if not (settings.UPLOAD_DIR / document_id).exists():
+            raise FileNotFoundError("Document not found")
+
+        with JobProfiler() as profiler:
+            result = self._process(
+                document_id, preset_id, preset_config, use_cache=False, **options
+            )
+        result["profile"] = profiler.save(document_id)
+        self._save_result(settings.OUTPUT_DIR / f"{document_id}_result.json", result)
+        return result
+
+    def _process(
+        self,
+        document_id: str,
+        preset_id: str,
+        preset_config: dict,
+        strict: bool,
+        verbose: bool,
+        metrics: bool,
+        fix_summary: bool,
+        use_cache: bool,
+    ) -> dict:
         start_time = time.time()
         input_path = settings.UPLOAD_DIR / document_id
         logs = [] if verbose else None
@@ -57,72 +109,140 @@ class DocumentProcessor:
             logs.append(f"[INFO] Processing document: {document_id}")
             logs.append(f"[INFO] Strict mode: {strict}")
 
-        # Check if Markdown file - convert to Word first
-        md_stats = None
-        txt_stats = None
-        if document_id.lower().endswith(".md"):
-            # Convert Markdown to Word
-            temp_docx_path = settings.UPLOAD_DIR / f"{document_id}_converted.docx"
-            md_stats = convert_markdown_to_docx(input_path, temp_docx_path)
-            input_path = temp_docx_path
-        elif document_id.lower().endswith(".txt"):
-            # Convert plain text to Word
-            temp_docx_path = settings.UPLOAD_DIR / f"{document_id}_converted.docx"
-            txt_stats = convert_text_to_docx(input_path, temp_docx_path)
-            input_path = temp_docx_path
-
-        # Load Doc
-        doc = Document(input_path)
-
         # Load Rules
         # Priority: explicit config > preset_id > None
-        rules = {}
+        # Presets are compiled once and cached until presets.yaml changes
+        plan = []
         if preset_config:
             rules = preset_config.get(
                 "rules", preset_config
             )  # Handle if passed as full preset or just rules
+            plan = self.rule_parser.compile_rules(rules)
         elif preset_id:
-            preset = self.rule_parser.get_preset(preset_id)
-            if preset and "rules" in preset:
-                rules = preset["rules"]
+            plan = self.rule_parser.get_preset_plan(preset_id)
 
-        fixes = []
+        output_path = settings.OUTPUT_DIR / f"{document_id}_fixed.docx"
+        result_path = settings.OUTPUT_DIR / f"{document_id}_result.json"
 
-        # --- Rule Execution ---
-        if rules:
-            from backend.engine import registry
+        # Result cache: same content + same rules -> reuse the previous output
+        cache = None
+        cache_key = None
+        if use_cache:
+            cache = get_result_cache()
+            cache_key = cache.make_key(input_path, plan, strict, fix_summary)
+            result = cache.get(cache_key, output_path)
+            if result is not None:
+                result["document_id"] = document_id
+                result["duration_ms"] = int((time.time() - start_time) * 1000)
+                self._save_result(result_path, result)
+                processing_metrics.observe_run(
+                    {
+                        "stages": {"cache": result["duration_ms"]},
+                        "rules": [],
+                        "result_cache": "hit",
+                    }
+                )
+                return result
 
-            # Get all registered rules and sort by priority
-            registered_rules = sorted(
-                registry.get_all_rules(), key=lambda r: r.priority
+        stages = {}
+        rule_metrics = []
+        stage_start = time.perf_counter()
+
+        md_stats = None
+        txt_stats = None
+        source_path = input_path
+        if document_id.lower().endswith(".md") and should_stream_markdown(input_path):
+            # Huge Markdown: converted block by block into a .docx on disk,
+            # which is then processed like an uploaded Word document
+            source_path = settings.UPLOAD_DIR / f"{document_id}_converted.docx"
+            source_path.unlink(missing_ok=True)
+            md_stats = convert_markdown_to_docx(input_path, source_path)
+            stages["convert"] = _elapsed_ms(stage_start)
+            stage_start = time.perf_counter()
+        # .md / .txt uploads are otherwise converted in memory
+        is_converted = md_stats is None and document_id.lower().endswith(
+            (".md", ".txt")
+        )
+        streamed = not is_converted and should_stream(source_path, plan)
+        if streamed:
+            # Huge document.xml: rules run on each block while it is parsed
+            # and written, so the body is never loaded as a whole
+            output_path.unlink(missing_ok=True)
+            fixes, stream_stats = self._stream_rules(
+                source_path,
+                output_path,
+                plan,
+                strict,
+                logs,
+                rule_metrics,
+                summary=fix_summary,
             )
+            stages["stream"] = _elapsed_ms(stage_start)
+            if verbose:
+                logs.append(
+                    f"[INFO] Streamed {stream_stats['blocks']} blocks "
+                    f"(largest {stream_stats['max_block_bytes']} bytes), "
+                    f"{stream_stats['copied']} parts copied unchanged"
+                )
+        else:
+            # Check if Markdown file - convert to Word first (kept in memory)
+            if is_converted and document_id.lower().endswith(".md"):
+                # Convert Markdown to Word
+                doc, md_stats = markdown_to_document(input_path)
+            elif is_converted:
+                # Convert plain text to Word
+                doc, txt_stats = text_to_document(input_path)
+            else:
+                # Load Doc - package parts no enabled rule needs stay as raw zip entries
+                parts = required_parts(plan) if settings.LAZY_PACKAGE_LOADING else None
+                doc = open_document(source_path, parts)
+            stages["convert" if is_converted else "load"] = _elapsed_ms(stage_start)
+
+            fixes = []
 
-            for rule in registered_rules:
-                rule_config = rules.get(rule.id)
-                if rule_config and rule_config.get("enabled"):
-                    params = rule_config.get("parameters", {})
-                    # 严格模式下可以调整参数
-                    if strict:
-                        params = self._apply_strict_params(rule.id, params)
-                    try:
-                        if verbose:
-                            logs.append(f"[RULE] Applying: {rule.id} ({rule.name})")
-                        rule_fixes = rule.apply(doc, params)
-                        if rule_fixes:
-                            fixes.extend(rule_fixes)
-                            if verbose:
-                                logs.append(
-                                    f"[RULE] {rule.id}: {len(rule_fixes)} fixes applied"
-                                )
-                    except Exception as e:
-                        if verbose:
-                            logs.append(f"[ERROR] Rule {rule.id} failed: {e}")
-                        print(f"Error applying rule {rule.id}: {e}")
-
-        # Save Output
-        output_filename = f"{document_id}_fixed.docx"
-        output_path = settings.OUTPUT_DIR / output_filename
-        doc.save(output_path)
+            # --- Rule Execution ---
+            stage_start = time.perf_counter()
+            if plan:
+                # Large documents: partition-safe rules run on several processes
+                partitioner = DocumentPartitioner.create(
+                    doc, plan, source_path=None if is_converted else source_path
+                )
+                try:
+                    fixes.extend(
+                        self._execute_rules(
+                            doc,
+                            plan,
+                            strict,
+                            logs,
+                            rule_metrics,
+                            summary=fix_summary,
+                            partitioner=partitioner,
+                        )
+                    )
+                finally:
+                    if partitioner is not None:
+                        partitioner.close()
+                if verbose and partitioner is not None:
+                    logs.append(
+                        f"[INFO] Partitioned {partitioner.groups} rule groups over "
+                        f"{partitioner.partitions} processes"
+                    )
+            stages["rules"] = _elapsed_ms(stage_start)
+
+            # Save Output
+            # Unlink first: the old output may be a hard link into the result cache
+            stage_start = time.perf_counter()
+            # Members the rules did not modify are copied from the upload as-is
+            output_path.unlink(missing_ok=True)
+            save_stats = save_document(
+                doc, output_path, source_path=None if is_converted else source_path
+            )
+            stages["save"] = _elapsed_ms(stage_start)
+            if verbose:
+                logs.append(
+                    f"[INFO] Saved: {save_stats['written']} parts written, "
+                    f"{save_stats['copied']} copied unchanged"
+                )
 
         duration = int((time.time() - start_time) * 1000)
 
@@ -148,7 +268,7 @@ class DocumentProcessor:
                     "id": "fix_md_convert",
                     "rule_id": "markdown_conversion",
                     "description": f"Converted Markdown: {md_stats.get('headings', 0)} headings, {md_stats.get('paragraphs', 0)} paragraphs, {md_stats.get('tables', 0)} tables",
-                    "paragraph_indices": [],  # Global content
+                    "paragraph_ranges": [],  # Global content
                 },
             )
             result["total_fixes"] = len(fixes)
@@ -162,18 +282,214 @@ class DocumentProcessor:
                     "id": "fix_txt_convert",
                     "rule_id": "text_conversion",
                     "description": f"Converted plain text: {txt_stats.get('paragraphs', 0)} paragraphs, {txt_stats.get('lines', 0)} lines",
-                    "paragraph_indices": [],  # Global content
+                    "paragraph_ranges": [],  # Global content
                 },
             )
             result["total_fixes"] = len(fixes)
 
+        # Compact Fix records -> plain dicts for the JSON result
+        result["fixes"] = [fix_to_dict(fix) for fix in fixes]
+
+        run_metrics = {"stages": stages, "rules": rule_metrics}
+        if metrics:
+            result["metrics"] = run_metrics
+
         # Save Result Metadata
-        result_path = settings.OUTPUT_DIR / f"{document_id}_result.json"
-        with open(result_path, "w", encoding="utf-8") as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
+        self._save_result(result_path, result)
+        # The cache outcome travels with the run, so lookups in pool workers
+        # reach the parent's /metrics
+        observed = run_metrics
+        if cache is not None:
+            observed = {**run_metrics, "result_cache": "miss"}
+        processing_metrics.observe_run(observed)
+
+        if cache is not None:
+            cache.put(cache_key, output_path, result)
 
         return result
 
+    def _save_result(self, result_path: Path, result: dict):
+        """Write the result metadata next to the fixed document"""
+        with open(result_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, separators=(",", ":"))
+
+    def get_converted_path(self, document_id: str) -> Path:
+        """
+        Return the path of the intermediate Word file for a .md/.txt upload.
+
+        Processing keeps the converted document in memory (except for huge
+        Markdown files, which are converted to this file first), so the file
+        is usually written here, on demand (e.g. for the "original" preview),
+        and regenerated whenever the source upload is newer than it.
+        """
+        input_path = settings.UPLOAD_DIR / document_id
+        converted_path = settings.UPLOAD_DIR / f"{document_id}_converted.docx"
+
+        if not input_path.exists():
+            raise FileNotFoundError("Document not found")
+
+        if (
+            not converted_path.exists()
+            or converted_path.stat().st_mtime < input_path.stat().st_mtime
+        ):
+            if document_id.lower().endswith(".md"):
+                convert_markdown_to_docx(input_path, converted_path)
+            else:
+                doc, _ = text_to_document(input_path)
+                doc.save(converted_path)
+
+        return converted_path
+
+    def _execute_rules(
+        self,
+        doc,
+        plan: list,
+        strict: bool,
+        logs,
+        rule_metrics: list = None,
+        summary: bool = False,
+        partitioner: DocumentPartitioner = None,
+    ) -> list:
+        """
+        Run a compiled rule plan (see RuleParser.compile_rules) against the
+        document in priority order.
+
+        Consecutive rules that implement traversal hooks share a single walk of
+        the document body; legacy ``apply()`` rules run on their own in between.
+        With a partitioner, partition-safe traversal rules run over body
+        partitions on worker processes (see backend.core.partition).
+
+        If rule_metrics is given, one entry per executed rule is appended with
+        its duration, visit counters (None for legacy rules) and fix count,
+        plus the counters legacy rules report (e.g. formula cache hits).
+        In summary mode each rule's fixes are merged into a single record.
+        """
+        from backend.engine.math_index import shared_math_index
+        from backend.engine.traversal import group_rules, run_traversal
+
+        # 严格模式下可以调整参数 (复制参数，不修改缓存中的计划)
+        if strict:
+            plan = [
+                (rule, self._apply_strict_params(rule.id, params))
+                for rule, params in plan
+            ]
+
+        fixes = []
+        # 公式规则共享一个文档公式索引 (见 backend.engine.math_index)
+        with shared_math_index():
+            for group in group_rules(plan):
+                group_counters = None
+                if logs is not None:
+                    for rule, _ in group:
+                        logs.append(f"[RULE] Applying: {rule.id} ({rule.name})")
+
+                if group[0][0].supports_traversal and partitioner is not None:
+                    outcomes = []
+                    for partitioned, rules in split_group(group):
+                        if partitioned:
+                            outcomes.extend(partitioner.run(rules))
+                        else:
+                            outcomes.extend(
+                                traversal_outcomes(run_traversal(doc, rules))
+                            )
+                elif group[0][0].supports_traversal:
+                    outcomes = traversal_outcomes(run_traversal(doc, group))
+                else:
+                    rule, params = group[0]
+                    start = time.perf_counter()
+                    with rule_counters() as counters:
+                        try:
+                            rule_fixes, error = rule.apply(doc, params), None
+                        except Exception as e:
+                            rule_fixes, error = None, e
+                    elapsed = time.perf_counter() - start
+                    outcomes = [(rule, rule_fixes, error, elapsed, (None, None, None))]
+                    if counters:
+                        group_counters = {rule.id: counters}
+
+                self._record_outcomes(
+                    outcomes, fixes, logs, rule_metrics, summary, group_counters
+                )
+
+        return fixes
+
+    def _stream_rules(
+        self,
+        input_path: Path,
+        output_path: Path,
+        plan: list,
+        strict: bool,
+        logs,
+        rule_metrics: list = None,
+        summary: bool = False,
+    ) -> tuple:
+        """
+        Run a streamable plan (see backend.core.streaming) while copying the
+        document to output_path, without loading its body into memory.
+
+        Returns:
+            (fixes, stream stats)
+        """
+        if strict:
+            plan = [
+                (rule, self._apply_strict_params(rule.id, params))
+                for rule, params in plan
+            ]
+        if logs is not None:
+            for rule, _ in plan:
+                logs.append(f"[RULE] Applying: {rule.id} ({rule.name})")
+
+        contexts, stats = stream_document(input_path, output_path, plan)
+        fixes = []
+        self._record_outcomes(
+            traversal_outcomes(contexts), fixes, logs, rule_metrics, summary
+        )
+        return fixes, stats
+
+    def _record_outcomes(
+        self,
+        outcomes,
+        fixes: list,
+        logs,
+        rule_metrics: list,
+        summary: bool,
+        counters: dict = None,
+    ):
+        """
+        Collect per-rule outcomes into fixes, logs and rule metrics.
+
+        ``counters`` maps rule ids to the counters they reported (see
+        backend.core.metrics.count); they are added to the rules' metrics
+        together with the hit rates derived from them.
+        """
+        for rule, rule_fixes, error, elapsed, visits in outcomes:
+            if error is not None:
+                if logs is not None:
+                    logs.append(f"[ERROR] Rule {rule.id} failed: {error}")
+                print(f"Error applying rule {rule.id}: {error}")
+            elif rule_fixes:
+                if summary and len(rule_fixes) > 1:
+                    fixes.append(summarize_fixes(rule.id, rule_fixes))
+                else:
+                    fixes.extend(rule_fixes)
+                if logs is not None:
+                    logs.append(f"[RULE] {rule.id}: {len(rule_fixes)} fixes applied")
+            if rule_metrics is not None:
+                rule_metrics.append(
+                    {
+                        "rule_id": rule.id,
+                        "duration_ms": round(elapsed * 1000, 3),
+                        "paragraphs": visits[0],
+                        "runs": visits[1],
+                        "tables": visits[2],
+                        "fixes": len(rule_fixes or []),
+                        "error": str(error) if error is not None else None,
+                    }
+                )
+                if counters and rule.id in counters:
+                    rule_metrics[-1]["counters"] = counters[rule.id]
+                    rule_metrics[-1]["hit_rates"] = hit_rates(counters[rule.id])
+
     def _apply_strict_params(self, rule_id: str, params: dict) -> dict:
         """
         Apply strict mode adjustments to rule parameters.
@@ -205,3 +521,60 @@ class DocumentProcessor:
             strict_params.update(strict_overrides[rule_id])
 
         return strict_params
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 3)
+
+
+# Per-process processor used by executor workers
+_worker_processor = None
+
+
+def process_document_job(
+    document_id: str,
+    preset_id: str = None,
+    preset_config: dict = None,
+    strict: bool = False,
+    verbose: bool = False,
+    metrics: bool = False,
+    profile: bool = False,
+    fix_summary: bool = False,
+) -> dict:
+    """
+    Module-level entry point for processing a document on an executor.
+
+    Picklable for process pools; each worker process lazily builds and
+    reuses its own DocumentProcessor. Buffered formula cache writes are
+    committed when the job ends, since a terminated pool worker never runs
+    its atexit hooks.
+    """
+    global _worker_processor
+    if _worker_processor is None:
+        _worker_processor = DocumentProcessor()
+    try:
+        return _worker_processor.process(
+            document_id,
+            preset_id,
+            preset_config,
+            strict=strict,
+            verbose=verbose,
+            metrics=metrics,
+            profile=profile,
+            fix_summary=fix_summary,
+        )
+    finally:
+        formula_cache = get_formula_cache()
+        if formula_cache is not None:
+            formula_cache.flush()
+
+
+def process_batch_item(document_id: str, preset_id: str = None) -> int:
+    """
+    Process one batch item on a worker and return its fix count.
+
+    Only the count crosses the process boundary; the full result is already
+    persisted as ``{document_id}_result.json``.
+    """
+    result = process_document_job(document_id, preset_id)
+    return result.get("total_fixes", 0)
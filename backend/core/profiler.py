@@ -0,0 +1,108 @@
+"""
+Opt-in profiling of a single processing job.
+
+A profiled job runs under cProfile (saved as pstats) while a sampling thread
+records the job thread's stack every PROFILE_SAMPLE_INTERVAL seconds and
+writes it as collapsed stacks ("frame;frame;frame count" per line), ready
+for flamegraph.pl / speedscope.
+"""
+
+import cProfile
+import os
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Optional
+from backend.core.config import settings
+
+# cProfile allows one active profiler per process on newer Pythons
+_profile_lock = threading.Lock()
+
+PROFILE_FORMATS = {
+    "collapsed": ("_profile.txt", "text/plain"),
+    "pstats": ("_profile.pstats", "application/octet-stream"),
+}
+
+
+def profile_paths(document_id: str) -> Dict[str, Path]:
+    """Paths of the profile files for a document, next to its _result.json"""
+    return {
+        fmt: settings.OUTPUT_DIR / f"{document_id}{suffix}"
+        for fmt, (suffix, _) in PROFILE_FORMATS.items()
+    }
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    filename = os.path.basename(code.co_filename)
+    return f"{name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+class _StackSampler(threading.Thread):
+    """Samples one thread's Python stack at a fixed interval."""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name="md2docx-profiler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class JobProfiler:
+    """
+    Context manager that profiles the code run inside it on this thread.
+
+    Usage:
+        with JobProfiler() as profiler:
+            ...
+        profiler.save(document_id)
+    """
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = interval or settings.PROFILE_SAMPLE_INTERVAL
+        self._profile = cProfile.Profile()
+        self._sampler: Optional[_StackSampler] = None
+
+    def __enter__(self):
+        _profile_lock.acquire()
+        self._sampler = _StackSampler(threading.get_ident(), self.interval)
+        self._sampler.start()
+        self._profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._profile.disable()
+        self._sampler.stop()
+        _profile_lock.release()
+        return False
+
+    def save(self, document_id: str) -> Dict[str, str]:
+        """
+        Write collapsed stacks and pstats next to the job's _result.json.
+
+        Returns:
+            {format: filename} for the written files
+        """
+        paths = profile_paths(document_id)
+        with open(paths["collapsed"], "w", encoding="utf-8") as f:
+            for stack, count in sorted(self._sampler.stacks.items()):
+                f.write(f"{stack} {count}\n")
+        self._profile.dump_stats(str(paths["pstats"]))
+        return {fmt: path.name for fmt, path in paths.items()}
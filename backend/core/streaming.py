@@ -0,0 +1,260 @@
+"""
+Streaming rule execution for documents with a huge word/document.xml.
+
+Loading the main document part builds an lxml tree of the whole body, which
+for a part of several hundred MB takes gigabytes of memory. When every rule
+in the plan can run on one block at a time (BaseRule.can_stream), the body is
+processed while it is parsed instead:
+
+1. The rules' begin() hooks run against a *skeleton* document: the package
+   with a main document part whose body is empty, so styles, numbering and
+   relationships are available as usual.
+2. word/document.xml is read from the source archive in chunks with a pull
+   parser (lxml's push counterpart of iterparse). Every body child that is
+   complete is visited by the rules (engine.traversal.Traversal), serialized
+   straight into the output archive and dropped from the parsed tree.
+3. The rest of the package is written as in save_document(), and the rules'
+   finish() hooks return their fix records.
+
+Memory is bounded by the largest single block (paragraph or table) plus the
+parser's chunk, not by the size of the document.
+"""
+
+import copy
+import zipfile
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Tuple, Union
+
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml.ns import qn
+from docx.oxml.parser import element_class_lookup
+from lxml import etree
+
+from backend.core.config import settings
+from backend.core.docx_package import open_document, required_parts, save_document
+from backend.engine.traversal import RuleContext, Traversal
+
+_BODY = qn("w:body")
+_RELATIONSHIP = (
+    "{http://schemas.openxmlformats.org/package/2006/relationships}Relationship"
+)
+
+# Bytes fed to the parser at a time
+_CHUNK = 1024 * 1024
+# Placeholder splitting a serialized skeleton around the body's content
+_SENTINEL = "md2docx-body"
+
+
+def can_stream(plan) -> bool:
+    """Whether every rule of a (non-empty) compiled plan can be streamed."""
+    return bool(plan) and all(rule.can_stream(params) for rule, params in plan)
+
+
+def should_stream(path: Union[str, Path], plan) -> bool:
+    """
+    Stream ``path`` if streaming is enabled, the plan allows it and the
+    uncompressed main document part is at least settings.STREAMING_MIN_BYTES.
+    """
+    if settings.STREAMING_MIN_BYTES is None or not can_stream(plan):
+        return False
+    if not zipfile.is_zipfile(path):
+        return False
+    with zipfile.ZipFile(path) as zf:
+        try:
+            info = zf.getinfo(main_part_name(zf))
+        except (KeyError, ValueError):
+            return False
+    return info.file_size >= settings.STREAMING_MIN_BYTES
+
+
+def main_part_name(zf: zipfile.ZipFile) -> str:
+    """Archive member of the main document part, from the package rels."""
+    rels = etree.fromstring(zf.read("_rels/.rels"))
+    for rel in rels.iterchildren(_RELATIONSHIP):
+        if rel.get("Type") == RT.OFFICE_DOCUMENT:
+            return rel.get("Target").lstrip("/")
+    raise ValueError("Package has no main document part")
+
+
+def _parser() -> etree.XMLPullParser:
+    """
+    Pull parser reporting the start of w:body. Parses like python-docx
+    (same options and custom element classes, e.g. CT_P), so rules see the
+    same elements as with a fully loaded document.
+    """
+    parser = etree.XMLPullParser(
+        events=("start",),
+        tag=_BODY,
+        remove_blank_text=True,
+        resolve_entities=False,
+        huge_tree=True,
+    )
+    parser.set_element_class_lookup(element_class_lookup)
+    return parser
+
+
+def _read_until_body(source: BinaryIO, parser: etree.XMLPullParser):
+    """Feed ``source`` to ``parser`` until w:body starts; return the body."""
+    while True:
+        chunk = source.read(_CHUNK)
+        if not chunk:
+            parser.close()
+            raise ValueError("Main document part has no w:body")
+        parser.feed(chunk)
+        for _, body in parser.read_events():
+            return body
+
+
+def _skeleton(body, sentinel: bool = False) -> bytes:
+    """
+    Serialized document with the elements preceding ``body`` (e.g.
+    w:background) and an empty body, optionally holding the sentinel.
+    """
+    root = body.getparent()
+    skeleton = etree.Element(root.tag, attrib=dict(root.attrib), nsmap=root.nsmap)
+    for child in root:
+        if child is body:
+            break
+        skeleton.append(copy.deepcopy(child))
+    local_nsmap = {
+        prefix: uri
+        for prefix, uri in body.nsmap.items()
+        if root.nsmap.get(prefix) != uri
+    }
+    empty_body = etree.SubElement(
+        skeleton, body.tag, attrib=dict(body.attrib), nsmap=local_nsmap
+    )
+    if sentinel:
+        empty_body.append(etree.Comment(_SENTINEL))
+    return etree.tostring(skeleton, encoding="UTF-8", standalone=True)
+
+
+def read_skeleton(zf: zipfile.ZipFile, name: str) -> bytes:
+    """Main document part ``name`` with an empty body, read up to w:body."""
+    with zf.open(name) as source:
+        return _skeleton(_read_until_body(source, _parser()))
+
+
+def _split(xml: bytes) -> Tuple[bytes, bytes]:
+    head, tail = xml.split(f"<!--{_SENTINEL}-->".encode(), 1)
+    return head, tail
+
+
+class BodyWriter:
+    """
+    Writes a main document part whose body children are produced one at a
+    time: the part up to w:body on creation, then the blocks passed to
+    write() or built in ``self.body`` and flushed, then the rest of the part
+    on close().
+    """
+
+    def __init__(self, body, output: BinaryIO):
+        """
+        Args:
+            body: w:body of the part; its ancestors and the elements preceding
+                it are written, its children are not
+            output: Writable stream of the part
+        """
+        self.output = output
+        head, self._tail = _split(_skeleton(body, sentinel=True))
+        output.write(head)
+
+        # Stand-in for w:body declaring its namespaces: blocks in it
+        # serialize without redundant declarations
+        self.body = etree.Element(body.tag, nsmap=body.nsmap)
+        self.body.append(etree.Comment(_SENTINEL))
+        prefix, suffix = _split(etree.tostring(self.body, encoding="UTF-8"))
+        self.body.remove(self.body[0])
+        self._start = len(prefix)
+        self._stop = -len(suffix)
+        self._overhead = len(prefix) + len(suffix)
+        self.stats = {"blocks": 0, "max_block_bytes": 0}
+
+    def write(self, block):
+        """Serialize ``block`` into the body and detach it from its tree."""
+        self.body.append(block)
+        size = self.flush()
+        if size > self.stats["max_block_bytes"]:
+            self.stats["max_block_bytes"] = size
+
+    def flush(self) -> int:
+        """
+        Serialize the blocks in ``self.body`` and remove them. Building
+        blocks in ``self.body`` saves moving them there from another tree.
+
+        Returns:
+            Bytes written
+        """
+        body = self.body
+        if not len(body):
+            return 0
+        data = etree.tostring(body, encoding="UTF-8", xml_declaration=False)
+        self.stats["blocks"] += len(body)
+        body.clear()
+        self.output.write(data[self._start : self._stop])
+        return len(data) - self._overhead
+
+    def close(self):
+        self.output.write(self._tail)
+
+
+def stream_body(source: BinaryIO, output: BinaryIO, visit) -> Dict[str, int]:
+    """
+    Copy a main document part from ``source`` to ``output``, calling
+    ``visit`` with every direct child of w:body before it is written.
+
+    Returns:
+        {"blocks": body children, "max_block_bytes": largest serialized child}
+    """
+    parser = _parser()
+    body = _read_until_body(source, parser)
+    writer = BodyWriter(body, output)
+
+    done = False
+    while not done:
+        chunk = source.read(_CHUNK)
+        if chunk:
+            parser.feed(chunk)
+        else:
+            parser.close()
+            done = True
+        # Every child but the last is complete; after close() all of them are
+        complete = len(body) if done else len(body) - 1
+        for _ in range(max(complete, 0)):
+            block = body[0]
+            visit(block)
+            writer.write(block)
+
+    writer.close()
+    return writer.stats
+
+
+def stream_document(
+    source_path: Union[str, Path], output_path: Union[str, Path], plan
+) -> Tuple[List[RuleContext], Dict[str, int]]:
+    """
+    Run a streamable plan (see can_stream) over ``source_path`` and write the
+    result to ``output_path``.
+
+    Returns:
+        (RuleContexts in plan order, stats): stats has the stream_body()
+        counters and save_document()'s "copied" / "written" counts
+    """
+    with zipfile.ZipFile(source_path) as zf:
+        name = main_part_name(zf)
+        skeleton = read_skeleton(zf, name)
+
+    doc = open_document(source_path, required_parts(plan), document_xml=skeleton)
+    traversal = Traversal(doc, plan)
+    stats = {}
+
+    def write_document(output: BinaryIO, source: zipfile.ZipFile):
+        with source.open(name) as xml:
+            stats.update(stream_body(xml, output, traversal.visit))
+
+    stats.update(
+        save_document(
+            doc, output_path, source_path=source_path, document_writer=write_document
+        )
+    )
+    return traversal.finish(), stats
@@ -1,12 +1,18 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from typing import Dict, Any, List, FrozenSet, Optional
 from docx import Document
 
+# 单次遍历钩子名称，规则覆盖其中任意一个即可参与融合遍历
+TRAVERSAL_HOOKS = ("visit_paragraph", "visit_run", "visit_table", "visit_drawing")
+
 
 class BaseRule(ABC):
     """
     文档修复规则基类。
     所有具体的规则必须继承此类并实现 apply 方法。
+
+    除 apply 外，规则还可以覆盖 visit_* 钩子，由处理器在一次正文遍历中
+    按优先级统一调用（参见 backend.engine.traversal）。
     """
 
     id: str = ""  # 规则唯一标识符 (例如: 'font_standard')
@@ -14,6 +20,12 @@ class BaseRule(ABC):
     category: str = ""  # 规则分类 (例如: 'font', 'table', 'paragraph')
     description: str = ""  # 规则详细描述
     priority: int = 100  # 执行优先级 (数字越小越先执行)
+    # 规则读写的包部件 (见 backend.core.docx_package.PACKAGE_PARTS)，
+    # None 表示未声明，处理时加载整个文档包
+    package_parts: Optional[FrozenSet[str]] = None
+    # 是否可以分区并行执行 (见 backend.core.partition)：begin 不读取正文，
+    # 钩子只修改当前段落/表格，finish 的记录按 id 合并后与整篇执行一致
+    partition_safe: bool = False
 
     @abstractmethod
     def apply(self, doc: Document, params: Dict[str, Any]) -> List[Dict[str, Any]]:
@@ -46,3 +58,74 @@ class BaseRule(ABC):
         获取默认参数。
         """
         return {}
+
+    # ===== 单次遍历钩子 =====
+    # 钩子只能修改当前段落/表格自身，不能增删正文中的块或段落内的 run，
+    # 否则同一次遍历中后续规则看到的结构将不再准确。
+
+    def begin(self, doc: Document, ctx) -> None:
+        """
+        遍历开始前调用，可在 ctx.state 中准备参数。
+        本次不需要访问正文时可将 ctx.hooks 置为空集合，跳过该规则的钩子。
+        """
+        pass
+
+    def visit_paragraph(self, para, index: int, ctx) -> None:
+        """访问正文段落 (index 与 doc.paragraphs 下标一致)。"""
+        pass
+
+    def visit_run(self, run, para, index: int, ctx) -> None:
+        """访问段落中的 run (index 为所在段落下标)。"""
+        pass
+
+    def visit_table(self, table, index: int, ctx) -> None:
+        """访问正文表格 (index 与 doc.tables 下标一致)。"""
+        pass
+
+    def visit_drawing(self, drawing, para, index: int, ctx) -> None:
+        """访问段落 run 中的 w:drawing 元素 (index 为所在段落下标)。"""
+        pass
+
+    def finish(self, doc: Document, ctx) -> List[Dict[str, Any]]:
+        """遍历结束后调用，返回修复记录列表。"""
+        return ctx.fixes
+
+    @classmethod
+    def traversal_hooks(cls) -> FrozenSet[str]:
+        """返回该规则覆盖的遍历钩子名称集合。"""
+        return frozenset(
+            hook
+            for hook in TRAVERSAL_HOOKS
+            if getattr(cls, hook) is not getattr(BaseRule, hook)
+        )
+
+    @property
+    def supports_traversal(self) -> bool:
+        """规则是否可以参与融合遍历。"""
+        return bool(self.traversal_hooks())
+
+    def can_partition(self, params: Dict[str, Any]) -> bool:
+        """在给定参数下，规则能否对正文的各个分区独立执行。"""
+        return self.partition_safe and self.supports_traversal
+
+    def can_stream(self, params: Dict[str, Any]) -> bool:
+        """
+        在给定参数下，规则能否在流式处理中逐块执行 (见 backend.core.streaming)。
+        条件与分区执行相同，另外 finish 在输出写出之后调用，只能返回记录。
+        """
+        return self.can_partition(params)
+
+
+class TraversalRule(BaseRule):
+    """
+    仅通过遍历钩子实现的规则基类。
+    单独调用 apply 时，只为本规则执行一次正文遍历。
+    """
+
+    def apply(self, doc: Document, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        from backend.engine.traversal import run_traversal
+
+        ctx = run_traversal(doc, [(self, params)])[0]
+        if ctx.error is not None:
+            raise ctx.error
+        return ctx.fixes
@@ -0,0 +1,252 @@
+"""
+紧凑的修复记录。
+
+规则返回 Fix 记录 (__slots__)，段落/表格下标以半开区间列表
+[[start, stop], ...] 表示，而不是逐个下标的列表：覆盖全文的规则只需要
+一个区间。Fix 支持 fix["rule_id"] / fix.get(...) 形式的只读访问，写入
+结果前通过 to_dict() 转换为普通字典。
+
+旧格式 (paragraph_indices / table_indices 列表) 的字典仍然可以作为修复
+记录使用，fix_ranges() 对两种格式统一处理。
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+Ranges = List[List[int]]
+
+
+def merge_ranges(ranges: Iterable) -> Ranges:
+    """合并任意顺序、可能重叠的 [start, stop] 区间。"""
+    merged: Ranges = []
+    for start, stop in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            if stop > merged[-1][1]:
+                merged[-1][1] = stop
+        else:
+            merged.append([start, stop])
+    return merged
+
+
+def encode_ranges(indices: Iterable[int]) -> Ranges:
+    """将下标序列编码为区间列表。"""
+    ranges = IndexRanges()
+    for index in indices:
+        ranges.add(index)
+    return ranges.to_list()
+
+
+def iter_indices(ranges: Optional[Ranges]) -> Iterator[int]:
+    """展开区间列表中的所有下标。"""
+    for start, stop in ranges or ():
+        yield from range(start, stop)
+
+
+def count_indices(ranges: Optional[Ranges]) -> int:
+    """区间列表覆盖的下标数量。"""
+    return sum(stop - start for start, stop in ranges or ())
+
+
+class IndexRanges:
+    """
+    下标区间构建器。
+
+    按升序追加下标时为 O(1)，并自动合并连续下标、忽略重复下标；
+    乱序追加时退化为重新合并。
+    """
+
+    __slots__ = ("_ranges",)
+
+    def __init__(self):
+        self._ranges: Ranges = []
+
+    def add(self, index: int):
+        ranges = self._ranges
+        if ranges:
+            last = ranges[-1]
+            if index == last[1]:
+                last[1] += 1
+                return
+            if index > last[1]:
+                ranges.append([index, index + 1])
+                return
+            if index >= last[0]:
+                return  # 重复下标
+            self._ranges = merge_ranges(ranges + [[index, index + 1]])
+            return
+        ranges.append([index, index + 1])
+
+    def to_list(self) -> Ranges:
+        return [list(r) for r in self._ranges]
+
+    def __len__(self) -> int:
+        return count_indices(self._ranges)
+
+    def __bool__(self) -> bool:
+        return bool(self._ranges)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter_indices(self._ranges)
+
+
+def _as_ranges(value: Union[None, int, IndexRanges, Iterable[int]]) -> Optional[Ranges]:
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return [[value, value + 1]]
+    if isinstance(value, IndexRanges):
+        return value.to_list()
+    return encode_ranges(value)
+
+
+class Fix:
+    """
+    单条修复记录。
+
+    Args:
+        paragraphs / tables: 受影响的段落/表格下标，可以是单个下标、
+            下标序列或 IndexRanges
+    """
+
+    __slots__ = (
+        "id",
+        "rule_id",
+        "description",
+        "paragraph_ranges",
+        "table_ranges",
+        "before",
+        "after",
+        "location",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        rule_id: str,
+        description: str,
+        paragraphs=None,
+        tables=None,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        location: Optional[Dict[str, Any]] = None,
+    ):
+        self.id = id
+        self.rule_id = rule_id
+        self.description = description
+        self.paragraph_ranges = _as_ranges(paragraphs)
+        self.table_ranges = _as_ranges(tables)
+        self.before = before
+        self.after = after
+        self.location = location
+
+    # 兼容字典形式的只读访问
+    def __getitem__(self, key: str) -> Any:
+        if key == "paragraph_indices":
+            return list(iter_indices(self.paragraph_ranges))
+        if key == "table_indices":
+            return list(iter_indices(self.table_ranges))
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            value = self[key]
+        except KeyError:
+            return default
+        return default if value is None else value
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __repr__(self) -> str:
+        return f"Fix(id={self.id!r}, rule_id={self.rule_id!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为结果中的字典，省略值为 None 的字段。"""
+        data = {
+            "id": self.id,
+            "rule_id": self.rule_id,
+            "description": self.description,
+        }
+        for key in ("paragraph_ranges", "table_ranges", "before", "after", "location"):
+            value = getattr(self, key)
+            if value is not None:
+                data[key] = value
+        return data
+
+
+def fix_to_dict(fix) -> Dict[str, Any]:
+    """Fix 记录或旧格式字典统一转换为字典。"""
+    return fix.to_dict() if isinstance(fix, Fix) else fix
+
+
+def fix_ranges(fix, kind: str) -> Ranges:
+    """
+    获取修复记录影响的区间列表，兼容新旧两种格式。
+
+    Args:
+        kind: "paragraph" 或 "table"
+    """
+    ranges = fix.get(f"{kind}_ranges")
+    if ranges is not None:
+        return ranges
+    return encode_ranges(fix.get(f"{kind}_indices") or ())
+
+
+def summarize_fixes(rule_id: str, fixes: List) -> Fix:
+    """将同一规则的多条修复记录合并为一条摘要记录。"""
+    first = fixes[0]
+    description = first["description"]
+    if len(fixes) > 1:
+        description = f"{description} (共 {len(fixes)} 处)"
+
+    afters = {fix.get("after") for fix in fixes}
+    summary = Fix(
+        id=f"fix_{rule_id}_summary",
+        rule_id=rule_id,
+        description=description,
+        after=afters.pop() if len(afters) == 1 else None,
+        location={"type": rule_id, "fix_count": len(fixes)},
+    )
+    for kind in ("paragraph", "table"):
+        ranges = [r for fix in fixes for r in fix_ranges(fix, kind)]
+        if ranges:
+            setattr(summary, f"{kind}_ranges", merge_ranges(ranges))
+    return summary
+
+
+def merge_fixes(fix_lists: Iterable[List]) -> List:
+    """
+    合并同一规则在正文各分区上得到的修复记录 (分区按正文顺序排列)。
+
+    id 相同的记录 (例如覆盖全文的 fix_spacing_all) 合并为一条：区间取并集，
+    location 中的 *_count 计数相加，其余字段取第一条记录的值。
+    """
+    merged: List = []
+    positions: Dict[str, int] = {}
+    for fixes in fix_lists:
+        for fix in fixes:
+            position = positions.get(fix["id"])
+            if position is None:
+                positions[fix["id"]] = len(merged)
+                merged.append(fix)
+                continue
+            first = merged[position]
+            combined = Fix(
+                id=first["id"],
+                rule_id=first["rule_id"],
+                description=first["description"],
+                before=first.get("before"),
+                after=first.get("after"),
+                location=dict(first.get("location") or {}) or None,
+            )
+            for kind in ("paragraph", "table"):
+                ranges = fix_ranges(first, kind) + fix_ranges(fix, kind)
+                if ranges:
+                    setattr(combined, f"{kind}_ranges", merge_ranges(ranges))
+            if combined.location:
+                for key, value in (fix.get("location") or {}).items():
+                    if key.endswith("_count") and isinstance(value, int):
+                        combined.location[key] = combined.location.get(key, 0) + value
+            merged[position] = combined
+    return merged
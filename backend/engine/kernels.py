@@ -0,0 +1,330 @@
+"""
+直接操作 lxml 元素的规则内核。
+
+run.font.name / run.font.size / run.font.color.rgb 等 python-docx 属性每次
+访问都会创建代理对象并经过多层描述符查找。这里的函数直接读写
+w:p / w:r / w:rPr / w:pPr 元素：标签名和属性名只经过一次 qn() 转换并缓存，
+XPath 表达式预先编译。
+
+读取结果与对应的 python-docx 属性一致 (例如 font_size 返回 Length)。
+新建子元素时使用与 python-docx get_or_add_*() 相同的 schema 顺序，但只扫描
+一次父元素的子节点，而不是对每个后继标签各调用一次 find()。
+"""
+
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from docx.oxml.ns import nsmap, qn
+from docx.oxml.simpletypes import (
+    ST_HexColor,
+    ST_HpsMeasure,
+    ST_OnOff,
+    ST_TwipsMeasure,
+)
+from docx.shared import Length, RGBColor
+from lxml import etree
+
+
+@lru_cache(maxsize=None)
+def tag(nsptag: str) -> str:
+    """qn() 的缓存版本，例如 tag("w:rPr")。"""
+    return qn(nsptag)
+
+
+@lru_cache(maxsize=None)
+def xpath(expr: str) -> etree.XPath:
+    """返回预编译的 XPath (可使用 w: 等 python-docx 命名空间前缀)。"""
+    return etree.XPath(expr, namespaces=nsmap)
+
+
+R = tag("w:r")
+RPR = tag("w:rPr")
+RFONTS = tag("w:rFonts")
+SZ = tag("w:sz")
+B = tag("w:b")
+COLOR = tag("w:color")
+PPR = tag("w:pPr")
+PSTYLE = tag("w:pStyle")
+SPACING = tag("w:spacing")
+IND = tag("w:ind")
+
+VAL = tag("w:val")
+ASCII = tag("w:ascii")
+HANSI = tag("w:hAnsi")
+EAST_ASIA = tag("w:eastAsia")
+LINE = tag("w:line")
+LINE_RULE = tag("w:lineRule")
+BEFORE = tag("w:before")
+AFTER = tag("w:after")
+FIRST_LINE = tag("w:firstLine")
+HANGING = tag("w:hanging")
+
+# 段落文本中可能包含非空白字符的节点 (与 CT_P.text 的取值范围一致)
+_TEXT_NODES = xpath(
+    "./w:r/w:t/text() | ./w:hyperlink/w:r/w:t/text()"
+    " | ./w:r/w:noBreakHyphen | ./w:hyperlink/w:r/w:noBreakHyphen"
+)
+
+
+@lru_cache(maxsize=1024)
+def _hps(value: str) -> Length:
+    return ST_HpsMeasure.convert_from_xml(value)
+
+
+@lru_cache(maxsize=1024)
+def _twips(value: str) -> Length:
+    return ST_TwipsMeasure.convert_from_xml(value)
+
+
+@lru_cache(maxsize=1024)
+def _hex_color(value: str):
+    return ST_HexColor.convert_from_xml(value)
+
+
+@lru_cache(maxsize=64)
+def _on_off(value: str) -> bool:
+    return ST_OnOff.convert_from_xml(value)
+
+
+def hps_xml(value: Length) -> str:
+    """Length -> w:sz/@w:val 字符串 (半磅)。"""
+    return ST_HpsMeasure.convert_to_xml(value)
+
+
+def twips_xml(value: Length) -> str:
+    """Length -> 缇 (twips) 字符串。"""
+    return ST_TwipsMeasure.convert_to_xml(value)
+
+
+# ===== 子元素 =====
+# lxml 的 find() 每次都经过 ElementPath，这里用 iterchildren(tag) 代替；
+# w:rPr / w:pPr 按 schema 总是第一个子元素，先直接检查 [0]。
+
+
+def child(parent, child_tag: str):
+    """等价于 parent.find(child_tag)：第一个标签匹配的直接子元素。"""
+    for element in parent.iterchildren(child_tag):
+        return element
+    return None
+
+
+def _first_child(parent, child_tag: str):
+    if len(parent):
+        first = parent[0]
+        if first.tag == child_tag:
+            return first
+    return child(parent, child_tag)
+
+
+def _rpr(r):
+    return _first_child(r, RPR)
+
+
+def _ppr(p):
+    return _first_child(p, PPR)
+
+
+@lru_cache(maxsize=None)
+def _successor_ranks(parent_cls, name: str) -> Optional[Dict[str, int]]:
+    """
+    python-docx 为 ZeroOrOne 子元素生成的 _insert_<name>() 按 successors 列表
+    决定插入位置，这里从其闭包中取出该列表，转换为 {标签: 次序}。
+    取不到时 (自定义的 _insert_ 方法) 返回 None。
+    """
+    insert = getattr(parent_cls, f"_insert_{name}", None)
+    for cell in getattr(insert, "__closure__", None) or ():
+        successors = getattr(cell.cell_contents, "_successors", None)
+        if successors is not None:
+            return {qn(t): i for i, t in enumerate(successors)}
+    return None
+
+
+def get_or_add(parent, name: str):
+    """等价于 parent.get_or_add_<name>()，例如 get_or_add(rPr, "rFonts")。"""
+    element = child(parent, tag(f"w:{name}"))
+    if element is not None:
+        return element
+    ranks = _successor_ranks(type(parent), name)
+    if ranks is None:
+        return getattr(parent, f"get_or_add_{name}")()
+
+    element = getattr(parent, f"_new_{name}")()
+    # 与 first_child_found_in 相同：successors 中最靠前、且已存在的标签
+    successor, best = None, len(ranks)
+    for existing in parent:
+        rank = ranks.get(existing.tag)
+        if rank is not None and rank < best:
+            successor, best = existing, rank
+    if successor is None:
+        parent.append(element)
+    else:
+        successor.addprevious(element)
+    return element
+
+
+# ===== 段落 =====
+
+
+def _get_or_add_ppr(p):
+    pPr = _ppr(p)
+    return p.get_or_add_pPr() if pPr is None else pPr
+
+
+def runs(p) -> List:
+    """段落的直接 w:r 子元素 (与 Paragraph.runs 一致，不含超链接中的 run)。"""
+    return list(p.iterchildren(R))
+
+
+def style_id(p) -> Optional[str]:
+    """段落样式 ID (w:pPr/w:pStyle/@w:val)。"""
+    pPr = _ppr(p)
+    if pPr is None:
+        return None
+    pStyle = child(pPr, PSTYLE)
+    return None if pStyle is None else pStyle.get(VAL)
+
+
+def has_text(p) -> bool:
+    """等价于 bool(paragraph.text.strip())，但不拼接整段文本。"""
+    for node in _TEXT_NODES(p):
+        if not isinstance(node, str) or node.strip():
+            return True
+    return False
+
+
+def first_line_indent(p) -> Optional[Length]:
+    """等价于 paragraph_format.first_line_indent。"""
+    pPr = _ppr(p)
+    if pPr is None:
+        return None
+    ind = child(pPr, IND)
+    if ind is None:
+        return None
+    hanging = ind.get(HANGING)
+    if hanging is not None:
+        return Length(-_twips(hanging))
+    first_line = ind.get(FIRST_LINE)
+    return None if first_line is None else _twips(first_line)
+
+
+def set_first_line_indent(p, value: Length):
+    """等价于 paragraph_format.first_line_indent = value (value 不为 None)。"""
+    ind = get_or_add(_get_or_add_ppr(p), "ind")
+    attrib = ind.attrib
+    attrib.pop(FIRST_LINE, None)
+    attrib.pop(HANGING, None)
+    if value < 0:
+        ind.set(HANGING, twips_xml(-value))
+    else:
+        ind.set(FIRST_LINE, twips_xml(value))
+
+
+def set_spacing(p, line: str, line_rule: str, before: str, after: str):
+    """
+    依次设置 w:spacing 的 line / lineRule / before / after 属性，
+    与依次赋值 line_spacing、space_before、space_after 的结果相同。
+    """
+    spacing = get_or_add(_get_or_add_ppr(p), "spacing")
+    spacing.set(LINE, line)
+    spacing.set(LINE_RULE, line_rule)
+    spacing.set(BEFORE, before)
+    spacing.set(AFTER, after)
+
+
+# ===== run =====
+
+
+def _get_or_add_rpr(r):
+    rPr = _rpr(r)
+    return r.get_or_add_rPr() if rPr is None else rPr
+
+
+def _rfonts(r):
+    rPr = _rpr(r)
+    if rPr is None:
+        return None
+    return child(rPr, RFONTS)
+
+
+def font_name(r) -> Optional[str]:
+    """等价于 run.font.name (w:rFonts/@w:ascii)。"""
+    rFonts = _rfonts(r)
+    return None if rFonts is None else rFonts.get(ASCII)
+
+
+def set_font_name(r, name: str):
+    """等价于 run.font.name = name (同时设置 ascii 和 hAnsi)。"""
+    rFonts = get_or_add(_get_or_add_rpr(r), "rFonts")
+    rFonts.set(ASCII, name)
+    rFonts.set(HANSI, name)
+
+
+def east_asia_font(r) -> Optional[str]:
+    """w:rFonts/@w:eastAsia，没有 w:rFonts 时为 None。"""
+    rFonts = _rfonts(r)
+    return None if rFonts is None else rFonts.get(EAST_ASIA)
+
+
+def set_east_asia_font(r, name: str) -> bool:
+    """仅在 w:rFonts 已存在时设置中文字体，返回是否设置。"""
+    rFonts = _rfonts(r)
+    if rFonts is None:
+        return False
+    rFonts.set(EAST_ASIA, name)
+    return True
+
+
+def font_size(r) -> Optional[Length]:
+    """等价于 run.font.size。"""
+    rPr = _rpr(r)
+    if rPr is None:
+        return None
+    sz = child(rPr, SZ)
+    if sz is None:
+        return None
+    value = sz.get(VAL)
+    return sz.val if value is None else _hps(value)
+
+
+def set_font_size(r, size_xml: str):
+    """设置 w:sz/@w:val，size_xml 由 hps_xml() 预先计算。"""
+    get_or_add(_get_or_add_rpr(r), "sz").set(VAL, size_xml)
+
+
+def is_bold(r) -> bool:
+    """等价于 bool(run.bold)。"""
+    rPr = _rpr(r)
+    if rPr is None:
+        return False
+    b = child(rPr, B)
+    if b is None:
+        return False
+    value = b.get(VAL)
+    return True if value is None else _on_off(value)
+
+
+def set_bold(r):
+    """等价于 run.bold = True。"""
+    b = get_or_add(_get_or_add_rpr(r), "b")
+    b.attrib.pop(VAL, None)
+
+
+def color_rgb(r) -> Optional[RGBColor]:
+    """等价于 run.font.color.rgb。"""
+    rPr = _rpr(r)
+    if rPr is None:
+        return None
+    color = child(rPr, COLOR)
+    if color is None:
+        return None
+    value = color.get(VAL)
+    rgb = color.val if value is None else _hex_color(value)
+    return rgb if isinstance(rgb, RGBColor) else None
+
+
+def set_color_rgb(r, color: RGBColor):
+    """等价于 run.font.color.rgb = color (会移除主题色)。"""
+    rPr = _get_or_add_rpr(r)
+    for old in rPr.findall(COLOR):
+        rPr.remove(old)
+    get_or_add(rPr, "color").set(VAL, ST_HexColor.convert_to_xml(color))
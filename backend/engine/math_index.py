@@ -0,0 +1,124 @@
+"""
+公式规则共享的文档公式索引。
+
+公式规则 (见 backend.engine.rules.formula) 原先各自遍历所有段落及其子元素
+查找 m:oMath / m:oMathPara 或 LaTeX 定界符。MathIndex 用两次预编译 XPath
+在 C 层完成扫描，只记录：
+
+- 可能包含 LaTeX 的段落：直接 run 的 w:t 文本中含有 "$" 或 "\\"
+  (与 LaTeXConverter 扫描的文本范围一致)；
+- 含公式的段落及其类型：展示公式 (DISPLAY) 或行内公式 (INLINE)。
+
+不含公式的文档只需两次 XPath 查询，规则随即返回。
+
+在 shared_math_index() 范围内 (处理器执行规则计划时)，同一文档的所有公式
+规则共享一个索引；修改了公式段落的规则需调用 update() 刷新该段落的记录。
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from docx import Document
+from docx.text.paragraph import Paragraph
+from docx.text.run import Run
+from backend.engine import kernels
+
+DISPLAY = "display"
+INLINE = "inline"
+
+_P = kernels.tag("w:p")
+_OMATH = kernels.tag("m:oMath")
+_OMATH_PARA = kernels.tag("m:oMathPara")
+
+_LATEX_PARAGRAPHS = kernels.xpath(
+    "./w:p[w:r/w:t[contains(., '$') or contains(., '\\')]]"
+)
+_MATH_PARAGRAPHS = kernels.xpath("./w:p[m:oMath or m:oMathPara]")
+
+_shared = threading.local()
+
+
+def math_kind(p) -> Optional[str]:
+    """
+    段落中公式的类型：没有 run 或只有一个空白 run 的公式段落为 DISPLAY，
+    第一个 run 有文字且含 m:oMath 的为 INLINE，其余 (含无公式段落) 为 None。
+    """
+    has_omath = p.find(_OMATH) is not None
+    if not has_omath and p.find(_OMATH_PARA) is None:
+        return None
+    runs = kernels.runs(p)
+    if not runs or (len(runs) == 1 and not Run(runs[0], None).text.strip()):
+        return DISPLAY
+    if has_omath and Run(runs[0], None).text.strip():
+        return INLINE
+    return None
+
+
+class MathIndex:
+    """
+    一篇文档的公式索引 (段落下标与 doc.paragraphs 一致)。
+
+    Args:
+        doc: python-docx Document
+    """
+
+    def __init__(self, doc: Document):
+        self.doc = doc
+        body = doc.element.body
+        latex = _LATEX_PARAGRAPHS(body)
+        math = _MATH_PARAGRAPHS(body)
+        self._latex = latex
+        self._kinds: Dict[object, Optional[str]] = {p: math_kind(p) for p in math}
+        # 只为命中的段落计算下标；无公式的文档不遍历正文
+        self._positions: Dict[object, int] = {}
+        if latex or math:
+            wanted = set(latex)
+            wanted.update(math)
+            for index, p in enumerate(body.iterchildren(_P)):
+                if p in wanted:
+                    self._positions[p] = index
+
+    def latex_paragraphs(self) -> List[Tuple[int, Paragraph]]:
+        """可能包含 LaTeX 公式的段落 (下标, 段落)，按下标排列。"""
+        return [self._paragraph(p) for p in self._latex]
+
+    def paragraphs(self, kind: str) -> List[Tuple[int, Paragraph]]:
+        """类型为 kind (DISPLAY / INLINE) 的公式段落 (下标, 段落)，按下标排列。"""
+        found = [p for p, p_kind in self._kinds.items() if p_kind == kind]
+        found.sort(key=self._positions.__getitem__)
+        return [self._paragraph(p) for p in found]
+
+    def update(self, p):
+        """段落的公式或 run 被修改后，重新记录其公式类型。"""
+        self._kinds[p] = math_kind(p)
+
+    def _paragraph(self, p) -> Tuple[int, Paragraph]:
+        return self._positions[p], Paragraph(p, self.doc._body)
+
+
+def math_index(doc: Document) -> MathIndex:
+    """
+    返回文档的公式索引：在 shared_math_index() 范围内同一文档共享一个索引，
+    否则每次新建。
+    """
+    indexes = getattr(_shared, "indexes", None)
+    if indexes is None:
+        return MathIndex(doc)
+    index = indexes.get(id(doc))
+    if index is None or index.doc is not doc:
+        index = indexes[id(doc)] = MathIndex(doc)
+    return index
+
+
+@contextmanager
+def shared_math_index() -> Iterator[None]:
+    """在此范围内 (当前线程)，同一文档的公式规则共享一个 MathIndex。"""
+    if getattr(_shared, "indexes", None) is not None:
+        yield
+        return
+    _shared.indexes = {}
+    try:
+        yield
+    finally:
+        _shared.indexes = None
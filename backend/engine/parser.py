@@ -1,41 +1,136 @@
+import copy
+import os
+import tempfile
+import threading
+from typing import Dict, Tuple
 import yaml
 from backend.core.config import settings
+from backend.engine.registry import registry
+from backend.engine.traversal import RulePlan
 
 
 class RuleParser:
+    # 所有实例共享同一个预设文件，读改写需要串行化
+    _lock = threading.RLock()
+
+    # 进程内预设缓存: 路径 -> ((mtime_ns, size), presets)
+    _presets_cache: Dict[str, Tuple[Tuple[int, int], dict]] = {}
+    # 编译缓存: (路径, preset_id) -> ((mtime_ns, size, 注册表版本), plan)
+    _plan_cache: Dict[Tuple[str, str], Tuple[Tuple[int, int, int], tuple]] = {}
+
     def __init__(self):
         self.presets_path = settings.PRESETS_PATH
 
+    def _file_key(self):
+        stat = os.stat(self.presets_path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _cached_presets(self) -> dict:
+        """
+        Return the parsed presets, re-reading the YAML only when the file's
+        mtime or size changed. The returned dict is shared; do not mutate it.
+        """
+        path = str(self.presets_path)
+        with self._lock:
+            try:
+                file_key = self._file_key()
+            except FileNotFoundError:
+                self._presets_cache.pop(path, None)
+                return {}
+
+            cached = self._presets_cache.get(path)
+            if cached is not None and cached[0] == file_key:
+                return cached[1]
+
+            try:
+                with open(self.presets_path, "r", encoding="utf-8") as f:
+                    data = yaml.safe_load(f)
+                presets = data.get("presets", {})
+            except Exception as e:
+                print(f"Error loading presets: {e}")
+                return {}
+
+            self._presets_cache[path] = (file_key, presets)
+            return presets
+
     def load_presets(self):
-        if not self.presets_path.exists():
-            return {}
-        try:
-            with open(self.presets_path, "r", encoding="utf-8") as f:
-                data = yaml.safe_load(f)
-            return data.get("presets", {})
-        except Exception as e:
-            print(f"Error loading presets: {e}")
-            return {}
+        return copy.deepcopy(self._cached_presets())
 
     def get_preset(self, preset_id: str):
-        presets = self.load_presets()
-        return presets.get(preset_id)
+        return copy.deepcopy(self._cached_presets().get(preset_id))
+
+    def compile_rules(self, rules: dict) -> RulePlan:
+        """
+        Resolve a rules config into an execution plan: enabled rules from the
+        registry, sorted by priority, with parameters merged over defaults.
+        """
+        plan = []
+        for rule in sorted(registry.get_all_rules(), key=lambda r: r.priority):
+            rule_config = rules.get(rule.id)
+            if rule_config and rule_config.get("enabled"):
+                params = rule.get_default_params()
+                params.update(rule_config.get("parameters") or {})
+                plan.append((rule, params))
+        return plan
+
+    def get_preset_plan(self, preset_id: str) -> RulePlan:
+        """
+        Get the compiled plan for a preset, cached until presets.yaml or the
+        rule registry changes. Plans are shared; do not mutate their params.
+        """
+        with self._lock:
+            presets = self._cached_presets()
+            try:
+                key = (*self._file_key(), registry.get_version())
+            except FileNotFoundError:
+                return []
+
+            cache_key = (str(self.presets_path), preset_id)
+            cached = self._plan_cache.get(cache_key)
+            if cached is None or cached[0] != key:
+                preset = presets.get(preset_id)
+                if not preset or "rules" not in preset:
+                    plan = ()
+                else:
+                    plan = tuple(self.compile_rules(preset["rules"]))
+                cached = (key, plan)
+                self._plan_cache[cache_key] = cached
+            return list(cached[1])
 
     def save_presets(self, presets_data: dict):
         """Save a dictionary of presets to the YAML file."""
         data = {"presets": presets_data}
         try:
-            # Ensure directory exists
-            self.presets_path.parent.mkdir(parents=True, exist_ok=True)
-
-            with open(self.presets_path, "w", encoding="utf-8") as f:
-                yaml.dump(
-                    data,
-                    f,
-                    allow_unicode=True,
-                    default_flow_style=False,
-                    sort_keys=False,
+            with self._lock:
+                # Ensure directory exists
+                self.presets_path.parent.mkdir(parents=True, exist_ok=True)
+
+                # Write to a temp file and swap it in, so readers never see a
+                # partially written presets.yaml
+                fd, tmp_path = tempfile.mkstemp(
+                    dir=self.presets_path.parent, suffix=".yaml.tmp"
+                )
+                try:
+                    with os.fdopen(fd, "w", encoding="utf-8") as f:
+                        yaml.dump(
+                            data,
+                            f,
+                            allow_unicode=True,
+                            default_flow_style=False,
+                            sort_keys=False,
+                        )
+                    os.replace(tmp_path, self.presets_path)
+                except BaseException:
+                    os.unlink(tmp_path)
+                    raise
+
+                path = str(self.presets_path)
+                self._presets_cache[path] = (
+                    self._file_key(),
+                    copy.deepcopy(presets_data),
                 )
+                for cache_key in [k for k in self._plan_cache if k[0] == path]:
+                    del self._plan_cache[cache_key]
             return True
         except Exception as e:
             print(f"Error saving presets: {e}")
@@ -43,6 +138,7 @@ class RuleParser:
 
     def update_preset(self, preset_id: str, preset_content: dict):
         """Update or create a single preset."""
-        presets = self.load_presets()
-        presets[preset_id] = preset_content
-        return self.save_presets(presets)
+        with self._lock:
+            presets = self.load_presets()
+            presets[preset_id] = preset_content
+            return self.save_presets(presets)
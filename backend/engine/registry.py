@@ -1,3 +1,4 @@
+import threading
 from typing import Dict, List, Optional
 from backend.engine.base import BaseRule
 
@@ -5,9 +6,12 @@ from backend.engine.base import BaseRule
 class RuleRegistry:
     """
     规则注册表，负责规则的收集和检索。
+    注册与读取都在锁内完成，可在多个处理线程之间共享。
     """
 
     _rules: Dict[str, BaseRule] = {}
+    _lock = threading.RLock()
+    _version: int = 0  # 每次注册/清空时递增，用于使编译后的预设失效
 
     @classmethod
     def register(cls, rule_instance: BaseRule):
@@ -16,27 +20,39 @@ class RuleRegistry:
             raise ValueError(
                 f"Rule {rule_instance.__class__.__name__} must have an id."
             )
-        cls._rules[rule_instance.id] = rule_instance
+        with cls._lock:
+            cls._rules[rule_instance.id] = rule_instance
+            cls._version += 1
 
     @classmethod
     def get_rule(cls, rule_id: str) -> Optional[BaseRule]:
         """获取指定 ID 的规则"""
-        return cls._rules.get(rule_id)
+        with cls._lock:
+            return cls._rules.get(rule_id)
 
     @classmethod
     def get_all_rules(cls) -> List[BaseRule]:
         """获取所有已注册的规则"""
-        return list(cls._rules.values())
+        with cls._lock:
+            return list(cls._rules.values())
 
     @classmethod
     def get_rules_by_category(cls, category: str) -> List[BaseRule]:
         """获取指定分类的所有规则"""
-        return [rule for rule in cls._rules.values() if rule.category == category]
+        with cls._lock:
+            return [rule for rule in cls._rules.values() if rule.category == category]
 
     @classmethod
     def clear(cls):
         """清空注册表 (主要用于测试)"""
-        cls._rules = {}
+        with cls._lock:
+            cls._rules = {}
+            cls._version += 1
+
+    @classmethod
+    def get_version(cls) -> int:
+        """获取注册表版本号"""
+        return cls._version
 
 
 # 全局注册表实例
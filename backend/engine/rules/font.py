@@ -1,77 +1,153 @@
 from typing import Dict, Any, List
 from docx import Document
 from docx.shared import Pt, RGBColor
-from docx.oxml.ns import qn
-from backend.engine.base import BaseRule
+from backend.engine import kernels, styles
+from backend.engine.base import TraversalRule
+from backend.engine.fixes import Fix, IndexRanges
 from backend.engine.registry import registry
 
 
-class FontStandardRule(BaseRule):
+class FontStandardRule(TraversalRule):
     id = "font_standard"
     name = "标准字体规则"
     category = "font"
     description = "为文档中的所有段落设置标准的中西文字体和大小。"
     priority = 10
+    package_parts = frozenset({"document", "styles"})
+    partition_safe = True
+
+    # 样式模式下会覆盖样式字体的主题字体属性
+    THEME_FONTS = (
+        kernels.tag("w:asciiTheme"),
+        kernels.tag("w:hAnsiTheme"),
+        kernels.tag("w:eastAsiaTheme"),
+    )
 
     def get_default_params(self) -> Dict[str, Any]:
-        return {"western_font": "Arial", "chinese_font": "SimSun", "font_size_body": 12}
+        # mode: "direct" 逐个 run 写入字体；"style" 修改 docDefaults / Normal /
+        # Heading N 样式并移除冲突的直接格式 (标题样式只统一字体，保留字号)
+        return {
+            "western_font": "Arial",
+            "chinese_font": "SimSun",
+            "font_size_body": 12,
+            "mode": "direct",
+        }
 
-    def apply(self, doc: Document, params: Dict[str, Any]) -> List[Dict[str, Any]]:
-        fixes = []
+    def can_partition(self, params: Dict[str, Any]) -> bool:
+        # 样式模式修改的是整个文档共享的 styles.xml
+        mode = params.get("mode", self.get_default_params()["mode"])
+        return mode != "style" and super().can_partition(params)
+
+    def begin(self, doc: Document, ctx) -> None:
         defaults = self.get_default_params()
-        western_font = params.get("western_font", defaults["western_font"])
-        chinese_font = params.get("chinese_font", defaults["chinese_font"])
-        font_size = params.get("font_size_body", defaults["font_size_body"])
-
-        for i, para in enumerate(doc.paragraphs):
-            changed = False
-            for run in para.runs:
-                if run.font.name != western_font:
-                    run.font.name = western_font
-                    changed = True
-                if run._element.rPr is not None:
-                    rFonts = run._element.rPr.rFonts
-                    if rFonts is not None:
-                        rFonts.set(qn("w:eastAsia"), chinese_font)
-                if run.font.size != Pt(font_size):
-                    run.font.size = Pt(font_size)
-                    changed = True
-
-            if changed:
-                fixes.append(
-                    {
-                        "id": f"fix_font_{i}",
-                        "rule_id": self.id,
-                        "description": f"已应用字体 {western_font}/{chinese_font} 大小 {font_size}pt",
-                        "paragraph_indices": [i],
-                        "before": None,
-                        "after": str(
-                            {
-                                "western_font": western_font,
-                                "chinese_font": chinese_font,
-                                "font_size_pt": font_size,
-                            }
-                        ),
-                        "location": {"paragraph_index": i, "type": "font_standard"},
-                    }
+        params = ctx.params
+        ctx.state["western_font"] = params.get("western_font", defaults["western_font"])
+        ctx.state["chinese_font"] = params.get("chinese_font", defaults["chinese_font"])
+        ctx.state["font_size"] = params.get(
+            "font_size_body", defaults["font_size_body"]
+        )
+        ctx.state["size"] = Pt(ctx.state["font_size"])
+        ctx.state["size_xml"] = kernels.hps_xml(ctx.state["size"])
+        ctx.state["changed"] = IndexRanges()
+        ctx.state["styles"] = []
+        if params.get("mode", defaults["mode"]) == "style":
+            self._apply_styles(doc, ctx)
+            ctx.hooks = frozenset()  # 不再需要逐个访问 run
+
+    def _apply_styles(self, doc: Document, ctx) -> None:
+        state = ctx.state
+        sheet = styles.StyleSheet(doc)
+        normal = [styles.DEFAULTS] + sheet.normal_ids
+        fonts_changed, fonts_affected = styles.normalize_property(
+            sheet,
+            "rPr",
+            "rFonts",
+            {
+                kernels.ASCII: state["western_font"],
+                kernels.HANSI: state["western_font"],
+                kernels.EAST_ASIA: state["chinese_font"],
+            },
+            self.THEME_FONTS,
+            normal + sheet.heading_ids,
+        )
+        size_changed, size_affected = styles.normalize_property(
+            sheet, "rPr", "sz", {kernels.VAL: state["size_xml"]}, (), normal
+        )
+        for i in sorted(set(fonts_affected) | set(size_affected)):
+            state["changed"].add(i)
+        state["styles"] = [
+            sheet.name(source) for source in dict.fromkeys(fonts_changed + size_changed)
+        ]
+
+    def visit_run(self, run, para, index: int, ctx) -> None:
+        state = ctx.state
+        r = run._r
+        changed = False
+        if kernels.font_name(r) != state["western_font"]:
+            kernels.set_font_name(r, state["western_font"])
+            changed = True
+        kernels.set_east_asia_font(r, state["chinese_font"])
+        if kernels.font_size(r) != state["size"]:
+            kernels.set_font_size(r, state["size_xml"])
+            changed = True
+
+        if changed:
+            state["changed"].add(index)
+
+    def finish(self, doc: Document, ctx) -> List[Fix]:
+        western_font = ctx.state["western_font"]
+        chinese_font = ctx.state["chinese_font"]
+        font_size = ctx.state["font_size"]
+
+        # 所有记录共享同一描述和 after 字符串
+        description = f"已应用字体 {western_font}/{chinese_font} 大小 {font_size}pt"
+        after = str(
+            {
+                "western_font": western_font,
+                "chinese_font": chinese_font,
+                "font_size_pt": font_size,
+            }
+        )
+        fixes = []
+        if ctx.state["styles"]:
+            fixes.append(
+                Fix(
+                    id="fix_font_styles",
+                    rule_id=self.id,
+                    description=f"{description} (样式: {', '.join(ctx.state['styles'])})",
+                    after=after,
+                    location={"type": "font_standard", "styles": ctx.state["styles"]},
                 )
+            )
+        fixes.extend(
+            Fix(
+                id=f"fix_font_{i}",
+                rule_id=self.id,
+                description=description,
+                paragraphs=i,
+                after=after,
+                location={"paragraph_index": i, "type": "font_standard"},
+            )
+            for i in ctx.state["changed"]
+        )
         return fixes
 
 
-class FontColorRule(BaseRule):
+class FontColorRule(TraversalRule):
     id = "font_color"
     name = "字体颜色规则"
     category = "font"
     description = "将文档全文的字体颜色设置为指定值。"
     priority = 70
+    package_parts = frozenset({"document"})
+    partition_safe = True
 
     def get_default_params(self) -> Dict[str, Any]:
         return {"text_color": "000000"}
 
-    def apply(self, doc: Document, params: Dict[str, Any]) -> List[Dict[str, Any]]:
-        fixes = []
+    def begin(self, doc: Document, ctx) -> None:
         defaults = self.get_default_params()
-        text_color = params.get("text_color", defaults["text_color"])
+        text_color = ctx.params.get("text_color", defaults["text_color"])
 
         try:
             r = int(text_color[0:2], 16)
@@ -81,40 +157,46 @@ class FontColorRule(BaseRule):
         except Exception:
             color = RGBColor(0, 0, 0)
 
-        affected_indices = []
-        for i, para in enumerate(doc.paragraphs):
-            changed = False
-            for run in para.runs:
-                if run.font.color.rgb != color:
-                    run.font.color.rgb = color
-                    changed = True
-            if changed:
-                affected_indices.append(i)
+        ctx.state["text_color"] = text_color
+        ctx.state["color"] = color
+        ctx.state["affected"] = IndexRanges()
+
+    def visit_run(self, run, para, index: int, ctx) -> None:
+        color = ctx.state["color"]
+        if kernels.color_rgb(run._r) != color:
+            kernels.set_color_rgb(run._r, color)
+            ctx.state["affected"].add(index)
+
+    def finish(self, doc: Document, ctx) -> List[Fix]:
+        fixes = []
+        text_color = ctx.state["text_color"]
+        affected_indices = ctx.state["affected"]
 
         if affected_indices:
             fixes.append(
-                {
-                    "id": "fix_font_color_all",
-                    "rule_id": self.id,
-                    "description": f"已应用字体颜色 #{text_color}",
-                    "paragraph_indices": affected_indices,
-                    "before": None,
-                    "after": f"#{text_color}",
-                    "location": {
+                Fix(
+                    id="fix_font_color_all",
+                    rule_id=self.id,
+                    description=f"已应用字体颜色 #{text_color}",
+                    paragraphs=affected_indices,
+                    after=f"#{text_color}",
+                    location={
                         "type": "font_color",
                         "affected_count": len(affected_indices),
                     },
-                }
+                )
             )
         return fixes
 
 
-class FontReplacementRule(BaseRule):
+class FontReplacementRule(TraversalRule):
     id = "font_replacement"
     name = "字体替换规则"
     category = "font"
     description = "将非标准字体替换为指定的替代字体。"
     priority = 80
+    package_parts = frozenset({"document"})
+    partition_safe = True
 
     def get_default_params(self) -> Dict[str, Any]:
         return {
@@ -129,74 +211,71 @@ class FontReplacementRule(BaseRule):
             "default_chinese_font": "SimSun",
         }
 
-    def apply(self, doc: Document, params: Dict[str, Any]) -> List[Dict[str, Any]]:
-        fixes = []
+    def begin(self, doc: Document, ctx) -> None:
         defaults = self.get_default_params()
-        font_map = params.get("font_map", defaults["font_map"])
-        default_western_font = params.get(
+        params = ctx.params
+        ctx.state["font_map"] = params.get("font_map", defaults["font_map"])
+        ctx.state["default_western_font"] = params.get(
             "default_western_font", defaults["default_western_font"]
         )
-        default_chinese_font = params.get(
+        ctx.state["default_chinese_font"] = params.get(
             "default_chinese_font", defaults["default_chinese_font"]
         )
+        ctx.state["affected"] = IndexRanges()
+
+    def visit_run(self, run, para, index: int, ctx) -> None:
+        font_map = ctx.state["font_map"]
+        default_western_font = ctx.state["default_western_font"]
+        default_chinese_font = ctx.state["default_chinese_font"]
+        r = run._r
+
+        changed = False
+        current_font = kernels.font_name(r)
+        if current_font:
+            new_font = font_map.get(current_font, default_western_font)
+            if current_font != new_font:
+                kernels.set_font_name(r, new_font)
+                changed = True
+        else:
+            kernels.set_font_name(r, default_western_font)
+            changed = True
 
-        affected_indices = []
-        for i, para in enumerate(doc.paragraphs):
-            changed = False
-            for run in para.runs:
-                if run.font.name:
-                    current_font = run.font.name
-                    if current_font in font_map:
-                        new_font = font_map[current_font]
-                        if run.font.name != new_font:
-                            run.font.name = new_font
-                            changed = True
-                    elif run.font.name != default_western_font:
-                        run.font.name = default_western_font
-                        changed = True
-                else:
-                    run.font.name = default_western_font
-                    changed = True
-
-                if run._element.rPr is not None:
-                    rFonts = run._element.rPr.rFonts
-                    if rFonts is not None:
-                        east_asia_font = rFonts.get(qn("w:eastAsia"))
-                        if east_asia_font:
-                            if east_asia_font in font_map:
-                                new_font = font_map[east_asia_font]
-                                if rFonts.get(qn("w:eastAsia")) != new_font:
-                                    rFonts.set(qn("w:eastAsia"), new_font)
-                                    changed = True
-                            elif rFonts.get(qn("w:eastAsia")) != default_chinese_font:
-                                rFonts.set(qn("w:eastAsia"), default_chinese_font)
-                                changed = True
-                        else:
-                            rFonts.set(qn("w:eastAsia"), default_chinese_font)
-                            changed = True
-
-            if changed:
-                affected_indices.append(i)
+        # rFonts 一定存在 (上面已设置或原本就有 ascii 字体)
+        east_asia_font = kernels.east_asia_font(r)
+        new_font = default_chinese_font
+        if east_asia_font:
+            new_font = font_map.get(east_asia_font, default_chinese_font)
+        if not east_asia_font or east_asia_font != new_font:
+            kernels.set_east_asia_font(r, new_font)
+            changed = True
+
+        if changed:
+            ctx.state["affected"].add(index)
+
+    def finish(self, doc: Document, ctx) -> List[Fix]:
+        fixes = []
+        default_western_font = ctx.state["default_western_font"]
+        default_chinese_font = ctx.state["default_chinese_font"]
+        affected_indices = ctx.state["affected"]
 
         if affected_indices:
             fixes.append(
-                {
-                    "id": "fix_font_replacement_all",
-                    "rule_id": self.id,
-                    "description": f"已将非标准字体替换为 {default_western_font}/{default_chinese_font}",
-                    "paragraph_indices": affected_indices,
-                    "before": None,
-                    "after": str(
+                Fix(
+                    id="fix_font_replacement_all",
+                    rule_id=self.id,
+                    description=f"已将非标准字体替换为 {default_western_font}/{default_chinese_font}",
+                    paragraphs=affected_indices,
+                    after=str(
                         {
                             "default_western_font": default_western_font,
                             "default_chinese_font": default_chinese_font,
                         }
                     ),
-                    "location": {
+                    location={
                         "type": "font_replacement",
                         "affected_count": len(affected_indices),
                     },
-                }
+                )
             )
         return fixes
 
@@ -2,6 +2,8 @@ from typing import Dict, Any, List
 from docx import Document
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 from backend.engine.base import BaseRule
+from backend.engine.fixes import Fix
+from backend.engine.math_index import DISPLAY, INLINE, math_index
 from backend.engine.registry import registry
 from backend.core.latex_converter import convert_latex_in_document
 
@@ -12,13 +14,21 @@ class LatexToOmmlRule(BaseRule):
     category = "formula"
     description = "将文档中的 LaTeX 公式转换为 Word 原生 OMML 公式。"
     priority = 140
+    package_parts = frozenset({"document"})
 
     def get_default_params(self) -> Dict[str, Any]:
         return {}
 
     def apply(self, doc: Document, params: Dict[str, Any]) -> List[Dict[str, Any]]:
-        # This calls the existing specialized converter
-        return convert_latex_in_document(doc)
+        # 只扫描文本中含 "$" 或反斜杠的段落，转换后刷新其公式类型
+        index = math_index(doc)
+        candidates = index.latex_paragraphs()
+        if not candidates:
+            return []
+        fixes = convert_latex_in_document(doc, candidates)
+        for _, para in candidates:
+            index.update(para._p)
+        return fixes
 
 
 class FormulaNumberingRule(BaseRule):
@@ -27,6 +37,7 @@ class FormulaNumberingRule(BaseRule):
     category = "formula"
     description = "为所有展示型公式添加自动编号。"
     priority = 150
+    package_parts = frozenset({"document"})
 
     def get_default_params(self) -> Dict[str, Any]:
         return {}
@@ -34,44 +45,34 @@ class FormulaNumberingRule(BaseRule):
     def apply(self, doc: Document, params: Dict[str, Any]) -> List[Dict[str, Any]]:
         fixes = []
         formula_counter = 1
-
-        for i, para in enumerate(doc.paragraphs):
-            # Check if paragraph contains display formulas
-            has_display_formula = False
-            for child in para._p:
-                if child.tag.endswith("oMath") or child.tag.endswith("oMathPara"):
-                    # Check if it's a display formula (typically in its own paragraph)
-                    if len(para.runs) == 0 or (
-                        len(para.runs) == 1 and not para.runs[0].text.strip()
-                    ):
-                        has_display_formula = True
-                        break
-
-            if has_display_formula:
-                # Add formula numbering
-                formula_number = f"({formula_counter})"
-                # Add numbering to the end of the paragraph
-                before_text = para.text
-                para.add_run(f" {formula_number}")
-                after_text = para.text
-                # Increment counter
-                formula_counter += 1
-                # Add fix to list
-                fixes.append(
-                    {
-                        "id": f"fix_formula_numbering_{i}",
-                        "rule_id": "formula_numbering",
-                        "description": f"Added formula numbering ({formula_counter-1})",
-                        "paragraph_indices": [i],
-                        "before": before_text,
-                        "after": after_text,
-                        "location": {
-                            "paragraph_index": i,
-                            "type": "display_formula",
-                            "number": formula_counter - 1,
-                        },
-                    }
+        index = math_index(doc)
+
+        # 展示公式：单独成段 (没有 run 或只有一个空白 run) 的公式段落
+        for i, para in index.paragraphs(DISPLAY):
+            # Add numbering to the end of the paragraph
+            formula_number = f"({formula_counter})"
+            before_text = para.text
+            para.add_run(f" {formula_number}")
+            index.update(para._p)
+            after_text = para.text
+            # Increment counter
+            formula_counter += 1
+            # Add fix to list
+            fixes.append(
+                Fix(
+                    id=f"fix_formula_numbering_{i}",
+                    rule_id="formula_numbering",
+                    description=f"Added formula numbering ({formula_counter-1})",
+                    paragraphs=i,
+                    before=before_text,
+                    after=after_text,
+                    location={
+                        "paragraph_index": i,
+                        "type": "display_formula",
+                        "number": formula_counter - 1,
+                    },
                 )
+            )
 
         return fixes
 
@@ -82,6 +83,7 @@ class InlineFormulaStyleRule(BaseRule):
     category = "formula"
     description = "统一行内公式的字体和垂直对齐方式。"
     priority = 160
+    package_parts = frozenset({"document"})
 
     def get_default_params(self) -> Dict[str, Any]:
         return {}
@@ -89,27 +91,18 @@ class InlineFormulaStyleRule(BaseRule):
     def apply(self, doc: Document, params: Dict[str, Any]) -> List[Dict[str, Any]]:
         fixes = []
 
-        for i, para in enumerate(doc.paragraphs):
-            # Check if paragraph contains inline formulas
-            has_inline_formula = False
-            for child in para._p:
-                if child.tag.endswith("oMath"):
-                    # Check if it's an inline formula (not in its own paragraph)
-                    if len(para.runs) > 0 and para.runs[0].text.strip():
-                        has_inline_formula = True
-                        break
-
-            if has_inline_formula:
-                # For inline formulas, we can adjust the font size or other properties
-                # Here we'll just mark it as fixed for now
-                fixes.append(
-                    {
-                        "id": f"fix_inline_formula_style_{i}",
-                        "rule_id": "inline_formula_style",
-                        "description": "Applied inline formula style",
-                        "paragraph_indices": [i],
-                    }
+        # 行内公式：第一个 run 有文字且含 m:oMath 的段落
+        for i, para in math_index(doc).paragraphs(INLINE):
+            # For inline formulas, we can adjust the font size or other properties
+            # Here we'll just mark it as fixed for now
+            fixes.append(
+                Fix(
+                    id=f"fix_inline_formula_style_{i}",
+                    rule_id="inline_formula_style",
+                    description="Applied inline formula style",
+                    paragraphs=i,
                 )
+            )
 
         return fixes
 
@@ -120,6 +113,7 @@ class DisplayFormulaCenterRule(BaseRule):
     category = "formula"
     description = "将所有展示型公式设置为居中对齐。"
     priority = 170
+    package_parts = frozenset({"document"})
 
     def get_default_params(self) -> Dict[str, Any]:
         return {}
@@ -127,30 +121,18 @@ class DisplayFormulaCenterRule(BaseRule):
     def apply(self, doc: Document, params: Dict[str, Any]) -> List[Dict[str, Any]]:
         fixes = []
 
-        for i, para in enumerate(doc.paragraphs):
-            # Check if paragraph contains display formulas
-            has_display_formula = False
-            for child in para._p:
-                if child.tag.endswith("oMath") or child.tag.endswith("oMathPara"):
-                    # Check if it's a display formula (typically in its own paragraph)
-                    if len(para.runs) == 0 or (
-                        len(para.runs) == 1 and not para.runs[0].text.strip()
-                    ):
-                        has_display_formula = True
-                        break
-
-            if has_display_formula:
-                # Center the paragraph
-                if para.paragraph_format.alignment != WD_PARAGRAPH_ALIGNMENT.CENTER:
-                    para.paragraph_format.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-                    fixes.append(
-                        {
-                            "id": f"fix_display_formula_center_{i}",
-                            "rule_id": "display_formula_center",
-                            "description": "Centered display formula",
-                            "paragraph_indices": [i],
-                        }
+        for i, para in math_index(doc).paragraphs(DISPLAY):
+            # Center the paragraph
+            if para.paragraph_format.alignment != WD_PARAGRAPH_ALIGNMENT.CENTER:
+                para.paragraph_format.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+                fixes.append(
+                    Fix(
+                        id=f"fix_display_formula_center_{i}",
+                        rule_id="display_formula_center",
+                        description="Centered display formula",
+                        paragraphs=i,
                     )
+                )
 
         return fixes
 
@@ -2,116 +2,109 @@ from typing import Dict, Any, List
 from docx import Document
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 from docx.shared import Pt
-from backend.engine.base import BaseRule
+from backend.engine.base import BaseRule, TraversalRule
+from backend.engine.fixes import Fix
 from backend.engine.registry import registry
 
+WP_NAMESPACES = {
+    "wp": "http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing"
+}
 
-class ImageCenterRule(BaseRule):
+
+class ImageCenterRule(TraversalRule):
     id = "image_center"
     name = "图片居中规则"
     category = "image"
     description = "将文档中包含图片的段落设置为居中对齐。"
     priority = 110
+    package_parts = frozenset({"document"})
+    partition_safe = True
 
     def get_default_params(self) -> Dict[str, Any]:
         return {}
 
-    def apply(self, doc: Document, params: Dict[str, Any]) -> List[Dict[str, Any]]:
-        fixes = []
-        for i, para in enumerate(doc.paragraphs):
-            has_image = False
-            for run in para.runs:
-                if run._element.xpath(".//a:blip"):
-                    has_image = True
-                    break
-            if has_image:
-                before_alignment = para.paragraph_format.alignment
-                if before_alignment != WD_PARAGRAPH_ALIGNMENT.CENTER:
-                    para.paragraph_format.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-                    fixes.append(
-                        {
-                            "id": f"fix_image_center_{i}",
-                            "rule_id": self.id,
-                            "description": f"已将第 {i+1} 段中的图片居中",
-                            "paragraph_indices": [i],
-                            "before": str(before_alignment),
-                            "after": str(WD_PARAGRAPH_ALIGNMENT.CENTER),
-                            "location": {
-                                "paragraph_index": i,
-                                "type": "image_alignment",
-                            },
-                        }
-                    )
-        return fixes
+    def visit_paragraph(self, para, index: int, ctx) -> None:
+        if not para._p.xpath("./w:r//a:blip"):
+            return
+        before_alignment = para.paragraph_format.alignment
+        if before_alignment != WD_PARAGRAPH_ALIGNMENT.CENTER:
+            para.paragraph_format.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+            ctx.fixes.append(
+                Fix(
+                    id=f"fix_image_center_{index}",
+                    rule_id=self.id,
+                    description=f"已将第 {index+1} 段中的图片居中",
+                    paragraphs=index,
+                    before=str(before_alignment),
+                    after=str(WD_PARAGRAPH_ALIGNMENT.CENTER),
+                    location={
+                        "paragraph_index": index,
+                        "type": "image_alignment",
+                    },
+                )
+            )
 
 
-class ImageResizeRule(BaseRule):
+class ImageResizeRule(TraversalRule):
     id = "image_resize"
     name = "图片重缩放规则"
     category = "image"
     description = "自动调整过大图片的尺寸以适应页面布局。"
     priority = 120
+    package_parts = frozenset({"document"})
+    partition_safe = True
 
     def get_default_params(self) -> Dict[str, Any]:
         return {"max_width": 6.0, "max_height": 8.0}
 
-    def apply(self, doc: Document, params: Dict[str, Any]) -> List[Dict[str, Any]]:
-        fixes = []
+    def begin(self, doc: Document, ctx) -> None:
         defaults = self.get_default_params()
-        max_width = params.get("max_width", defaults["max_width"])
-        max_height = params.get("max_height", defaults["max_height"])
-        max_width_emu = int(max_width * 914400)
-        max_height_emu = int(max_height * 914400)
-
-        for i, para in enumerate(doc.paragraphs):
-            for run in para.runs:
-                drawings = run._element.xpath(".//w:drawing")
-                for drawing in drawings:
-                    for tag in ["wp:inline", "wp:anchor"]:
-                        element = drawing.find(
-                            f".//{tag}",
-                            namespaces={
-                                "wp": "http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing"
-                            },
-                        )
-                        if element is not None:
-                            extent = element.find(
-                                ".//wp:extent",
-                                namespaces={
-                                    "wp": "http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing"
-                                },
-                            )
-                            if extent is not None:
-                                cx, cy = int(extent.get("cx")), int(extent.get("cy"))
-                                if cx > max_width_emu or cy > max_height_emu:
-                                    before_size = {"cx": cx, "cy": cy}
-                                    ratio = cx / cy
-                                    if ratio > 1:
-                                        new_cx = max_width_emu
-                                        new_cy = int(new_cx / ratio)
-                                    else:
-                                        new_cy = max_height_emu
-                                        new_cx = int(new_cy * ratio)
-                                    extent.set("cx", str(new_cx))
-                                    extent.set("cy", str(new_cy))
-                                    after_size = {"cx": new_cx, "cy": new_cy}
-                                    fixes.append(
-                                        {
-                                            "id": f"fix_image_resize_{i}",
-                                            "rule_id": self.id,
-                                            "description": f"已缩放第 {i+1} 段中的图片",
-                                            "paragraph_indices": [i],
-                                            "before": str(before_size),
-                                            "after": str(after_size),
-                                            "location": {
-                                                "paragraph_index": i,
-                                                "type": "image_extent",
-                                                "max_width_in": max_width,
-                                                "max_height_in": max_height,
-                                            },
-                                        }
-                                    )
-        return fixes
+        max_width = ctx.params.get("max_width", defaults["max_width"])
+        max_height = ctx.params.get("max_height", defaults["max_height"])
+        ctx.state["max_width"] = max_width
+        ctx.state["max_height"] = max_height
+        ctx.state["max_width_emu"] = int(max_width * 914400)
+        ctx.state["max_height_emu"] = int(max_height * 914400)
+
+    def visit_drawing(self, drawing, para, index: int, ctx) -> None:
+        max_width_emu = ctx.state["max_width_emu"]
+        max_height_emu = ctx.state["max_height_emu"]
+        for tag in ["wp:inline", "wp:anchor"]:
+            element = drawing.find(f".//{tag}", namespaces=WP_NAMESPACES)
+            if element is None:
+                continue
+            extent = element.find(".//wp:extent", namespaces=WP_NAMESPACES)
+            if extent is None:
+                continue
+            cx, cy = int(extent.get("cx")), int(extent.get("cy"))
+            if cx > max_width_emu or cy > max_height_emu:
+                before_size = {"cx": cx, "cy": cy}
+                ratio = cx / cy
+                if ratio > 1:
+                    new_cx = max_width_emu
+                    new_cy = int(new_cx / ratio)
+                else:
+                    new_cy = max_height_emu
+                    new_cx = int(new_cy * ratio)
+                extent.set("cx", str(new_cx))
+                extent.set("cy", str(new_cy))
+                after_size = {"cx": new_cx, "cy": new_cy}
+                ctx.fixes.append(
+                    Fix(
+                        id=f"fix_image_resize_{index}",
+                        rule_id=self.id,
+                        description=f"已缩放第 {index+1} 段中的图片",
+                        paragraphs=index,
+                        before=str(before_size),
+                        after=str(after_size),
+                        location={
+                            "paragraph_index": index,
+                            "type": "image_extent",
+                            "max_width_in": ctx.state["max_width"],
+                            "max_height_in": ctx.state["max_height"],
+                        },
+                    )
+                )
 
 
 class ImageCaptionRule(BaseRule):
@@ -120,6 +113,7 @@ class ImageCaptionRule(BaseRule):
     category = "image"
     description = "为图片添加默认的题注占位符或序号。"
     priority = 130
+    package_parts = frozenset({"document"})
 
     def get_default_params(self) -> Dict[str, Any]:
         return {"caption_format": "图 {number}", "caption_font_size": 10}
@@ -157,18 +151,17 @@ class ImageCaptionRule(BaseRule):
 
                 image_counter += 1
                 fixes.append(
-                    {
-                        "id": f"fix_image_caption_{i}",
-                        "rule_id": self.id,
-                        "description": f"已为第 {i+1} 段中的图片添加题注 '{caption_text}'",
-                        "paragraph_indices": [i],
-                        "before": None,
-                        "after": caption_text,
-                        "location": {
+                    Fix(
+                        id=f"fix_image_caption_{i}",
+                        rule_id=self.id,
+                        description=f"已为第 {i+1} 段中的图片添加题注 '{caption_text}'",
+                        paragraphs=i,
+                        after=caption_text,
+                        location={
                             "paragraph_index": i,
                             "type": "image_caption",
                         },
-                    }
+                    )
                 )
 
         return fixes
@@ -2,6 +2,7 @@ from typing import Dict, Any, List
 from docx import Document
 from docx.shared import Cm
 from backend.engine.base import BaseRule
+from backend.engine.fixes import Fix
 from backend.engine.registry import registry
 
 
@@ -11,6 +12,7 @@ class PageLayoutRule(BaseRule):
     category = "page"
     description = "设置页面尺寸与页边距。"
     priority = 5
+    package_parts = frozenset({"document"})
 
     def get_default_params(self) -> Dict[str, Any]:
         return {
@@ -70,14 +72,14 @@ class PageLayoutRule(BaseRule):
         }
 
         fixes.append(
-            {
-                "id": "fix_page_layout",
-                "rule_id": self.id,
-                "description": "已应用页面尺寸与页边距",
-                "before": str(before),
-                "after": str(after),
-                "location": {"type": "page_layout", "section_index": 0},
-            }
+            Fix(
+                id="fix_page_layout",
+                rule_id=self.id,
+                description="已应用页面尺寸与页边距",
+                before=str(before),
+                after=str(after),
+                location={"type": "page_layout", "section_index": 0},
+            )
         )
 
         return fixes
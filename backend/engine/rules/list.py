@@ -2,6 +2,7 @@ import re
 from typing import Dict, Any, List
 from docx import Document
 from backend.engine.base import BaseRule
+from backend.engine.fixes import Fix, IndexRanges
 from backend.engine.registry import registry
 
 
@@ -11,13 +12,14 @@ class ListNumberingRule(BaseRule):
     category = "list"
     description = "将形如 '1.' 或 '-' 开头的段落规范为 Word 列表样式。"
     priority = 55
+    package_parts = frozenset({"document", "styles"})
 
     def get_default_params(self) -> Dict[str, Any]:
         return {}
 
     def apply(self, doc: Document, params: Dict[str, Any]) -> List[Dict[str, Any]]:
         fixes: List[Dict[str, Any]] = []
-        affected: List[int] = []
+        affected = IndexRanges()
 
         for i, para in enumerate(doc.paragraphs):
             before_text = para.text
@@ -35,7 +37,7 @@ class ListNumberingRule(BaseRule):
                 except Exception:
                     pass
                 para.text = content
-                affected.append(i)
+                affected.add(i)
             elif unordered_match:
                 content = unordered_match.group(1)
                 try:
@@ -43,38 +45,36 @@ class ListNumberingRule(BaseRule):
                 except Exception:
                     pass
                 para.text = content
-                affected.append(i)
+                affected.add(i)
             else:
                 continue
 
             after_text = para.text
             fixes.append(
-                {
-                    "id": f"fix_list_numbering_{i}",
-                    "rule_id": self.id,
-                    "description": "已规范列表项",
-                    "paragraph_indices": [i],
-                    "before": before_text,
-                    "after": after_text,
-                    "location": {"type": "list_item", "paragraph_index": i},
-                }
+                Fix(
+                    id=f"fix_list_numbering_{i}",
+                    rule_id=self.id,
+                    description="已规范列表项",
+                    paragraphs=i,
+                    before=before_text,
+                    after=after_text,
+                    location={"type": "list_item", "paragraph_index": i},
+                )
             )
 
         if affected:
             fixes.insert(
                 0,
-                {
-                    "id": "fix_list_numbering_summary",
-                    "rule_id": self.id,
-                    "description": f"已规范 {len(affected)} 个列表项",
-                    "paragraph_indices": affected,
-                    "before": None,
-                    "after": None,
-                    "location": {
+                Fix(
+                    id="fix_list_numbering_summary",
+                    rule_id=self.id,
+                    description=f"已规范 {len(affected)} 个列表项",
+                    paragraphs=affected,
+                    location={
                         "type": "list_numbering",
                         "affected_count": len(affected),
                     },
-                },
+                ),
             )
 
         return fixes
@@ -3,6 +3,7 @@ from docx import Document
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 from docx.shared import Inches
 from backend.engine.base import BaseRule
+from backend.engine.fixes import Fix
 from backend.engine.registry import registry
 import re
 import subprocess
@@ -16,6 +17,7 @@ class MermaidRenderRule(BaseRule):
     category = "image"
     description = "将Markdown中的Mermaid代码块转换为图片并插入文档。"
     priority = 135
+    package_parts = frozenset({"document", "media"})
 
     def get_default_params(self) -> Dict[str, Any]:
         return {
@@ -133,36 +135,35 @@ class MermaidRenderRule(BaseRule):
                         os.remove(image_path)
 
                     fixes.append(
-                        {
-                            "id": f"fix_mermaid_render_{i}",
-                            "rule_id": self.id,
-                            "description": f"已将第 {i+1} 段中的Mermaid图表渲染为图片",
-                            "paragraph_indices": [i],
-                            "before": text[:100] + "..." if len(text) > 100 else text,
-                            "after": "[Mermaid图表]",
-                            "location": {
+                        Fix(
+                            id=f"fix_mermaid_render_{i}",
+                            rule_id=self.id,
+                            description=f"已将第 {i+1} 段中的Mermaid图表渲染为图片",
+                            paragraphs=i,
+                            before=text[:100] + "..." if len(text) > 100 else text,
+                            after="[Mermaid图表]",
+                            location={
                                 "paragraph_index": i,
                                 "type": "mermaid_diagram",
                             },
-                        }
+                        )
                     )
 
                 except Exception as e:
                     # 如果渲染失败，记录错误但继续处理
                     fixes.append(
-                        {
-                            "id": f"fix_mermaid_render_error_{i}",
-                            "rule_id": self.id,
-                            "description": f"第 {i+1} 段Mermaid渲染失败: {str(e)}",
-                            "paragraph_indices": [i],
-                            "before": text[:100] + "..." if len(text) > 100 else text,
-                            "after": None,
-                            "location": {
+                        Fix(
+                            id=f"fix_mermaid_render_error_{i}",
+                            rule_id=self.id,
+                            description=f"第 {i+1} 段Mermaid渲染失败: {str(e)}",
+                            paragraphs=i,
+                            before=text[:100] + "..." if len(text) > 100 else text,
+                            location={
                                 "paragraph_index": i,
                                 "type": "mermaid_error",
                                 "error": str(e),
                             },
-                        }
+                        )
                     )
 
         return fixes
@@ -1,192 +1,282 @@
 from typing import Dict, Any, List
 from docx import Document
-from docx.shared import Pt
-from backend.engine.base import BaseRule
+from docx.enum.text import WD_LINE_SPACING
+from docx.shared import Emu, Pt, Twips
+from backend.engine import kernels, styles
+from backend.engine.base import TraversalRule
+from backend.engine.fixes import Fix, IndexRanges
 from backend.engine.registry import registry
 
+HEADING_STYLES = ("Heading 1", "Heading 2", "Heading 3", "Heading 4", "Title")
 
-class ParagraphSpacingRule(BaseRule):
+
+class ParagraphSpacingRule(TraversalRule):
     id = "paragraph_spacing"
     name = "段落间距规则"
     category = "paragraph"
     description = "设置文档段落的行间距和段前段后距离。"
     priority = 50
+    package_parts = frozenset({"document", "styles"})
+    partition_safe = True
+
+    # 会覆盖 before / after 的间距属性
+    CONFLICTING = (
+        kernels.tag("w:beforeLines"),
+        kernels.tag("w:afterLines"),
+        kernels.tag("w:beforeAutospacing"),
+        kernels.tag("w:afterAutospacing"),
+    )
 
     def get_default_params(self) -> Dict[str, Any]:
-        return {"line_spacing": 1.5, "space_before": 0, "space_after": 6}
+        # mode: "direct" 逐段写入间距；"style" 修改 docDefaults / Normal /
+        # Heading N 样式并移除冲突的直接格式
+        return {
+            "line_spacing": 1.5,
+            "space_before": 0,
+            "space_after": 6,
+            "mode": "direct",
+        }
 
-    def apply(self, doc: Document, params: Dict[str, Any]) -> List[Dict[str, Any]]:
-        fixes = []
+    def can_partition(self, params: Dict[str, Any]) -> bool:
+        # 样式模式修改的是整个文档共享的 styles.xml
+        mode = params.get("mode", self.get_default_params()["mode"])
+        return mode != "style" and super().can_partition(params)
+
+    def begin(self, doc: Document, ctx) -> None:
         defaults = self.get_default_params()
-        line_spacing = params.get("line_spacing", defaults["line_spacing"])
-        space_before = params.get("space_before", defaults["space_before"])
-        space_after = params.get("space_after", defaults["space_after"])
-
-        affected_indices = []
-        for i, para in enumerate(doc.paragraphs):
-            pf = para.paragraph_format
-            pf.line_spacing = line_spacing
-            pf.space_before = Pt(space_before)
-            pf.space_after = Pt(space_after)
-            affected_indices.append(i)
+        params = ctx.params
+        ctx.state["line_spacing"] = params.get("line_spacing", defaults["line_spacing"])
+        ctx.state["space_before"] = params.get("space_before", defaults["space_before"])
+        ctx.state["space_after"] = params.get("space_after", defaults["space_after"])
+        # 与 paragraph_format.line_spacing (倍数) / space_before / space_after
+        # 写入的属性值相同
+        ctx.state["spacing_xml"] = (
+            kernels.twips_xml(Emu(ctx.state["line_spacing"] * Twips(240))),
+            WD_LINE_SPACING.MULTIPLE.xml_value,
+            kernels.twips_xml(Pt(ctx.state["space_before"])),
+            kernels.twips_xml(Pt(ctx.state["space_after"])),
+        )
+        ctx.state["affected"] = IndexRanges()
+        ctx.state["styles"] = []
+        if params.get("mode", defaults["mode"]) == "style":
+            self._apply_styles(doc, ctx)
+            ctx.hooks = frozenset()  # 不再需要逐段访问
+
+    def _apply_styles(self, doc: Document, ctx) -> None:
+        sheet = styles.StyleSheet(doc)
+        values = dict(
+            zip(
+                (kernels.LINE, kernels.LINE_RULE, kernels.BEFORE, kernels.AFTER),
+                ctx.state["spacing_xml"],
+            )
+        )
+        changed, affected = styles.normalize_property(
+            sheet,
+            "pPr",
+            "spacing",
+            values,
+            self.CONFLICTING,
+            [styles.DEFAULTS] + sheet.normal_ids + sheet.heading_ids,
+        )
+        ctx.state["affected"] = affected
+        ctx.state["styles"] = [sheet.name(source) for source in changed]
+
+    def visit_paragraph(self, para, index: int, ctx) -> None:
+        kernels.set_spacing(para._p, *ctx.state["spacing_xml"])
+        ctx.state["affected"].add(index)
 
+    def finish(self, doc: Document, ctx) -> List[Fix]:
+        fixes = []
+        line_spacing = ctx.state["line_spacing"]
+        space_before = ctx.state["space_before"]
+        space_after = ctx.state["space_after"]
+        affected_indices = ctx.state["affected"]
+
+        description = (
+            f"已应用行间距 {line_spacing}x，段前 {space_before}pt，段后 {space_after}pt"
+        )
+        after = str(
+            {
+                "line_spacing": line_spacing,
+                "space_before_pt": space_before,
+                "space_after_pt": space_after,
+            }
+        )
+        if ctx.state["styles"]:
+            fixes.append(
+                Fix(
+                    id="fix_spacing_styles",
+                    rule_id=self.id,
+                    description=f"{description} (样式: {', '.join(ctx.state['styles'])})",
+                    after=after,
+                    location={
+                        "type": "paragraph_spacing",
+                        "styles": ctx.state["styles"],
+                    },
+                )
+            )
         if affected_indices:
             fixes.append(
-                {
-                    "id": "fix_spacing_all",
-                    "rule_id": self.id,
-                    "description": f"已应用行间距 {line_spacing}x，段前 {space_before}pt，段后 {space_after}pt",
-                    "paragraph_indices": affected_indices,
-                    "before": None,
-                    "after": str(
-                        {
-                            "line_spacing": line_spacing,
-                            "space_before_pt": space_before,
-                            "space_after_pt": space_after,
-                        }
-                    ),
-                    "location": {
+                Fix(
+                    id="fix_spacing_all",
+                    rule_id=self.id,
+                    description=description,
+                    paragraphs=affected_indices,
+                    after=after,
+                    location={
                         "type": "paragraph_spacing",
                         "affected_count": len(affected_indices),
                     },
-                }
+                )
             )
         return fixes
 
 
-class FirstLineIndentRule(BaseRule):
+class FirstLineIndentRule(TraversalRule):
     id = "first_line_indent"
     name = "首行缩进规则"
     category = "paragraph"
     description = "为正文段落应用首行缩进。"
     priority = 90
+    package_parts = frozenset({"document", "styles"})
+    partition_safe = True
 
     def get_default_params(self) -> Dict[str, Any]:
         return {"indent_size": 2}
 
-    def apply(self, doc: Document, params: Dict[str, Any]) -> List[Dict[str, Any]]:
-        fixes = []
+    def begin(self, doc: Document, ctx) -> None:
         defaults = self.get_default_params()
-        indent_size = params.get("indent_size", defaults["indent_size"])
-        indent_pt = Pt(indent_size * 12)
-        heading_styles = ["Heading 1", "Heading 2", "Heading 3", "Heading 4", "Title"]
-
-        affected_indices = []
-        for i, para in enumerate(doc.paragraphs):
-            if para.style and para.style.name in heading_styles:
-                continue
-            if not para.text.strip():
-                continue
-            pf = para.paragraph_format
-            if pf.first_line_indent != indent_pt:
-                pf.first_line_indent = indent_pt
-                affected_indices.append(i)
+        indent_size = ctx.params.get("indent_size", defaults["indent_size"])
+        ctx.state["indent_size"] = indent_size
+        ctx.state["indent_pt"] = Pt(indent_size * 12)
+        ctx.state["affected"] = IndexRanges()
+
+    def visit_paragraph(self, para, index: int, ctx) -> None:
+        if ctx.walk.style_name(para) in HEADING_STYLES:
+            return
+        p = para._p
+        if not kernels.has_text(p):
+            return
+        if kernels.first_line_indent(p) != ctx.state["indent_pt"]:
+            kernels.set_first_line_indent(p, ctx.state["indent_pt"])
+            ctx.state["affected"].add(index)
+
+    def finish(self, doc: Document, ctx) -> List[Fix]:
+        fixes = []
+        indent_size = ctx.state["indent_size"]
+        indent_pt = ctx.state["indent_pt"]
+        affected_indices = ctx.state["affected"]
 
         if affected_indices:
             fixes.append(
-                {
-                    "id": "fix_first_line_indent",
-                    "rule_id": self.id,
-                    "description": f"已应用 {indent_size} 字符首行缩进",
-                    "paragraph_indices": affected_indices,
-                    "before": None,
-                    "after": str(
+                Fix(
+                    id="fix_first_line_indent",
+                    rule_id=self.id,
+                    description=f"已应用 {indent_size} 字符首行缩进",
+                    paragraphs=affected_indices,
+                    after=str(
                         {"indent_size": indent_size, "indent_pt": int(indent_pt.pt)}
                     ),
-                    "location": {
+                    location={
                         "type": "first_line_indent",
                         "affected_count": len(affected_indices),
                     },
-                }
+                )
             )
         return fixes
 
 
-class TitleBoldRule(BaseRule):
+class TitleBoldRule(TraversalRule):
     id = "title_bold"
     name = "标题加粗规则"
     category = "heading"
     description = "确保所有标题层级都应用加粗样式。"
     priority = 60
+    package_parts = frozenset({"document", "styles"})
+    partition_safe = True
 
-    def apply(self, doc: Document, params: Dict[str, Any]) -> List[Dict[str, Any]]:
-        fixes = []
-        heading_styles = ["Heading 1", "Heading 2", "Heading 3", "Heading 4", "Title"]
-        for i, para in enumerate(doc.paragraphs):
-            if para.style and para.style.name in heading_styles:
-                changed = False
-                for run in para.runs:
-                    if not run.bold:
-                        run.bold = True
-                        changed = True
-                if changed:
-                    fixes.append(
-                        {
-                            "id": f"fix_title_bold_{i}",
-                            "rule_id": self.id,
-                            "description": f"已将标题 '{para.style.name}' 加粗",
-                            "paragraph_indices": [i],
-                            "before": None,
-                            "after": "bold=true",
-                            "location": {
-                                "paragraph_index": i,
-                                "type": "title_bold",
-                                "style": para.style.name,
-                            },
-                        }
-                    )
-        return fixes
+    def visit_paragraph(self, para, index: int, ctx) -> None:
+        style_name = ctx.walk.style_name(para)
+        if style_name not in HEADING_STYLES:
+            return
+        changed = False
+        for r in kernels.runs(para._p):
+            if not kernels.is_bold(r):
+                kernels.set_bold(r)
+                changed = True
+        if changed:
+            ctx.fixes.append(
+                Fix(
+                    id=f"fix_title_bold_{index}",
+                    rule_id=self.id,
+                    description=f"已将标题 '{style_name}' 加粗",
+                    paragraphs=index,
+                    after="bold=true",
+                    location={
+                        "paragraph_index": index,
+                        "type": "title_bold",
+                        "style": style_name,
+                    },
+                )
+            )
 
 
-class HeadingStyleRule(BaseRule):
+class HeadingStyleRule(TraversalRule):
     id = "heading_style"
     name = "标题样式规则"
     category = "heading"
     description = "统一各级标题的字体大小和样式。"
     priority = 100
+    package_parts = frozenset({"document", "styles"})
+    partition_safe = True
 
     def get_default_params(self) -> Dict[str, Any]:
         return {"h1_size": 22, "h2_size": 16, "h3_size": 14}
 
-    def apply(self, doc: Document, params: Dict[str, Any]) -> List[Dict[str, Any]]:
-        fixes = []
+    def begin(self, doc: Document, ctx) -> None:
         defaults = self.get_default_params()
-        h1_size = params.get("h1_size", defaults["h1_size"])
-        h2_size = params.get("h2_size", defaults["h2_size"])
-        h3_size = params.get("h3_size", defaults["h3_size"])
+        h1_size = ctx.params.get("h1_size", defaults["h1_size"])
+        h2_size = ctx.params.get("h2_size", defaults["h2_size"])
+        h3_size = ctx.params.get("h3_size", defaults["h3_size"])
 
-        size_map = {
+        ctx.state["size_map"] = {
             "Heading 1": h1_size,
             "Heading 2": h2_size,
             "Heading 3": h3_size,
             "Title": h1_size + 4,
         }
-        for i, para in enumerate(doc.paragraphs):
-            if para.style and para.style.name in size_map:
-                target_size = size_map[para.style.name]
-                changed = False
-                for run in para.runs:
-                    if run.font.size != Pt(target_size):
-                        run.font.size = Pt(target_size)
-                        run.bold = True
-                        changed = True
-                if changed:
-                    fixes.append(
-                        {
-                            "id": f"fix_heading_{i}",
-                            "rule_id": self.id,
-                            "description": f"已应用 {target_size}pt 到标题 {para.style.name}",
-                            "paragraph_indices": [i],
-                            "before": None,
-                            "after": str({"target_size_pt": target_size, "bold": True}),
-                            "location": {
-                                "paragraph_index": i,
-                                "type": "heading_style",
-                                "style": para.style.name,
-                            },
-                        }
-                    )
-        return fixes
+        ctx.state["sizes"] = {
+            style_name: (Pt(size), kernels.hps_xml(Pt(size)))
+            for style_name, size in ctx.state["size_map"].items()
+        }
+
+    def visit_paragraph(self, para, index: int, ctx) -> None:
+        style_name = ctx.walk.style_name(para)
+        if style_name not in ctx.state["size_map"]:
+            return
+        target_size = ctx.state["size_map"][style_name]
+        size, size_xml = ctx.state["sizes"][style_name]
+        changed = False
+        for r in kernels.runs(para._p):
+            if kernels.font_size(r) != size:
+                kernels.set_font_size(r, size_xml)
+                kernels.set_bold(r)
+                changed = True
+        if changed:
+            ctx.fixes.append(
+                Fix(
+                    id=f"fix_heading_{index}",
+                    rule_id=self.id,
+                    description=f"已应用 {target_size}pt 到标题 {style_name}",
+                    paragraphs=index,
+                    after=str({"target_size_pt": target_size, "bold": True}),
+                    location={
+                        "paragraph_index": index,
+                        "type": "heading_style",
+                        "style": style_name,
+                    },
+                )
+            )
 
 
 registry.register(ParagraphSpacingRule())
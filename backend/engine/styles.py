@@ -0,0 +1,218 @@
+"""
+样式模式 (style mode) 的公共实现。
+
+直接模式的规则为每个 run / 段落写入显式格式，工作量和输出体积都与正文
+大小成正比。样式模式改为修改 styles.xml 中的 docDefaults、Normal 和
+Heading N 样式，再只移除正文中与之冲突的直接格式，使格式由样式继承。
+
+某个属性 (例如 w:rPr/w:rFonts) 对段落生效的来源，是段落样式的 basedOn
+链上第一个定义该属性的样式，都没有定义时为 docDefaults。只有来源是本次
+修改的样式时，段落才会受样式修改影响，其直接格式才算冲突；来源是其他
+样式 (例如自定义的 Quote 样式) 的段落保持不变。
+
+与直接模式一致，只处理正文中的段落 (不含表格内的段落) 和段落的直接
+w:r 子元素。
+"""
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from docx.enum.style import WD_STYLE_TYPE
+from docx.oxml import OxmlElement
+from backend.engine import kernels
+from backend.engine.fixes import IndexRanges
+
+# docDefaults 作为属性来源时的键 (样式 ID 均为字符串)
+DEFAULTS = None
+
+NORMAL_STYLE = "normal"
+HEADING_STYLES = tuple(f"heading {level}" for level in range(1, 10))
+
+_P = kernels.tag("w:p")
+_STYLE = kernels.tag("w:style")
+_DOC_DEFAULTS = kernels.tag("w:docDefaults")
+
+
+class StyleSheet:
+    """
+    styles.xml 中段落样式的查找与修改。
+
+    Args:
+        doc: python-docx Document
+    """
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.element = doc.styles.element
+        self._styles = {}
+        self.normal_ids: List[str] = []
+        self.heading_ids: List[str] = []
+        for style in self.element.iterchildren(_STYLE):
+            if style.type != WD_STYLE_TYPE.PARAGRAPH or style.styleId is None:
+                continue
+            self._styles[style.styleId] = style
+            name = (style.name_val or "").lower()
+            if name == NORMAL_STYLE:
+                self.normal_ids.append(style.styleId)
+            elif name in HEADING_STYLES:
+                self.heading_ids.append(style.styleId)
+        default = self.element.default_for(WD_STYLE_TYPE.PARAGRAPH)
+        self.default_id = None if default is None else default.styleId
+        self._sources: Dict[Tuple[Optional[str], str], Optional[str]] = {}
+        self._paragraphs = None
+
+    def name(self, source: Optional[str]) -> str:
+        """来源的显示名称。"""
+        if source is DEFAULTS:
+            return "docDefaults"
+        return self._styles[source].name_val or source
+
+    def properties(self, source: Optional[str], kind: str):
+        """来源的 w:rPr / w:pPr 元素 (kind 为 "rPr" 或 "pPr")，不存在时创建。"""
+        if source is not DEFAULTS:
+            return kernels.get_or_add(self._styles[source], kind)
+
+        doc_defaults = kernels.child(self.element, _DOC_DEFAULTS)
+        if doc_defaults is None:
+            doc_defaults = OxmlElement("w:docDefaults")
+            self.element.insert(0, doc_defaults)
+        container = kernels.child(doc_defaults, kernels.tag(f"w:{kind}Default"))
+        if container is None:
+            container = OxmlElement(f"w:{kind}Default")
+            # schema 顺序: rPrDefault, pPrDefault
+            if kind == "rPr":
+                doc_defaults.insert(0, container)
+            else:
+                doc_defaults.append(container)
+        element = kernels.child(container, kernels.tag(f"w:{kind}"))
+        if element is None:
+            element = OxmlElement(f"w:{kind}")
+            container.append(element)
+        return element
+
+    def source(self, style_id: Optional[str], path: str) -> Optional[str]:
+        """
+        属性 path (例如 "w:rPr/w:rFonts") 对使用 style_id 的段落生效的来源：
+        basedOn 链上第一个定义它的样式 ID，都没有时为 DEFAULTS。
+        """
+        key = (style_id, path)
+        if key not in self._sources:
+            find = kernels.xpath(f"./{path}")
+            source = DEFAULTS
+            seen = set()
+            current = style_id
+            while current in self._styles and current not in seen:
+                seen.add(current)
+                style = self._styles[current]
+                if find(style):
+                    source = current
+                    break
+                current = style.basedOn_val
+            self._sources[key] = source
+        return self._sources[key]
+
+    def paragraphs(self) -> List[Tuple[object, Optional[str]]]:
+        """正文段落及其样式 ID (未指定样式时为默认段落样式)，按下标排列。"""
+        if self._paragraphs is None:
+            default_id = self.default_id
+            self._paragraphs = [
+                (p, kernels.style_id(p) or default_id)
+                for p in self.doc.element.body.iterchildren(_P)
+            ]
+        return self._paragraphs
+
+
+def set_attributes(element, values: Dict[str, str], remove: Iterable[str] = ()) -> bool:
+    """设置属性值并移除 remove 中的属性，返回元素是否被修改。"""
+    changed = False
+    attrib = element.attrib
+    for attr in remove:
+        if attr not in values and attrib.pop(attr, None) is not None:
+            changed = True
+    for attr, value in values.items():
+        if attrib.get(attr) != value:
+            attrib[attr] = value
+            changed = True
+    return changed
+
+
+def strip_attributes(element, targets: Dict[str, str], remove: Iterable[str]) -> bool:
+    """
+    从直接格式元素中移除属性，没有剩余属性时移除元素本身。
+
+    Returns:
+        是否有被移除的属性值与 targets 不同 (即格式的实际效果发生变化)
+    """
+    changed = False
+    attrib = element.attrib
+    for attr in remove:
+        value = attrib.pop(attr, None)
+        if value is not None and value != targets.get(attr):
+            changed = True
+    if not len(attrib):
+        # 同时移除因此变空的 w:rPr / w:pPr
+        parent = element.getparent()
+        parent.remove(element)
+        if not len(parent) and not len(parent.attrib):
+            parent.getparent().remove(parent)
+    return changed
+
+
+def normalize_property(
+    sheet: StyleSheet,
+    kind: str,
+    name: str,
+    values: Dict[str, str],
+    conflicting: Iterable[str],
+    sources: Iterable[Optional[str]],
+) -> Tuple[List[Optional[str]], IndexRanges]:
+    """
+    在 sources 中写入属性值，并移除正文中与之冲突的直接格式。
+
+    Args:
+        sheet: StyleSheet
+        kind: "rPr" (run 属性) 或 "pPr" (段落属性)
+        name: 属性元素名，例如 "rFonts" / "sz" / "spacing"
+        values: 要写入的属性 {qn 属性名: 值}
+        conflicting: 会覆盖 values 的属性 (例如主题字体)，从样式中移除；
+            直接格式中的 values 属性和 conflicting 属性都会被移除
+        sources: 要修改的来源 (DEFAULTS 或样式 ID)
+
+    Returns:
+        (值被修改的来源列表, 格式实际发生变化的段落下标)。
+        run 属性只对包含 run 的段落计数。
+    """
+    sources = list(dict.fromkeys(sources))
+    changed: List[Optional[str]] = []
+    for source in sources:
+        element = kernels.get_or_add(sheet.properties(source, kind), name)
+        if set_attributes(element, values, conflicting):
+            changed.append(source)
+
+    owned: Set[Optional[str]] = set(sources)
+    changed_set = set(changed)
+    path = f"w:{kind}/w:{name}"
+    runs_only = kind == "rPr"
+
+    # 段落下标、其格式是否由本次修改的来源决定、是否受影响
+    paragraphs: Dict[object, Tuple[int, bool]] = {}
+    flags: List[bool] = []
+    for index, (p, style_id) in enumerate(sheet.paragraphs()):
+        source = sheet.source(style_id, path)
+        paragraphs[p] = (index, source in owned)
+        flags.append(
+            source in changed_set
+            and (not runs_only or kernels.child(p, kernels.R) is not None)
+        )
+
+    removable = tuple(values) + tuple(a for a in conflicting if a not in values)
+    direct = kernels.xpath(f"./w:p/w:r/{path}" if runs_only else f"./w:p/{path}")
+    for element in direct(sheet.doc.element.body):
+        index, is_owned = paragraphs[next(element.iterancestors(_P))]
+        if is_owned and strip_attributes(element, values, removable):
+            flags[index] = True
+
+    affected = IndexRanges()
+    for index, flag in enumerate(flags):
+        if flag:
+            affected.add(index)
+    return changed, affected
@@ -0,0 +1,223 @@
+"""
+单次遍历规则执行引擎。
+
+对一组支持遍历钩子的规则，按优先级只遍历一次文档正文：
+每个段落依次调用各规则的 visit_paragraph / visit_run / visit_drawing，
+每个表格依次调用 visit_table。段落的 run 和 drawing 列表在同一段落内
+只构建一次，供所有规则共享。
+"""
+
+from time import perf_counter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from docx import Document
+from docx.oxml.ns import qn
+from docx.table import Table
+from docx.text.paragraph import Paragraph
+from docx.text.run import Run
+from backend.engine import kernels
+from backend.engine.base import BaseRule
+
+_P_TAG = qn("w:p")
+_TBL_TAG = qn("w:tbl")
+_DRAWING_TAG = qn("w:drawing")
+
+_PARAGRAPH_HOOKS = frozenset({"visit_paragraph", "visit_run", "visit_drawing"})
+_RUN_HOOKS = frozenset({"visit_run", "visit_drawing"})
+
+RulePlan = List[Tuple[BaseRule, Dict[str, Any]]]
+
+
+class DocumentWalk:
+    """一次遍历内所有规则共享的缓存。"""
+
+    def __init__(self, doc: Document):
+        self.doc = doc
+        self._style_names: Dict[Optional[str], Optional[str]] = {}
+
+    def style_name(self, para: Paragraph) -> Optional[str]:
+        """返回段落样式名，按样式 ID 缓存以避免重复查找 styles.xml。"""
+        style_id = kernels.style_id(para._p)
+        if style_id not in self._style_names:
+            style = para.style
+            self._style_names[style_id] = style.name if style is not None else None
+        return self._style_names[style_id]
+
+
+class RuleContext:
+    """单条规则在一次遍历中的执行上下文。"""
+
+    __slots__ = (
+        "rule",
+        "params",
+        "hooks",
+        "walk",
+        "state",
+        "fixes",
+        "error",
+        "elapsed",
+        "paragraphs",
+        "runs",
+        "tables",
+    )
+
+    def __init__(self, rule: BaseRule, params: Dict[str, Any], walk: DocumentWalk):
+        self.rule = rule
+        self.params = params
+        self.hooks = rule.traversal_hooks()
+        self.walk = walk
+        self.state: Dict[str, Any] = {}
+        self.fixes: List[Dict[str, Any]] = []
+        self.error: Optional[Exception] = None
+        # 统计信息：本规则钩子耗时 (秒) 及访问的段落/run/表格数量
+        self.elapsed = 0.0
+        self.paragraphs = 0
+        self.runs = 0
+        self.tables = 0
+
+
+def group_rules(plan: RulePlan) -> Iterator[RulePlan]:
+    """
+    将按优先级排序的规则切分为执行分组。
+    连续的遍历规则合并为一组，传统 apply 规则单独成组并作为分组边界，
+    从而保证规则之间的先后顺序与逐条执行时一致。
+    """
+    group: RulePlan = []
+    for rule, params in plan:
+        if rule.supports_traversal:
+            group.append((rule, params))
+            continue
+        if group:
+            yield group
+            group = []
+        yield [(rule, params)]
+    if group:
+        yield group
+
+
+class Traversal:
+    """
+    一次正文遍历：构造时调用各规则的 begin，visit() 逐个访问正文的直接
+    子元素，finish() 调用各规则的 finish。
+
+    run_traversal() 按顺序访问整个正文；流式处理 (见 backend.core.streaming)
+    在解析 document.xml 的同时逐块调用 visit()，此时 doc 的正文为空。
+
+    单条规则抛出的异常记录在其 ctx.error 中，该规则在本次遍历的剩余部分
+    被跳过，其余规则不受影响。
+
+    Args:
+        doc: python-docx Document，begin / finish 及钩子中的段落、表格
+            通过它访问样式等包部件
+        plan: 遍历规则及参数
+        para_start / table_start: 第一个段落/表格的下标。doc 只包含完整
+            正文的一个分区时 (见 backend.core.partition)，用于使规则看到的
+            下标与完整正文一致
+    """
+
+    def __init__(
+        self, doc: Document, plan: RulePlan, para_start: int = 0, table_start: int = 0
+    ):
+        self.doc = doc
+        walk = DocumentWalk(doc)
+        self.contexts = [RuleContext(rule, params, walk) for rule, params in plan]
+
+        for ctx in self.contexts:
+            start = perf_counter()
+            try:
+                ctx.rule.begin(doc, ctx)
+            except Exception as e:
+                ctx.error = e
+            ctx.elapsed += perf_counter() - start
+
+        self._para_ctxs = [ctx for ctx in self.contexts if ctx.hooks & _PARAGRAPH_HOOKS]
+        self._table_ctxs = [ctx for ctx in self.contexts if "visit_table" in ctx.hooks]
+        self._need_runs = any(ctx.hooks & _RUN_HOOKS for ctx in self._para_ctxs)
+        self._parent = doc._body
+        self.para_index = para_start
+        self.table_index = table_start
+
+    def visit(self, child):
+        """访问正文的一个直接子元素 (段落和表格之外的元素被忽略)。"""
+        if child.tag == _P_TAG:
+            if self._para_ctxs:
+                _visit_paragraph(
+                    Paragraph(child, self._parent),
+                    self.para_index,
+                    self._para_ctxs,
+                    self._need_runs,
+                )
+            self.para_index += 1
+        elif child.tag == _TBL_TAG:
+            if self._table_ctxs:
+                table = Table(child, self._parent)
+                for ctx in self._table_ctxs:
+                    if ctx.error is not None:
+                        continue
+                    start = perf_counter()
+                    try:
+                        ctx.rule.visit_table(table, self.table_index, ctx)
+                    except Exception as e:
+                        ctx.error = e
+                    ctx.elapsed += perf_counter() - start
+                    ctx.tables += 1
+            self.table_index += 1
+
+    def finish(self) -> List[RuleContext]:
+        """
+        Returns:
+            与 plan 顺序一致的 RuleContext 列表
+        """
+        for ctx in self.contexts:
+            if ctx.error is not None:
+                continue
+            start = perf_counter()
+            try:
+                ctx.fixes = ctx.rule.finish(self.doc, ctx) or []
+            except Exception as e:
+                ctx.error = e
+            ctx.elapsed += perf_counter() - start
+        return self.contexts
+
+
+def run_traversal(
+    doc: Document, plan: RulePlan, para_start: int = 0, table_start: int = 0
+) -> List[RuleContext]:
+    """
+    在一次正文遍历中执行 plan 中的所有遍历规则 (参数见 Traversal)。
+
+    Returns:
+        与 plan 顺序一致的 RuleContext 列表
+    """
+    traversal = Traversal(doc, plan, para_start, table_start)
+    visit = traversal.visit
+    for child in doc.element.body.iterchildren():
+        visit(child)
+    return traversal.finish()
+
+
+def _visit_paragraph(
+    para: Paragraph, index: int, contexts: List[RuleContext], need_runs: bool
+):
+    runs = [Run(r, para) for r in kernels.runs(para._p)] if need_runs else []
+    drawings = None
+    for ctx in contexts:
+        if ctx.error is not None:
+            continue
+        rule = ctx.rule
+        start = perf_counter()
+        try:
+            if "visit_paragraph" in ctx.hooks:
+                rule.visit_paragraph(para, index, ctx)
+            if "visit_run" in ctx.hooks:
+                for run in runs:
+                    rule.visit_run(run, para, index, ctx)
+                ctx.runs += len(runs)
+            if "visit_drawing" in ctx.hooks:
+                if drawings is None:
+                    drawings = [d for run in runs for d in run._r.iter(_DRAWING_TAG)]
+                for drawing in drawings:
+                    rule.visit_drawing(drawing, para, index, ctx)
+        except Exception as e:
+            ctx.error = e
+        ctx.elapsed += perf_counter() - start
+        ctx.paragraphs += 1
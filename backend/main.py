@@ -1,13 +1,31 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from typing import List
 from backend.core.config import settings
+from backend.core.executor import shutdown_executor
+from backend.core.batch_queue import batch_queue
+from backend.core.cache import get_formula_cache, get_result_cache
+from backend.core.metrics import processing_metrics
 from backend.api import routes
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Push batch progress to /ws/progress subscribers
+    batch_queue.set_notifier(app.state.ws_manager.broadcast)
+    yield
+    # Stop batch workers and document processing workers
+    await batch_queue.stop()
+    shutdown_executor(wait=False)
+
+
 app = FastAPI(
     title="Md2Docx API",
     description="Backend service for Md2Docx desktop application",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -17,6 +35,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Profile-Id"],
 )
 
 # Include router - support both /api and /api/v1 prefixes
@@ -30,6 +49,41 @@ async def health_check():
     return {"status": "ok", "version": "1.0.0"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Processing metrics in Prometheus text exposition format."""
+    cache_stats = get_result_cache().get_stats()
+    gauges = {
+        "md2docx_batch_queue_depth": (
+            "Batch jobs waiting to be picked up.",
+            batch_queue.queue_depth(),
+        ),
+        "md2docx_result_cache_entries": (
+            "Processing results stored in the result cache.",
+            cache_stats["entries"],
+        ),
+        "md2docx_result_cache_size_bytes": (
+            "Bytes stored in the result cache.",
+            cache_stats["size_bytes"],
+        ),
+    }
+    formula_cache = get_formula_cache()
+    if formula_cache is not None:
+        formula_stats = formula_cache.get_stats()
+        gauges["md2docx_formula_cache_entries"] = (
+            "Formula conversions stored in the formula cache.",
+            formula_stats["entries"],
+        )
+        gauges["md2docx_formula_cache_size_bytes"] = (
+            "Bytes stored in the formula cache.",
+            formula_stats["size_bytes"],
+        )
+    return PlainTextResponse(
+        processing_metrics.render(gauges),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
 # WebSocket Connection Manager
 class ConnectionManager:
     def __init__(self):
@@ -44,11 +98,12 @@ class ConnectionManager:
             self.active_connections.remove(websocket)
 
     async def broadcast(self, message: dict):
-        for connection in self.active_connections:
+        # Iterate over a copy: clients may disconnect while we are sending
+        for connection in list(self.active_connections):
             try:
                 await connection.send_json(message)
             except Exception:
-                pass
+                self.disconnect(connection)
 
 
 manager = ConnectionManager()
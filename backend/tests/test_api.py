@@ -26,6 +26,19 @@ class TestHealthCheck:
         assert "version" in data
 
 
+class TestMetrics:
+    """Test Prometheus metrics endpoint"""
+
+    def test_metrics_exposition(self):
+        response = requests.get(f"{BASE_URL}/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "# TYPE md2docx_rule_duration_seconds histogram" in response.text
+        assert "md2docx_batch_queue_depth" in response.text
+        assert "# TYPE md2docx_result_cache_lookups_total counter" in response.text
+        assert "# TYPE md2docx_result_cache_size_bytes gauge" in response.text
+
+
 class TestPresets:
     """Test preset management endpoints"""
 
@@ -167,6 +180,78 @@ class TestDocumentProcessing:
         assert "fixes" in data
         assert "total_fixes" in data
 
+    @pytest.mark.skipif(not SAMPLE_DOCX.exists(), reason="Test document not found")
+    def test_reprocess_hits_result_cache(self):
+        with open(SAMPLE_DOCX, "rb") as f:
+            files = {
+                "file": (
+                    "test.docx",
+                    f,
+                    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                )
+            }
+            doc_id = requests.post(f"{API_URL}/upload", files=files).json()[
+                "document_id"
+            ]
+
+        payload = {"document_id": doc_id, "preset": "academic"}
+        first = requests.post(f"{API_URL}/process", json=payload).json()
+        hits = requests.get(f"{API_URL}/cache/stats").json()["hits"]
+        second = requests.post(f"{API_URL}/process", json=payload).json()
+
+        assert requests.get(f"{API_URL}/cache/stats").json()["hits"] == hits + 1
+        assert second["fixes"] == first["fixes"]
+        assert second["document_id"] == doc_id
+
+    def test_process_with_profile(self):
+        files = {
+            "file": ("profile.md", b"# Title\n\nSome **bold** text", "text/markdown")
+        }
+        doc_id = requests.post(f"{API_URL}/upload", files=files).json()["document_id"]
+
+        response = requests.post(
+            f"{API_URL}/process",
+            json={"document_id": doc_id, "preset": "academic", "profile": True},
+        )
+        assert response.status_code == 200
+        assert set(response.json()["profile"]) == {"collapsed", "pstats"}
+
+        for fmt in ("collapsed", "pstats"):
+            response = requests.get(f"{API_URL}/profile/{doc_id}?format={fmt}")
+            assert response.status_code == 200
+
+        response = requests.get(f"{API_URL}/profile/{doc_id}?format=svg")
+        assert response.status_code == 400
+
+    @pytest.mark.skipif(not SAMPLE_DOCX.exists(), reason="Test document not found")
+    def test_process_fix_summary(self):
+        with open(SAMPLE_DOCX, "rb") as f:
+            files = {
+                "file": (
+                    "test.docx",
+                    f,
+                    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                )
+            }
+            doc_id = requests.post(f"{API_URL}/upload", files=files).json()[
+                "document_id"
+            ]
+
+        response = requests.post(
+            f"{API_URL}/process",
+            json={"document_id": doc_id, "preset": "academic", "fix_summary": True},
+        )
+        assert response.status_code == 200
+        rule_ids = [fix["rule_id"] for fix in response.json()["fixes"]]
+        assert len(rule_ids) == len(set(rule_ids))
+
+    def test_rule_test_profile_disabled_by_default(self):
+        response = requests.post(
+            f"{API_URL}/rules/test",
+            json={"markdown": "# Title", "config": {}, "profile": True},
+        )
+        assert response.status_code == 403
+
     def test_upload_invalid_format(self):
         files = {"file": ("test.txt", b"plain text content", "text/plain")}
         response = requests.post(f"{API_URL}/upload", files=files)
@@ -0,0 +1,56 @@
+"""
+Batch Job Queue Tests for Md2Docx
+Run with: pytest backend/tests/test_batch_queue.py -v
+"""
+
+import asyncio
+
+import pytest
+
+from backend.core import batch_queue as batch_queue_module
+from backend.core.batch_queue import BatchJobQueue
+from backend.core.config import settings
+
+
+class TestBatchJobQueue:
+    """Test running queued batch jobs on the batch pool"""
+
+    def test_running_items_bounded_across_jobs(self, monkeypatch):
+        """Concurrent jobs share the pool's slots instead of one set each"""
+        monkeypatch.setattr(settings, "BATCH_JOB_CONCURRENCY", 3)
+        monkeypatch.setattr(batch_queue_module, "batch_worker_count", lambda: 2)
+        queue = BatchJobQueue()
+        most_running = []
+
+        async def fake_run_batch(func, document_id, preset):
+            most_running.append(
+                sum(
+                    item["status"] == "running"
+                    for job in queue.jobs.values()
+                    for item in job["results"]
+                )
+            )
+            await asyncio.sleep(0.01)
+            return 1
+
+        monkeypatch.setattr(batch_queue_module, "run_batch", fake_run_batch)
+
+        async def run():
+            jobs = [
+                queue.submit([{"document_id": f"{j}-{i}.docx"} for i in range(3)])
+                for j in range(3)
+            ]
+            await queue._queue.join()
+            await queue.stop()
+            return jobs
+
+        jobs = asyncio.run(run())
+
+        assert len(most_running) == 9
+        assert max(most_running) <= 2
+        assert all(job["status"] == "completed" for job in jobs)
+        assert sum(job["completed"] for job in jobs) == 9
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,198 @@
+"""
+Result Cache Tests for Md2Docx
+Run with: pytest backend/tests/test_cache.py -v
+"""
+
+import os
+import sqlite3
+
+import pytest
+
+from backend.core import processor
+from backend.core.cache import FormulaCache, ResultCache
+
+
+class FakeRule:
+    def __init__(self, rule_id):
+        self.id = rule_id
+
+
+class TestResultCache:
+    """Test the content-addressed result cache"""
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        return ResultCache(tmp_path / "cache", max_bytes=1024 * 1024)
+
+    def write(self, path, content: bytes):
+        path.write_bytes(content)
+        return path
+
+    def test_miss_then_hit(self, cache, tmp_path):
+        """A stored result is returned and its document linked to the output"""
+        source = self.write(tmp_path / "in.docx", b"input")
+        fixed = self.write(tmp_path / "fixed.docx", b"fixed document")
+        plan = [(FakeRule("font_standard"), {"font_size": 12})]
+        key = cache.make_key(source, plan, strict=False)
+        output = tmp_path / "out.docx"
+
+        assert cache.get(key, output) is None
+        cache.put(key, fixed, {"total_fixes": 3})
+
+        assert cache.get(key, output) == {"total_fixes": 3}
+        assert output.read_bytes() == b"fixed document"
+        stats = cache.get_stats()
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+    def test_key_depends_on_content_config_and_strict(self, cache, tmp_path):
+        """Changing the input bytes, rule params or strict flag changes the key"""
+        source = self.write(tmp_path / "in.docx", b"input")
+        plan = [(FakeRule("font_standard"), {"font_size": 12})]
+        key = cache.make_key(source, plan, strict=False)
+
+        # Parameter order does not matter
+        same_plan = [(FakeRule("font_standard"), dict(reversed(plan[0][1].items())))]
+        assert cache.make_key(source, same_plan, strict=False) == key
+
+        assert cache.make_key(source, plan, strict=True) != key
+        other_plan = [(FakeRule("font_standard"), {"font_size": 14})]
+        assert cache.make_key(source, other_plan, strict=False) != key
+        self.write(source, b"changed input")
+        assert cache.make_key(source, plan, strict=False) != key
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        """Entries beyond the byte budget are evicted oldest-first"""
+        cache = ResultCache(tmp_path / "cache", max_bytes=250)
+        fixed = self.write(tmp_path / "fixed.docx", b"x" * 100)
+
+        cache.put("a", fixed, {})
+        cache.put("b", fixed, {})
+        os.utime(cache.cache_dir / "a", ns=(1, 1))
+        os.utime(cache.cache_dir / "b", ns=(2, 2))
+        cache.put("c", fixed, {})
+
+        assert sorted(cache.cache_dir.glob("[!.]*")) == [
+            cache.cache_dir / "b",
+            cache.cache_dir / "c",
+        ]
+        stats = cache.get_stats()
+        assert (stats["evictions"], stats["entries"], stats["size_bytes"]) == (
+            1,
+            2,
+            200 + 2 * len(b"{}"),
+        )
+
+    def test_stats_without_scanning(self, cache, tmp_path, monkeypatch):
+        """Entry count and size are kept by put() and clear(), across instances"""
+        fixed = self.write(tmp_path / "fixed.docx", b"x" * 100)
+        cache.put("a", fixed, {})
+        cache.put("b", fixed, {})
+
+        other = ResultCache(cache.cache_dir, max_bytes=1024 * 1024)
+        monkeypatch.setattr(other, "_scan", None)
+        stats = other.get_stats()
+        assert (stats["entries"], stats["size_bytes"]) == (2, 2 * 102)
+
+        cache.clear()
+        assert other.get_stats()["entries"] == 0
+
+    def test_overwriting_output_keeps_cache_intact(self, cache, tmp_path):
+        """Replacing a linked output file does not touch the cached copy"""
+        fixed = self.write(tmp_path / "fixed.docx", b"cached")
+        output = tmp_path / "out.docx"
+        cache.put("k", fixed, {})
+        cache.get("k", output)
+
+        output.unlink()
+        self.write(output, b"new run")
+
+        assert (cache.cache_dir / "k" / ResultCache.FIXED_NAME).read_bytes() == (
+            b"cached"
+        )
+
+
+class TestFormulaCache:
+    """Test the persistent SQLite formula cache"""
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        return FormulaCache(tmp_path / "formulas.sqlite3", max_bytes=1024 * 1024)
+
+    def test_miss_then_hit(self, cache):
+        """Flushed conversions, including failed ones, are found again"""
+        key = cache.make_key(r"\frac{a}{b}", "1")
+
+        assert cache.get(key) == (False, None)
+        cache.put(key, b"<m:oMath/>")
+        cache.put("failed", None)
+        cache.flush()
+
+        assert cache.get(key) == (True, b"<m:oMath/>")
+        assert cache.get("failed") == (True, None)
+        stats = cache.get_stats()
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 1, 2)
+
+    def test_shared_between_instances(self, cache, tmp_path):
+        """Another connection to the same file (e.g. another worker) sees entries"""
+        cache.put("k", b"omml")
+        cache.flush()
+
+        other = FormulaCache(tmp_path / "formulas.sqlite3", max_bytes=1024 * 1024)
+        assert other.get("k") == (True, b"omml")
+
+    def test_key_depends_on_version(self, cache):
+        assert cache.make_key("x^2", "1") != cache.make_key("x^2", "2")
+        assert cache.make_key("x^2", "1") == cache.make_key("x^2", "1")
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        """Entries beyond the byte budget are evicted oldest-first"""
+        row = 1 + 100 + FormulaCache._ROW_OVERHEAD
+        cache = FormulaCache(tmp_path / "formulas.sqlite3", max_bytes=2 * row)
+        for key in "ab":
+            cache.put(key, b"x" * 100)
+            cache.flush()
+        cache.get("a")
+        cache.put("c", b"x" * 100)
+        cache.flush()
+
+        assert cache.get("b") == (False, None)
+        assert cache.get("a")[0] and cache.get("c")[0]
+        stats = cache.get_stats()
+        assert (stats["entries"], stats["size_bytes"], stats["evictions"]) == (
+            2,
+            2 * row,
+            1,
+        )
+
+    def test_hits_do_not_take_write_lock(self, tmp_path):
+        """Lookups succeed while another process holds the write lock"""
+        path = tmp_path / "formulas.sqlite3"
+        cache = FormulaCache(path, max_bytes=1024 * 1024, timeout=0.1)
+        cache.put("k", b"omml")
+        cache.flush()
+        writer = sqlite3.connect(path)
+        writer.execute("BEGIN IMMEDIATE")
+        try:
+            assert cache.get("k") == (True, b"omml")
+        finally:
+            writer.rollback()
+            writer.close()
+
+    def test_worker_job_flushes(self, cache, monkeypatch):
+        """Entries buffered during a pool job are committed when it ends"""
+
+        class FakeProcessor:
+            def process(self, document_id, *args, **kwargs):
+                cache.put(document_id, b"omml")
+                return {"total_fixes": 1}
+
+        monkeypatch.setattr(processor, "_worker_processor", FakeProcessor())
+        monkeypatch.setattr(processor, "get_formula_cache", lambda: cache)
+
+        assert processor.process_batch_item("k") == 1
+        assert cache._pending == []
+        assert cache.get("k") == (True, b"omml")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,163 @@
+"""
+DOCX Package Tests for Md2Docx
+Run with: pytest backend/tests/test_docx_package.py -v
+"""
+
+import struct
+import zipfile
+
+import pytest
+from docx import Document
+
+from backend.core import docx_package
+from backend.core.docx_package import (
+    LazyPart,
+    open_document,
+    required_parts,
+    save_document,
+)
+
+
+def raw_member(path, name) -> bytes:
+    """Compressed bytes of a zip member, as stored in the archive"""
+    with zipfile.ZipFile(path) as zf:
+        info = zf.getinfo(name)
+        with open(path, "rb") as f:
+            f.seek(info.header_offset)
+            header = struct.unpack(zipfile.structFileHeader, f.read(30))
+            f.seek(header[10] + header[11], 1)  # file name, extra field
+            return f.read(info.compress_size)
+
+
+def members(path) -> dict:
+    """{name: uncompressed bytes} of a valid zip archive"""
+    with zipfile.ZipFile(path) as zf:
+        assert zf.testzip() is None
+        return {name: zf.read(name) for name in zf.namelist()}
+
+
+class TestSaveDocument:
+    """Test saving with unmodified members copied from the source archive"""
+
+    @pytest.fixture
+    def source(self, tmp_path):
+        doc = Document()
+        doc.add_paragraph("Hello")
+        doc.add_paragraph("World")
+        path = tmp_path / "source.docx"
+        doc.save(path)
+        return path
+
+    def test_copies_untouched_members(self, source, tmp_path):
+        """Only the modified part is recompressed; the rest keep their bytes"""
+        doc = Document(source)
+        doc.paragraphs[0].runs[0].bold = True
+        output = tmp_path / "out.docx"
+
+        stats = save_document(doc, output, source_path=source)
+
+        assert stats["written"] == 1
+        with zipfile.ZipFile(output) as zf:
+            assert zf.testzip() is None
+            names = zf.namelist()
+        assert raw_member(output, "word/styles.xml") == raw_member(
+            source, "word/styles.xml"
+        )
+        assert stats["copied"] == len(names) - 1
+        assert Document(output).paragraphs[0].runs[0].bold is True
+
+    def test_raw_copy_matches_plain_save(self, source, tmp_path):
+        """Copied members hold the same content as a regular python-docx save"""
+        doc = Document(source)
+        doc.paragraphs[1].text = "Changed"
+        plain = tmp_path / "plain.docx"
+        doc.save(plain)
+
+        save_document(doc, tmp_path / "out.docx", source_path=source)
+
+        assert members(tmp_path / "out.docx") == members(plain)
+
+    def test_falls_back_without_zipfile_internals(self, source, tmp_path, monkeypatch):
+        """Members are recompressed if the private zipfile names are missing"""
+        doc = Document(source)
+        save_document(doc, tmp_path / "raw.docx", source_path=source)
+        # Simulate a Python release without one of them
+        monkeypatch.setattr(
+            docx_package, "_ZIPFILE_NAMES", docx_package._ZIPFILE_NAMES + ("_gone",)
+        )
+
+        stats = save_document(doc, tmp_path / "out.docx", source_path=source)
+
+        assert stats["copied"] == 0
+        assert stats["written"] == len(members(source))
+        assert members(tmp_path / "out.docx") == members(tmp_path / "raw.docx")
+
+    def test_without_source_is_plain_save(self, tmp_path):
+        """Documents built in memory are saved normally"""
+        doc = Document()
+        doc.add_paragraph("Converted")
+        output = tmp_path / "out.docx"
+
+        stats = save_document(doc, output)
+
+        assert stats["copied"] == 0
+        assert Document(output).paragraphs[0].text == "Converted"
+
+
+class TestLazyLoading:
+    """Test opening documents with only the declared parts loaded"""
+
+    @pytest.fixture
+    def source(self, tmp_path):
+        doc = Document()
+        doc.add_paragraph("Body", style="Heading 1")
+        doc.sections[0].header.add_paragraph("Header text")
+        path = tmp_path / "source.docx"
+        doc.save(path)
+        return path
+
+    def lazy_parts(self, doc):
+        return [p for p in doc.part.package.iter_parts() if isinstance(p, LazyPart)]
+
+    def test_undeclared_parts_stay_raw(self, source, tmp_path):
+        """Unneeded parts are not parsed and are copied as-is on save"""
+        doc = open_document(source, {"document"})
+        lazy = {str(p.partname) for p in self.lazy_parts(doc)}
+        assert {"/word/styles.xml", "/word/header1.xml"} <= lazy
+
+        doc.paragraphs[0].runs[0].bold = True
+        output = tmp_path / "out.docx"
+        stats = save_document(doc, output, source_path=source)
+
+        assert stats["written"] == 1
+        assert raw_member(output, "word/header1.xml") == raw_member(
+            source, "word/header1.xml"
+        )
+        assert Document(output).paragraphs[0].runs[0].bold is True
+
+    def test_lazy_parts_load_on_access(self, source):
+        """Using a lazy part through python-docx loads it transparently"""
+        doc = open_document(source, {"document"})
+
+        assert doc.paragraphs[0].style.name == "Heading 1"
+        assert doc.sections[0].header.paragraphs[-1].text == "Header text"
+        loaded = {str(p.partname) for p in doc.part.package.iter_parts()} - {
+            str(p.partname) for p in self.lazy_parts(doc)
+        }
+        assert {"/word/styles.xml", "/word/header1.xml"} <= loaded
+
+    def test_required_parts(self):
+        """Undeclared rules require the whole package"""
+
+        class Declared:
+            package_parts = frozenset({"document", "styles"})
+
+        class Undeclared:
+            package_parts = None
+
+        assert required_parts([(Declared(), {})]) == {"document", "styles"}
+        assert required_parts([(Declared(), {}), (Undeclared(), {})]) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -3,11 +3,38 @@ Rule Engine Core Tests for Md2Docx
 Run with: pytest backend/tests/test_engine.py -v
 """
 
+import os
+
 import pytest
+import yaml
 from docx import Document
-
-from backend.engine.base import BaseRule
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+from docx.shared import Pt, RGBColor
+
+from backend.core.config import settings
+from backend.core.preview_converter import DocxPreviewConverter
+from backend.engine import kernels
+from backend.engine.base import BaseRule, TraversalRule
+from backend.engine.fixes import Fix, IndexRanges, fix_ranges, summarize_fixes
+from backend.engine.math_index import (
+    DISPLAY,
+    INLINE,
+    MathIndex,
+    math_index,
+    shared_math_index,
+)
+from backend.engine.parser import RuleParser
 from backend.engine.registry import RuleRegistry
+from backend.engine.rules.font import FontStandardRule
+from backend.engine.rules.formula import (
+    DisplayFormulaCenterRule,
+    FormulaNumberingRule,
+    InlineFormulaStyleRule,
+    LatexToOmmlRule,
+)
+from backend.engine.rules.paragraph import ParagraphSpacingRule
+from backend.engine.traversal import group_rules, run_traversal
 
 
 class TestBaseRule:
@@ -239,5 +266,497 @@ class TestRulePriority:
         assert rules[2].id == "low"
 
 
+class TestRuleTraversal:
+    """Test single-pass fused rule traversal"""
+
+    def create_test_document(self):
+        doc = Document()
+        doc.add_paragraph("First")
+        doc.add_table(rows=1, cols=1)
+        doc.add_paragraph("Second")
+        return doc
+
+    def make_recording_rule(self, rule_id, events):
+        class RecordingRule(TraversalRule):
+            id = rule_id
+
+            def visit_paragraph(self, para, index, ctx):
+                events.append((self.id, "p", index))
+
+            def visit_table(self, table, index, ctx):
+                events.append((self.id, "t", index))
+
+            def finish(self, doc, ctx):
+                return [{"id": f"fix_{self.id}", "rule_id": self.id}]
+
+        return RecordingRule()
+
+    def test_traversal_hooks_detected(self):
+        """Rules overriding visit_* hooks support traversal"""
+
+        class LegacyRule(BaseRule):
+            id = "legacy"
+
+            def apply(self, doc, params):
+                return []
+
+        events = []
+        rule = self.make_recording_rule("visitor", events)
+        assert rule.traversal_hooks() == {"visit_paragraph", "visit_table"}
+        assert rule.supports_traversal
+        assert not LegacyRule().supports_traversal
+
+    def test_single_walk_interleaves_rules_in_order(self):
+        """All rules see each block before the walk moves on"""
+        events = []
+        first = self.make_recording_rule("first", events)
+        second = self.make_recording_rule("second", events)
+
+        contexts = run_traversal(
+            self.create_test_document(), [(first, {}), (second, {})]
+        )
+
+        assert events == [
+            ("first", "p", 0),
+            ("second", "p", 0),
+            ("first", "t", 0),
+            ("second", "t", 0),
+            ("first", "p", 1),
+            ("second", "p", 1),
+        ]
+        assert [ctx.fixes[0]["rule_id"] for ctx in contexts] == ["first", "second"]
+
+    def test_failing_rule_is_isolated(self):
+        """An exception in one rule does not stop the others"""
+
+        class BrokenRule(TraversalRule):
+            id = "broken"
+
+            def visit_paragraph(self, para, index, ctx):
+                raise RuntimeError("boom")
+
+        events = []
+        ok = self.make_recording_rule("ok", events)
+        contexts = run_traversal(
+            self.create_test_document(), [(BrokenRule(), {}), (ok, {})]
+        )
+
+        assert isinstance(contexts[0].error, RuntimeError)
+        assert contexts[1].error is None
+        assert len([e for e in events if e[1] == "p"]) == 2
+
+    def test_legacy_rules_split_groups(self):
+        """Legacy apply() rules act as barriers between fused groups"""
+
+        class LegacyRule(BaseRule):
+            id = "legacy"
+
+            def apply(self, doc, params):
+                return []
+
+        events = []
+        a = self.make_recording_rule("a", events)
+        b = self.make_recording_rule("b", events)
+        c = self.make_recording_rule("c", events)
+        legacy = LegacyRule()
+
+        groups = list(group_rules([(a, {}), (b, {}), (legacy, {}), (c, {})]))
+        assert [[rule.id for rule, _ in group] for group in groups] == [
+            ["a", "b"],
+            ["legacy"],
+            ["c"],
+        ]
+
+    def test_apply_runs_single_rule_traversal(self):
+        """TraversalRule.apply walks the document for that rule alone"""
+        events = []
+        rule = self.make_recording_rule("solo", events)
+
+        fixes = rule.apply(self.create_test_document(), {})
+
+        assert fixes == [{"id": "fix_solo", "rule_id": "solo"}]
+        assert len(events) == 3
+
+    def test_contexts_count_visits(self):
+        """Each context records its own visit counters and elapsed time"""
+        events = []
+        rule = self.make_recording_rule("counted", events)
+
+        ctx = run_traversal(self.create_test_document(), [(rule, {})])[0]
+
+        assert (ctx.paragraphs, ctx.runs, ctx.tables) == (2, 0, 1)
+        assert ctx.elapsed > 0
+
+
+class TestRuleParserCache:
+    """Test the mtime-invalidated preset cache and compiled plans"""
+
+    def setup_method(self):
+        RuleRegistry.clear()
+
+        class LowRule(BaseRule):
+            id = "low"
+            priority = 10
+
+            def apply(self, doc, params):
+                return []
+
+            def get_default_params(self):
+                return {"size": 12, "name": "SimSun"}
+
+        class HighRule(BaseRule):
+            id = "high"
+            priority = 90
+
+            def apply(self, doc, params):
+                return []
+
+        RuleRegistry.register(HighRule())
+        RuleRegistry.register(LowRule())
+
+    def write_presets(self, path, presets):
+        with open(path, "w", encoding="utf-8") as f:
+            yaml.dump({"presets": presets}, f)
+
+    def make_parser(self, tmp_path, monkeypatch):
+        path = tmp_path / "presets.yaml"
+        self.write_presets(
+            path,
+            {
+                "p": {
+                    "rules": {
+                        "high": {"enabled": True},
+                        "low": {"enabled": True, "parameters": {"size": 14}},
+                    }
+                }
+            },
+        )
+        parser = RuleParser()
+        parser.presets_path = path
+
+        self.loads = 0
+        real_safe_load = yaml.safe_load
+
+        def counting_safe_load(stream):
+            self.loads += 1
+            return real_safe_load(stream)
+
+        monkeypatch.setattr(yaml, "safe_load", counting_safe_load)
+        return parser
+
+    def test_presets_parsed_once(self, tmp_path, monkeypatch):
+        """Repeated reads of an unchanged file hit the cache"""
+        parser = self.make_parser(tmp_path, monkeypatch)
+
+        parser.get_preset("p")
+        parser.load_presets()
+        parser.get_preset_plan("p")
+
+        assert self.loads == 1
+
+    def test_returned_presets_are_copies(self, tmp_path, monkeypatch):
+        """Callers can mutate returned presets without touching the cache"""
+        parser = self.make_parser(tmp_path, monkeypatch)
+
+        parser.get_preset("p")["rules"]["high"]["enabled"] = False
+
+        assert parser.get_preset("p")["rules"]["high"]["enabled"] is True
+
+    def test_plan_sorted_with_merged_defaults(self, tmp_path, monkeypatch):
+        """Plans list enabled rules by priority with defaults merged in"""
+        parser = self.make_parser(tmp_path, monkeypatch)
+
+        plan = parser.get_preset_plan("p")
+
+        assert [rule.id for rule, _ in plan] == ["low", "high"]
+        assert plan[0][1] == {"size": 14, "name": "SimSun"}
+        assert parser.get_preset_plan("missing") == []
+
+    def test_external_change_invalidates(self, tmp_path, monkeypatch):
+        """Editing presets.yaml on disk is picked up on the next read"""
+        parser = self.make_parser(tmp_path, monkeypatch)
+        parser.get_preset_plan("p")
+
+        self.write_presets(
+            parser.presets_path, {"p": {"rules": {"high": {"enabled": True}}}}
+        )
+        stat = os.stat(parser.presets_path)
+        os.utime(parser.presets_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+        assert [rule.id for rule, _ in parser.get_preset_plan("p")] == ["high"]
+
+    def test_update_preset_invalidates(self, tmp_path, monkeypatch):
+        """update_preset replaces the file and the compiled plan"""
+        parser = self.make_parser(tmp_path, monkeypatch)
+        parser.get_preset_plan("p")
+
+        parser.update_preset("p", {"rules": {"low": {"enabled": True}}})
+
+        assert [rule.id for rule, _ in parser.get_preset_plan("p")] == ["low"]
+        assert list(tmp_path.iterdir()) == [parser.presets_path]
+
+
+class TestFixRecords:
+    """Test compact range-encoded fix records"""
+
+    def test_index_ranges_merge_consecutive(self):
+        """Ascending, duplicate and out-of-order indices collapse into ranges"""
+        ranges = IndexRanges()
+        for index in [0, 1, 1, 2, 5, 6, 9, 4]:
+            ranges.add(index)
+
+        assert ranges.to_list() == [[0, 3], [4, 7], [9, 10]]
+        assert len(ranges) == 7
+        assert list(ranges) == [0, 1, 2, 4, 5, 6, 9]
+
+    def test_fix_dict_access_and_serialization(self):
+        """Fix supports read access like the old dicts and omits None fields"""
+        fix = Fix("fix_1", "font_color", "desc", paragraphs=range(3), after="#000")
+
+        assert fix["rule_id"] == "font_color"
+        assert fix["paragraph_indices"] == [0, 1, 2]
+        assert fix.get("before") is None
+        assert "table_ranges" not in fix
+        assert fix.to_dict() == {
+            "id": "fix_1",
+            "rule_id": "font_color",
+            "description": "desc",
+            "paragraph_ranges": [[0, 3]],
+            "after": "#000",
+        }
+
+    def test_fix_ranges_accepts_legacy_dicts(self):
+        """Old-style index lists are range-encoded on read"""
+        legacy = {"id": "x", "rule_id": "r", "paragraph_indices": [3, 4, 8]}
+
+        assert fix_ranges(legacy, "paragraph") == [[3, 5], [8, 9]]
+        assert fix_ranges(legacy, "table") == []
+
+    def test_summarize_fixes(self):
+        """Summary mode merges a rule's fixes into one record"""
+        fixes = [
+            Fix(f"fix_font_{i}", "font_standard", "已应用字体", paragraphs=i, after="a")
+            for i in (0, 1, 2, 7)
+        ]
+
+        summary = summarize_fixes("font_standard", fixes)
+
+        assert summary.id == "fix_font_standard_summary"
+        assert summary.paragraph_ranges == [[0, 3], [7, 8]]
+        assert summary.after == "a"
+        assert summary.location == {"type": "font_standard", "fix_count": 4}
+
+    def test_preview_highlights_ranges(self, tmp_path):
+        """The preview maps both ranges and legacy index lists to paragraphs"""
+        doc = Document()
+        for text in ("zero", "one", "two", "three"):
+            doc.add_paragraph(text)
+        path = tmp_path / "doc.docx"
+        doc.save(path)
+
+        html = DocxPreviewConverter().convert_to_html(
+            str(path),
+            fixes=[
+                {"id": "a", "rule_id": "r1", "paragraph_ranges": [[1, 3]]},
+                {"id": "b", "rule_id": "r2", "paragraph_indices": [2]},
+            ],
+        )
+
+        assert html.count('class="highlight-fix"') == 2
+        assert 'data-fix-ids="[&#x27;a&#x27;, &#x27;b&#x27;]"' in html
+
+
+class TestRuleKernels:
+    """Test the lxml kernels against the python-docx properties they replace"""
+
+    def make_run(self, xml_props=""):
+        doc = Document()
+        run = doc.add_paragraph().add_run("text")
+        if xml_props:
+            run._r.insert(0, parse_xml(f"<w:rPr {nsdecls('w')}>{xml_props}</w:rPr>"))
+        return run
+
+    @pytest.mark.parametrize(
+        "props",
+        [
+            "",
+            '<w:rFonts w:ascii="Arial"/><w:sz w:val="21"/>',
+            '<w:b w:val="0"/><w:color w:val="auto"/>',
+            '<w:b/><w:color w:val="ff0000" w:themeColor="accent1"/>',
+        ],
+    )
+    def test_reads_match_python_docx(self, props):
+        run = self.make_run(props)
+        r = run._r
+
+        assert kernels.font_name(r) == run.font.name
+        assert kernels.font_size(r) == run.font.size
+        assert kernels.is_bold(r) == bool(run.bold)
+        assert kernels.color_rgb(r) == run.font.color.rgb
+
+    def test_writes_match_python_docx(self):
+        """New children are inserted in the same schema position"""
+        props = '<w:rStyle w:val="Emphasis"/><w:i/><w:color w:val="auto"/><w:u/>'
+        expected, actual = self.make_run(props), self.make_run(props)
+
+        expected.font.size = Pt(10.5)
+        expected.bold = True
+        expected.font.name = "Arial"
+        expected.font.color.rgb = RGBColor(0, 0, 0)
+        kernels.set_font_size(actual._r, kernels.hps_xml(Pt(10.5)))
+        kernels.set_bold(actual._r)
+        kernels.set_font_name(actual._r, "Arial")
+        kernels.set_color_rgb(actual._r, RGBColor(0, 0, 0))
+
+        assert actual._r.xml == expected._r.xml
+
+    def test_paragraph_kernels(self):
+        doc = Document()
+        para = doc.add_paragraph("\u3000 ")
+        para.paragraph_format.first_line_indent = Pt(-12)
+        p = para._p
+
+        assert kernels.has_text(p) is False
+        assert kernels.first_line_indent(p) == para.paragraph_format.first_line_indent
+        kernels.set_first_line_indent(p, Pt(24))
+        assert para.paragraph_format.first_line_indent == Pt(24)
+        para.add_run("x")
+        assert kernels.has_text(p) is True
+
+
+class TestStyleMode:
+    """Test style mode of the font and spacing rules"""
+
+    def make_document(self):
+        doc = Document()
+        doc.add_paragraph("Body").runs[0].font.name = "Comic Sans MS"
+        doc.add_heading("Heading", level=1)
+        doc.add_paragraph("Already standard").runs[0].font.size = Pt(12)
+        quote = doc.styles.add_style("Custom Quote", 1)
+        quote.base_style = doc.styles["Normal"]
+        quote.font.name = "Georgia"
+        para = doc.add_paragraph("Quote", style="Custom Quote")
+        para.runs[0].font.name = "Courier New"
+        para.paragraph_format.space_before = Pt(3)
+        return doc
+
+    def test_font_style_mode(self):
+        """Styles carry the fonts; only conflicting direct formatting is removed"""
+        doc = self.make_document()
+        params = {"mode": "style"}
+
+        fixes = FontStandardRule().apply(doc, params)
+
+        normal = doc.styles["Normal"].font
+        assert (normal.name, normal.size) == ("Arial", Pt(12))
+        assert doc.styles["Heading 1"].font.name == "Arial"
+        assert doc.styles["Heading 1"].font.size == Pt(14)
+        runs = [p.runs[0] for p in doc.paragraphs]
+        assert [run.font.name for run in runs] == [None, None, None, "Courier New"]
+        assert runs[2].font.size is None
+        # The quote keeps its own fonts but inherits the new size from Normal
+        assert [f["id"] for f in fixes] == [
+            "fix_font_styles",
+            "fix_font_0",
+            "fix_font_1",
+            "fix_font_2",
+            "fix_font_3",
+        ]
+        assert "Normal" in fixes[0]["location"]["styles"]
+        assert FontStandardRule().apply(doc, params) == []
+
+    def test_spacing_style_mode(self):
+        doc = self.make_document()
+        params = {"mode": "style"}
+
+        fixes = ParagraphSpacingRule().apply(doc, params)
+
+        normal = doc.styles["Normal"].paragraph_format
+        assert normal.line_spacing == 1.5
+        assert normal.space_after == Pt(6)
+        assert doc.paragraphs[3].paragraph_format.space_before is None
+        assert [f["id"] for f in fixes] == ["fix_spacing_styles", "fix_spacing_all"]
+        assert fixes[1]["paragraph_indices"] == [0, 1, 2, 3]
+        assert ParagraphSpacingRule().apply(doc, params) == []
+
+    def test_direct_mode_is_default(self):
+        doc = self.make_document()
+        styles_xml = doc.styles.element.xml
+
+        FontStandardRule().apply(doc, {})
+
+        assert doc.styles.element.xml == styles_xml
+        assert doc.paragraphs[0].runs[0].font.name == "Arial"
+
+
+class TestMathIndex:
+    """Test the math index shared by the formula rules"""
+
+    OMATH = f"<m:oMath {nsdecls('m')}><m:r><m:t>x</m:t></m:r></m:oMath>"
+
+    def make_doc(self):
+        doc = Document()
+        doc.add_paragraph("prose")
+        doc.add_paragraph()._p.append(parse_xml(self.OMATH))
+        doc.add_paragraph("inline ")._p.append(parse_xml(self.OMATH))
+        doc.add_paragraph("costs $5")
+        # Blank first run followed by text: neither display nor inline
+        para = doc.add_paragraph(" ")
+        para.add_run("b")
+        para._p.append(parse_xml(self.OMATH))
+        return doc
+
+    def test_records_math_paragraphs(self):
+        index = MathIndex(self.make_doc())
+
+        assert [i for i, _ in index.paragraphs(DISPLAY)] == [1]
+        assert [i for i, _ in index.paragraphs(INLINE)] == [2]
+        assert [para.text for _, para in index.latex_paragraphs()] == ["costs $5"]
+
+    def test_prose_document_is_not_walked(self):
+        doc = Document()
+        for i in range(10):
+            doc.add_paragraph(f"paragraph {i}")
+        index = MathIndex(doc)
+
+        assert index.latex_paragraphs() == []
+        assert index.paragraphs(DISPLAY) == index.paragraphs(INLINE) == []
+        assert index._positions == {}
+
+    def test_formula_rules_share_one_index(self, monkeypatch):
+        """Inside shared_math_index() the index is built once and kept current"""
+        monkeypatch.setattr(settings, "FORMULA_CACHE_ENABLED", False)
+        built = []
+        monkeypatch.setattr(
+            "backend.engine.math_index.MathIndex.__init__",
+            lambda self, doc, init=MathIndex.__init__: built.append(doc)
+            or init(self, doc),
+        )
+        doc = self.make_doc()
+        doc.add_paragraph("$$y^2$$")
+
+        with shared_math_index():
+            latex = LatexToOmmlRule().apply(doc, {})
+            center = DisplayFormulaCenterRule().apply(doc, {})
+            numbering = FormulaNumberingRule().apply(doc, {})
+            inline = InlineFormulaStyleRule().apply(doc, {})
+            assert math_index(doc) is math_index(doc)
+
+        assert len(built) == 1
+        assert [fix["location"]["paragraph_index"] for fix in latex] == [5]
+        assert [fix["id"] for fix in center] == [
+            "fix_display_formula_center_1",
+            "fix_display_formula_center_5",
+        ]
+        assert [fix["location"]["number"] for fix in numbering] == [1, 2]
+        # Numbered display formulas start with a text run, like inline ones
+        assert [fix["id"] for fix in inline] == [
+            "fix_inline_formula_style_1",
+            "fix_inline_formula_style_2",
+            "fix_inline_formula_style_5",
+        ]
+        assert math_index(doc) is not math_index(doc)
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,222 @@
+"""
+LaTeX Converter Tests for Md2Docx
+Run with: pytest backend/tests/test_latex_converter.py -v
+"""
+
+import threading
+import time
+
+import pytest
+from docx import Document
+from docx.oxml.ns import qn
+from lxml import etree
+
+from backend.core.config import settings
+from backend.core.latex_converter import (
+    FORMULA_PATTERN,
+    LaTeXConverter,
+    LatexSyntaxError,
+    OmmlMemo,
+    build_omml,
+    omml_memo,
+    xslt_transform,
+)
+from backend.core.metrics import rule_counters
+from backend.core.processor import DocumentProcessor
+from backend.engine.rules.formula import LatexToOmmlRule
+
+
+@pytest.fixture(autouse=True)
+def empty_memo(monkeypatch):
+    monkeypatch.setattr(settings, "FORMULA_CACHE_ENABLED", False)
+    omml_memo.clear()
+    yield
+    omml_memo.clear()
+
+
+class TestMemoizedConversion:
+    """Test the shared transform and the LaTeX -> OMML memo"""
+
+    def test_returns_copies(self):
+        """Repeated formulas come from the memo as independent elements"""
+        converter = LaTeXConverter()
+        first = converter.latex_to_omml(r"\frac{a}{b}")
+        second = LaTeXConverter().latex_to_omml(r" \frac{a}{b} ")
+
+        assert first is not second
+        assert etree.tostring(first) == etree.tostring(second)
+        assert len(omml_memo) == 1
+
+    def test_lru_bound(self):
+        """The least recently used entry is evicted first"""
+        memo = OmmlMemo(maxsize=2)
+        memo.put("a", None)
+        memo.put("b", None)
+        memo.get("a")
+        memo.put("c", None)
+
+        assert memo.get("a")[0] and memo.get("c")[0]
+        assert memo.get("b") == (False, None)
+        assert len(OmmlMemo(maxsize=0)) == 0
+
+    def test_transform_per_thread(self):
+        """Each thread compiles the stylesheet once"""
+        transforms = []
+        thread = threading.Thread(target=lambda: transforms.append(xslt_transform()))
+        thread.start()
+        thread.join()
+
+        assert xslt_transform() is xslt_transform()
+        assert transforms[0] is not None and transforms[0] is not xslt_transform()
+
+    def test_hit_rate_in_rule_metrics(self):
+        """LatexToOmmlRule reports memo hits and misses with its metrics"""
+        doc = Document()
+        for i in range(4):
+            doc.add_paragraph(f"Formula $x^2$ number {i}")
+        rule_metrics = []
+
+        DocumentProcessor()._execute_rules(
+            doc, [(LatexToOmmlRule(), {})], False, None, rule_metrics
+        )
+
+        assert rule_metrics[0]["counters"] == {
+            "formula_memo_hits": 3,
+            "formula_memo_misses": 1,
+        }
+        assert rule_metrics[0]["hit_rates"] == {"formula_memo": 0.75}
+
+
+class TestFormulaScanner:
+    """Test converting every formula of a paragraph in one pass"""
+
+    def test_pattern_finds_all_delimiters(self):
+        text = r"a $x$ b $$y$$ \[z\] \begin{equation}w\end{equation} $$"
+        assert [
+            (m.lastgroup, m.group(m.lastgroup)) for m in FORMULA_PATTERN.finditer(text)
+        ] == [
+            ("inline", "x"),
+            ("dollars", "y"),
+            ("brackets", "z"),
+            ("equation", "w"),
+        ]
+
+    def test_multiple_formulas_keep_run_formatting(self):
+        """Formulas spanning runs are spliced in; the other text keeps its runs"""
+        doc = Document()
+        para = doc.add_paragraph("Energy ")
+        para.add_run("$E=mc^2$ and").bold = True
+        para.add_run(" $$\\frac{a}{b}$$ then $x").italic = True
+        para.add_run("^2$ end")
+
+        fixes = LaTeXConverter().process_document(doc)
+
+        assert [fix["id"] for fix in fixes] == [
+            "fix_latex_0",
+            "fix_latex_0_1",
+            "fix_latex_0_2",
+        ]
+        assert [fix["location"]["math_type"] for fix in fixes] == [
+            "inline",
+            "display",
+            "inline",
+        ]
+        children = [etree.QName(child).localname for child in para._p]
+        assert children == ["r", "oMath", "r", "r", "oMath", "r", "oMath", "r"]
+        assert [(run.text, run.bold, run.italic) for run in para.runs] == [
+            ("Energy ", None, None),
+            (" and", True, None),
+            (" ", None, True),
+            (" then ", None, True),
+            (" end", None, None),
+        ]
+
+    def test_failed_formula_left_as_text(self, capsys):
+        doc = Document()
+        para = doc.add_paragraph("keep $\\bad{$ and $y$")
+
+        fixes = LaTeXConverter().process_document(doc)
+
+        assert [fix["before"] for fix in fixes] == ["$y$"]
+        assert para.text == "keep $\\bad{$ and "
+
+    def test_linear_in_paragraph_length(self):
+        """A paragraph with thousands of formulas and runs converts quickly"""
+        doc = Document()
+        para = doc.add_paragraph()
+        for i in range(3000):
+            para.add_run(f"term {i} is $x_{{{i % 7}}}$,").bold = i % 2 == 0
+
+        start = time.perf_counter()
+        fixes = LaTeXConverter().process_document(doc)
+        elapsed = time.perf_counter() - start
+
+        assert len(fixes) == 3000
+        assert len(para._p.findall(qn("m:oMath"))) == 3000
+        assert para.runs[-1].text == ","
+        assert elapsed < 10.0
+
+
+def children(element):
+    """Local names of the element's children."""
+    return [etree.QName(child).localname for child in element]
+
+
+class TestNativeBuilder:
+    """Test compiling LaTeX straight to OMML"""
+
+    def test_same_structure_as_mathml_path(self):
+        converter = LaTeXConverter()
+        for latex in [r"E=mc^2", r"\frac{a}{b}", r"\sqrt{x}", r"a_{ij}"]:
+            mathml = converter.mathml_to_omml(converter.latex_to_mathml(latex))
+            assert etree.tostring(build_omml(latex)) == etree.tostring(mathml).replace(
+                b' xmlns:mml="http://www.w3.org/1998/Math/MathML"', b""
+            )
+
+    def test_structures(self):
+        assert children(build_omml(r"\frac{a}{b}")[0]) == ["num", "den"]
+        assert children(build_omml(r"x_i^2")) == ["sSubSup"]
+        assert (
+            build_omml(r"\sqrt[3]{x}")
+            .find(".//" + qn("m:deg"))
+            .findtext(".//" + qn("m:t"))
+            == "3"
+        )
+        assert build_omml(r"\hat{x}")[0].tag == qn("m:acc")
+
+        nary = build_omml(r"\sum_{i=1}^{n} i^2")[0]
+        assert nary.tag == qn("m:nary")
+        assert nary.find(qn("m:naryPr") + "/" + qn("m:chr")).get(qn("m:val")) == "∑"
+        assert children(nary)[-1] == "e"
+        assert nary.find(qn("m:e")).find(".//" + qn("m:sSup")) is not None
+
+        matrix = build_omml(r"\begin{pmatrix} a & b \\ c & d \end{pmatrix}")[0]
+        assert matrix.tag == qn("m:d")
+        rows = matrix.findall(f"{qn('m:e')}/{qn('m:m')}/{qn('m:mr')}")
+        assert [len(row.findall(qn("m:e"))) for row in rows] == [2, 2]
+
+        fenced = build_omml(r"\left( x \right]")[0]
+        assert fenced.find(f"{qn('m:dPr')}/{qn('m:begChr')}").get(qn("m:val")) == "("
+        assert fenced.find(f"{qn('m:dPr')}/{qn('m:endChr')}").get(qn("m:val")) == "]"
+
+    @pytest.mark.parametrize("latex", [r"\overset{a}{b}", r"\bad{", "a^{b", "x^2^3"])
+    def test_unsupported_raises(self, latex):
+        with pytest.raises(LatexSyntaxError):
+            build_omml(latex)
+
+    def test_falls_back_to_mathml(self):
+        """Formulas the builder cannot compile go through MathML and are counted"""
+        with rule_counters() as counters:
+            omml = LaTeXConverter().latex_to_omml(r"\overset{a}{b}")
+
+        assert "".join(omml.itertext()) == "ba"
+        assert counters["formula_native_fallbacks"] == 1
+
+    def test_backend_setting(self, monkeypatch):
+        monkeypatch.setattr(settings, "FORMULA_BACKEND", "mathml")
+        omml = LaTeXConverter().latex_to_omml(r"\sum_{i} x_i")
+        assert omml.find(".//" + qn("m:nary")) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,186 @@
+"""
+Markdown Converter Backend Tests for Md2Docx
+Run with: pytest backend/tests/test_markdown_converter.py -v
+"""
+
+import io
+import time
+import zipfile
+
+import pytest
+
+from backend.core.config import settings
+from backend.core.markdown_converter import (
+    MarkdownConverter,
+    OoxmlMarkdownConverter,
+    StreamingMarkdownConverter,
+    markdown_converter,
+    read_lines,
+)
+from backend.core.processor import DocumentProcessor
+
+TABLE = "| id | name | value |\n|--|------|---|\n" + "".join(
+    f"| {i} | name {i} | {i * 3} |\n" for i in range(5000)
+)
+
+SAMPLE = """# Title with **bold**
+
+Paragraph with *italic*, `code`, [a **link**](https://example.com) and \\*escapes\\*.
+  Leading and trailing spaces
+
+## Lists
+- bullet *one*
+* bullet two
+1. first
+2. second\twith tab
+
+> quoted text
+>
+
+```python
+def f(x):
+\treturn x
+```
+
+```
+```
+
+| Name | Value | Note |
+|------|-------|------|
+| a | **1** | x |
+| b |
+
+###### Deep heading
+"""
+
+
+@pytest.fixture
+def markdown_file(tmp_path):
+    path = tmp_path / "sample.md"
+    path.write_text(SAMPLE, encoding="utf-8")
+    return path
+
+
+class TestOoxmlBackend:
+    """Test the direct OOXML emission backend"""
+
+    def test_same_document_as_python_docx(self, markdown_file):
+        """Both backends produce the same body XML and statistics"""
+        expected = MarkdownConverter()
+        expected_stats = expected.convert(markdown_file)
+        actual = OoxmlMarkdownConverter()
+        actual_stats = actual.convert(markdown_file)
+
+        assert actual_stats == expected_stats
+        assert actual.doc.element.xml == expected.doc.element.xml
+
+    def test_document_is_usable(self, markdown_file, tmp_path):
+        """The python-docx API works on the emitted document"""
+        converter = OoxmlMarkdownConverter()
+        converter.convert(markdown_file, tmp_path / "out.docx")
+
+        doc = converter.doc
+        assert doc.paragraphs[0].style.name == "Heading 1"
+        assert doc.tables[0].cell(0, 1).paragraphs[0].runs[0].bold
+        assert doc.tables[0].cell(1, 1).text == "**1**"
+        assert doc.element.body[-1].tag.endswith("sectPr")
+        assert (tmp_path / "out.docx").stat().st_size > 0
+
+    def test_backend_setting(self, monkeypatch):
+        monkeypatch.setattr(settings, "MARKDOWN_BACKEND", "docx")
+        assert type(markdown_converter()) is MarkdownConverter
+        monkeypatch.setattr(settings, "MARKDOWN_BACKEND", "ooxml")
+        assert type(markdown_converter()) is OoxmlMarkdownConverter
+
+
+class TestTables:
+    """Test building tables in bulk"""
+
+    @pytest.mark.parametrize(
+        "converter_cls", [MarkdownConverter, OoxmlMarkdownConverter]
+    )
+    def test_large_table(self, converter_cls, tmp_path):
+        """A 5,000-row table converts in linear time"""
+        path = tmp_path / "table.md"
+        path.write_text(TABLE, encoding="utf-8")
+        converter = converter_cls()
+
+        start = time.perf_counter()
+        converter.convert(path)
+        elapsed = time.perf_counter() - start
+
+        table = converter.doc.tables[0]
+        assert len(table.rows) == 5001
+        assert table.cell(0, 2).paragraphs[0].runs[0].bold
+        assert table.cell(5000, 1).text == "name 4999"
+        assert elapsed < 10.0
+
+    def test_column_width_hints(self, tmp_path, monkeypatch):
+        """Separator dashes set relative column widths when enabled"""
+        path = tmp_path / "table.md"
+        path.write_text(TABLE[:200], encoding="utf-8")
+        monkeypatch.setattr(settings, "MARKDOWN_TABLE_WIDTH_HINTS", True)
+
+        converter = OoxmlMarkdownConverter()
+        converter.convert(path)
+
+        table = converter.doc.tables[0]
+        grid = [col.w for col in table._tbl.tblGrid.gridCol_lst]
+        assert grid[1] / grid[0] == pytest.approx(3, rel=0.01)
+        assert grid[2] / grid[0] == pytest.approx(1.5, rel=0.01)
+        assert [cell.width for cell in table.rows[1].cells] == grid
+
+
+class TestStreamingConversion:
+    """Test converting Markdown while it is read"""
+
+    @pytest.mark.parametrize("content", ["", "a", "a\n", "a\n\nb", "a\r\nb\r", "\n"])
+    def test_read_lines(self, content):
+        """Lines are the same as splitting the whole file"""
+        f = io.TextIOWrapper(io.BytesIO(content.encode()), encoding="utf-8")
+        expected = content.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        assert list(read_lines(f)) == expected
+
+    def test_same_package_as_in_memory(self, markdown_file, tmp_path, monkeypatch):
+        """The streamed package equals the in-memory one, member by member"""
+        monkeypatch.setattr("backend.core.markdown_converter._FLUSH_BLOCKS", 2)
+        expected_stats = OoxmlMarkdownConverter().convert(
+            markdown_file, tmp_path / "memory.docx"
+        )
+        stats = StreamingMarkdownConverter().convert(
+            markdown_file, tmp_path / "streamed.docx"
+        )
+
+        assert stats == expected_stats
+        with zipfile.ZipFile(tmp_path / "memory.docx") as memory, zipfile.ZipFile(
+            tmp_path / "streamed.docx"
+        ) as streamed:
+            assert sorted(streamed.namelist()) == sorted(memory.namelist())
+            for name in memory.namelist():
+                assert streamed.read(name) == memory.read(name), name
+
+    def test_processor_streams_large_markdown(self, monkeypatch):
+        """Markdown above MARKDOWN_STREAMING_MIN_BYTES is converted on disk"""
+        document_id = "streaming-test.md"
+        upload = settings.UPLOAD_DIR / document_id
+        upload.write_text(SAMPLE, encoding="utf-8")
+        converted = settings.UPLOAD_DIR / f"{document_id}_converted.docx"
+        monkeypatch.setattr(settings, "MARKDOWN_STREAMING_MIN_BYTES", 0)
+        processor = DocumentProcessor()
+        monkeypatch.setattr(processor.rule_parser, "get_preset_plan", lambda _: [])
+        try:
+            result = processor.process(document_id, "custom", metrics=True)
+            assert converted.exists()
+        finally:
+            upload.unlink()
+            converted.unlink(missing_ok=True)
+            for suffix in ("_fixed.docx", "_result.json"):
+                (settings.OUTPUT_DIR / f"{document_id}{suffix}").unlink(missing_ok=True)
+
+        assert {"convert", "load"} <= set(result["metrics"]["stages"])
+        assert result["markdown_conversion"]["tables"] == 1
+        assert result["fixes"][0]["rule_id"] == "markdown_conversion"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,142 @@
+"""
+Inline Markdown Tokenizer Tests for Md2Docx
+Run with: pytest backend/tests/test_markdown_inline.py -v
+"""
+
+import time
+
+import pytest
+from docx import Document
+
+from backend.core.config import settings
+from backend.core.markdown_converter import MarkdownConverter
+from backend.core.markdown_inline import BOLD, CODE, ITALIC, LINK, tokenize_inline
+from backend.core.processor import DocumentProcessor
+from backend.engine.rules.formula import FormulaNumberingRule, LatexToOmmlRule
+
+FORMULA_MD = r"""# Formulas
+
+Inline $a^2 + b^2 = c^2$ and $\alpha + \beta$ in a sentence, plus **bold** text.
+
+$$\frac{1}{2} \int_0^1 x^2 dx$$
+
+\[ \sqrt{x+1} = \sum_{i=1}^{n} i \]
+
+Text with two $x_1$ and $y^{2}$ formulas.
+"""
+
+
+class TestTokenizeInline:
+    """Test splitting a line into formatted segments"""
+
+    @pytest.mark.parametrize(
+        "text,expected",
+        [
+            ("plain", [("plain", 0)]),
+            ("a **b** c", [("a ", 0), ("b", BOLD), (" c", 0)]),
+            ("***both***", [("both", BOLD | ITALIC)]),
+            ("2 * 3 * 4", [("2 ", 0), (" 3 ", ITALIC), (" 4", 0)]),
+            ("`x **y**`", [("x **y**", CODE)]),
+            ("``a`b``", [("a`b", CODE)]),
+            ("[docs](https://x) ok", [("docs", LINK), (" ok", 0)]),
+            ("**unclosed *x", [("**unclosed *x", 0)]),
+            ("a [x] (y)", [("a [x] (y)", 0)]),
+            ("****", [("****", 0)]),
+        ],
+    )
+    def test_segments(self, text, expected):
+        assert tokenize_inline(text) == expected
+
+    def test_nesting(self):
+        """Emphasis and links may contain other formatting"""
+        assert tokenize_inline("**bold *it* x** [a **b**](u)") == [
+            ("bold ", BOLD),
+            ("it", BOLD | ITALIC),
+            (" x", BOLD),
+            (" ", 0),
+            ("a ", LINK),
+            ("b", LINK | BOLD),
+        ]
+
+    def test_escapes(self):
+        """Escaped punctuation is literal and merged into its segment"""
+        assert tokenize_inline(r"\*not\* **b\*c** \\") == [
+            ("*not* ", 0),
+            ("b*c", BOLD),
+            (" \\", 0),
+        ]
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            r"\[ x^2 \]",
+            r"$\{a\}$",
+            r"$a \, b$",
+            r"$$\left\{ a \\ b \right.$$",
+            r"$a*b*c$",
+        ],
+    )
+    def test_math_is_verbatim(self, text):
+        """Math spans keep their backslashes and asterisks"""
+        assert tokenize_inline(text) == [(text, 0)]
+
+    def test_math_inside_formatting(self):
+        assert tokenize_inline(r"**$a \, b$** and \[x") == [
+            (r"$a \, b$", BOLD),
+            (" and [x", 0),
+        ]
+
+    def test_linear_time(self):
+        """Unclosed brackets no longer make long lines quadratic"""
+        line = "items[i] and **map[key]** `get(k)` *x* " * 3000  # ~120 KB
+
+        start = time.perf_counter()
+        segments = tokenize_inline(line)
+        elapsed = time.perf_counter() - start
+
+        assert "".join(text for text, _ in segments).count("items[i]") == 3000
+        assert elapsed < 1.0
+
+
+class TestFormattedText:
+    """Test runs created by MarkdownConverter._add_formatted_text"""
+
+    def test_runs(self):
+        converter = MarkdownConverter()
+        converter.doc = Document()
+
+        converter._add_paragraph("See **`main()`** in [the *guide*](x)")
+
+        runs = converter.doc.paragraphs[0].runs
+        assert [run.text for run in runs] == ["See ", "main()", " in ", "the ", "guide"]
+        assert runs[1].bold and runs[1].font.name == "Consolas"
+        assert runs[4].italic and runs[4].underline
+
+
+class TestFormulaDocument:
+    """Test that Markdown formatting leaves formulas for the LaTeX converter"""
+
+    def test_display_formulas_numbered(self, monkeypatch):
+        """Both display formulas of a Markdown file are converted and numbered"""
+        monkeypatch.setattr(settings, "FORMULA_CACHE_ENABLED", False)
+        monkeypatch.setattr(settings, "RESULT_CACHE_ENABLED", False)
+        document_id = "inline-formulas-test.md"
+        upload = settings.UPLOAD_DIR / document_id
+        upload.write_text(FORMULA_MD, encoding="utf-8")
+        processor = DocumentProcessor()
+        # The formula rules of the academic preset, independent of the registry
+        monkeypatch.setattr(
+            processor.rule_parser,
+            "get_preset_plan",
+            lambda _: [(LatexToOmmlRule(), {}), (FormulaNumberingRule(), {})],
+        )
+        try:
+            result = processor.process(document_id, "academic")
+        finally:
+            upload.unlink()
+            for suffix in ("_fixed.docx", "_result.json"):
+                (settings.OUTPUT_DIR / f"{document_id}{suffix}").unlink(missing_ok=True)
+
+        rule_ids = [fix["rule_id"] for fix in result["fixes"]]
+        assert rule_ids.count("formula_numbering") == 2
+        assert rule_ids.count("latex_to_omml") == 6
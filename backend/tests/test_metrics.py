@@ -0,0 +1,126 @@
+"""
+Processing Metrics Tests for Md2Docx
+Run with: pytest backend/tests/test_metrics.py -v
+"""
+
+import pytest
+
+from backend.core.metrics import ProcessingMetrics, count, hit_rates, rule_counters
+
+
+def make_run(duration_ms=20.0, fixes=3):
+    return {
+        "stages": {"load": 5.0, "rules": duration_ms, "save": 2.0},
+        "rules": [
+            {
+                "rule_id": "font_standard",
+                "duration_ms": duration_ms,
+                "paragraphs": 10,
+                "runs": 40,
+                "tables": 0,
+                "fixes": fixes,
+                "error": None,
+            },
+            {
+                "rule_id": "page_layout",
+                "duration_ms": 1.0,
+                "paragraphs": None,
+                "runs": None,
+                "tables": None,
+                "fixes": 1,
+                "error": "boom",
+            },
+        ],
+    }
+
+
+class TestProcessingMetrics:
+    """Test metric aggregation and Prometheus rendering"""
+
+    def test_aggregates_runs(self):
+        """Runs are summed into counters and bucketed into histograms"""
+        metrics = ProcessingMetrics()
+        metrics.observe_run(make_run(20.0))
+        metrics.observe_run(make_run(200.0))
+
+        lines = metrics.render().splitlines()
+
+        assert "md2docx_documents_processed_total 2" in lines
+        assert 'md2docx_rule_runs_visited_total{rule="font_standard"} 80' in lines
+        assert 'md2docx_rule_fixes_total{rule="font_standard"} 6' in lines
+        assert 'md2docx_rule_errors_total{rule="page_layout"} 2' in lines
+        assert (
+            'md2docx_rule_duration_seconds_bucket{rule="font_standard",le="0.025"} 1'
+            in lines
+        )
+        assert (
+            'md2docx_rule_duration_seconds_bucket{rule="font_standard",le="+Inf"} 2'
+            in lines
+        )
+        assert 'md2docx_stage_duration_seconds_count{stage="save"} 2' in lines
+        # Legacy rules have no visit counters
+        assert not any(
+            'runs_visited_total{rule="page_layout"}' in line for line in lines
+        )
+
+    def test_forwarded_runs_merge_into_parent(self):
+        """Worker processes buffer runs until the parent merges them"""
+        worker = ProcessingMetrics()
+        worker.forward_to_parent()
+        worker.observe_run(make_run())
+
+        parent = ProcessingMetrics()
+        parent.merge(worker.drain())
+
+        assert worker.drain() == []
+        assert "md2docx_documents_processed_total 0" not in parent.render()
+        assert "md2docx_documents_processed_total 1" in parent.render()
+
+    def test_result_cache_lookups(self):
+        """Result cache outcomes of runs (also forwarded ones) are counters"""
+        metrics = ProcessingMetrics()
+        for outcome in ("hit", "hit", "miss", None):
+            metrics.observe_run({**make_run(), "result_cache": outcome})
+
+        text = metrics.render()
+        assert "# TYPE md2docx_result_cache_lookups_total counter" in text
+        assert 'md2docx_result_cache_lookups_total{result="hit"} 2\n' in text
+        assert 'md2docx_result_cache_lookups_total{result="miss"} 1\n' in text
+
+    def test_render_gauges(self):
+        """Extra gauges are appended with HELP/TYPE lines"""
+        text = ProcessingMetrics().render({"md2docx_queue": ("Depth.", 3)})
+
+        assert "# TYPE md2docx_queue gauge\nmd2docx_queue 3\n" in text
+
+
+class TestRuleCounters:
+    """Test counters reported from inside rules"""
+
+    def test_collects_innermost_block(self):
+        """count() adds to the innermost rule_counters() block only"""
+        count("ignored")
+        with rule_counters() as outer:
+            count("memo_hits", 2)
+            with rule_counters() as inner:
+                count("memo_misses")
+            count("memo_hits")
+
+        assert outer == {"memo_hits": 3}
+        assert inner == {"memo_misses": 1}
+        assert hit_rates({"memo_hits": 3, "memo_misses": 1, "x": 5}) == {"memo": 0.75}
+
+    def test_counters_are_exported(self):
+        run = make_run()
+        run["rules"][1]["counters"] = {"formula_memo_hits": 7}
+        metrics = ProcessingMetrics()
+        metrics.observe_run(run)
+
+        assert (
+            'md2docx_rule_events_total{event="formula_memo_hits",rule="page_layout"} 7'
+            in metrics.render().splitlines()
+        )
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
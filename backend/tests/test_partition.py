@@ -0,0 +1,175 @@
+"""
+Partitioned Processing Tests for Md2Docx
+Run with: pytest backend/tests/test_partition.py -v
+"""
+
+import copy
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from docx import Document
+from docx.shared import Inches, Pt
+
+from backend.core import executor
+from backend.core.config import settings
+from backend.core.partition import DocumentPartitioner, partition_bounds, split_group
+from backend.core.processor import DocumentProcessor
+from backend.engine.fixes import Fix, fix_to_dict, merge_fixes
+from backend.engine.rules.font import FontColorRule, FontStandardRule
+from backend.engine.rules.list import ListNumberingRule
+from backend.engine.rules.paragraph import (
+    FirstLineIndentRule,
+    HeadingStyleRule,
+    ParagraphSpacingRule,
+    TitleBoldRule,
+)
+from backend.engine.rules.table import (
+    TableBorderRule,
+    TableColumnWidthRule,
+    TableWidthRule,
+)
+
+RULES = [
+    FontStandardRule,
+    TableBorderRule,
+    TableWidthRule,
+    TableColumnWidthRule,
+    ParagraphSpacingRule,
+    ListNumberingRule,
+    TitleBoldRule,
+    FontColorRule,
+    FirstLineIndentRule,
+    HeadingStyleRule,
+]
+
+
+def make_document():
+    doc = Document()
+    for i in range(60):
+        if i % 10 == 0:
+            doc.add_heading(f"Section {i}", level=1 + i % 3)
+        para = doc.add_paragraph(f"Paragraph {i} ")
+        run = para.add_run("text")
+        run.font.name = "Times New Roman" if i % 2 else None
+        run.font.size = Pt(10 + i % 3)
+        if i % 15 == 7:
+            table = doc.add_table(rows=2, cols=2)
+            table.cell(0, 0).text = f"Table {i}"
+        if i % 20 == 5:
+            doc.add_paragraph("Item", style="List Bullet")
+    doc.sections[0].left_margin = Inches(1)
+    return doc
+
+
+def plan():
+    return [(rule_cls(), {}) for rule_cls in RULES]
+
+
+def run_rules(doc, partitioner=None):
+    fixes = DocumentProcessor()._execute_rules(
+        doc, plan(), False, None, partitioner=partitioner
+    )
+    return [fix_to_dict(fix) for fix in fixes]
+
+
+class TestPartitioning:
+    """Test running partition-safe rules over body partitions"""
+
+    def test_matches_sequential_run(self):
+        """Spliced output and merged fixes equal a whole-document run"""
+        expected_doc = make_document()
+        actual_doc = copy.deepcopy(expected_doc)
+        expected = run_rules(expected_doc)
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            partitioner = DocumentPartitioner(actual_doc, pool, partitions=3)
+            try:
+                actual = run_rules(actual_doc, partitioner)
+            finally:
+                partitioner.close()
+
+        assert partitioner.groups == 3
+        assert actual == expected
+        assert actual_doc.element.xml == expected_doc.element.xml
+
+    def test_falls_back_when_pool_fails(self):
+        """A failing pool restores the body and runs the rules in-process"""
+
+        class FailingPool(ThreadPoolExecutor):
+            def submit(self, *args, **kwargs):
+                raise RuntimeError("pool is gone")
+
+        expected_doc = make_document()
+        actual_doc = copy.deepcopy(expected_doc)
+        expected = run_rules(expected_doc)
+
+        with FailingPool(max_workers=1) as pool:
+            partitioner = DocumentPartitioner(actual_doc, pool, partitions=2)
+            actual = run_rules(actual_doc, partitioner)
+            partitioner.close()
+
+        assert partitioner.executor is None
+        assert actual == expected
+        assert actual_doc.element.xml == expected_doc.element.xml
+
+    def test_not_nested_in_pool_workers(self, monkeypatch):
+        """Jobs running in a pool worker do not start a partition pool"""
+        monkeypatch.setattr(settings, "PARTITION_MIN_BLOCKS", 1)
+        monkeypatch.setattr(settings, "PARTITION_MAX_WORKERS", 2)
+        monkeypatch.setattr(
+            "backend.core.partition.get_partition_executor", lambda: None
+        )
+        doc = make_document()
+
+        assert DocumentPartitioner.create(doc, plan()) is not None
+        monkeypatch.setattr(executor, "_in_pool_worker", True)
+        assert DocumentPartitioner.create(doc, plan()) is None
+
+    def test_split_group(self):
+        """Style mode and table_width are not partition-safe"""
+        group = [
+            (FontStandardRule(), {"mode": "style"}),
+            (TableBorderRule(), {}),
+            (TableWidthRule(), {}),
+            (ParagraphSpacingRule(), {}),
+        ]
+
+        runs = split_group(group)
+
+        assert [(safe, [r.id for r, _ in rules]) for safe, rules in runs] == [
+            (False, ["font_standard"]),
+            (True, ["table_border"]),
+            (False, ["table_width"]),
+            (True, ["paragraph_spacing"]),
+        ]
+
+    @pytest.mark.parametrize(
+        "count,partitions,expected",
+        [(10, 3, [(0, 4), (4, 7), (7, 10)]), (2, 4, [(0, 1), (1, 2)])],
+    )
+    def test_partition_bounds(self, count, partitions, expected):
+        assert partition_bounds(count, partitions) == expected
+
+    def test_merge_fixes(self):
+        """Records sharing an id across partitions merge ranges and counts"""
+
+        def spacing(indices):
+            return Fix(
+                id="fix_spacing_all",
+                rule_id="paragraph_spacing",
+                description="spacing",
+                paragraphs=indices,
+                location={"type": "paragraph_spacing", "affected_count": len(indices)},
+            )
+
+        merged = merge_fixes(
+            [[spacing([0, 1])], [spacing([2, 5])], [Fix("fix_x_7", "x", "x", 7)]]
+        )
+
+        assert [fix["id"] for fix in merged] == ["fix_spacing_all", "fix_x_7"]
+        assert merged[0]["paragraph_ranges"] == [[0, 3], [5, 6]]
+        assert merged[0]["location"]["affected_count"] == 4
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,113 @@
+"""
+Streaming Processing Tests for Md2Docx
+Run with: pytest backend/tests/test_streaming.py -v
+"""
+
+import zipfile
+
+import pytest
+from docx import Document
+from docx.shared import Pt
+
+from backend.core.config import settings
+from backend.core.docx_package import open_document, save_document
+from backend.core.processor import DocumentProcessor
+from backend.core.streaming import can_stream, stream_document
+from backend.engine.fixes import fix_to_dict
+from backend.engine.rules.font import FontColorRule, FontStandardRule
+from backend.engine.rules.paragraph import (
+    FirstLineIndentRule,
+    HeadingStyleRule,
+    ParagraphSpacingRule,
+    TitleBoldRule,
+)
+from backend.engine.rules.table import (
+    TableBorderRule,
+    TableColumnWidthRule,
+    TableWidthRule,
+)
+
+RULES = [
+    FontStandardRule,
+    TableBorderRule,
+    ParagraphSpacingRule,
+    TitleBoldRule,
+    FontColorRule,
+    FirstLineIndentRule,
+    HeadingStyleRule,
+    TableColumnWidthRule,
+]
+
+
+def plan():
+    return [(rule_cls(), {}) for rule_cls in RULES]
+
+
+@pytest.fixture
+def source(tmp_path):
+    doc = Document()
+    for i in range(40):
+        if i % 10 == 0:
+            doc.add_heading(f"第 {i} 节", level=1 + i % 3)
+        para = doc.add_paragraph(f"Paragraph {i} & <text> ")
+        run = para.add_run("文本")
+        run.font.name = "Arial" if i % 2 else None
+        run.font.size = Pt(10 + i % 3)
+        if i % 15 == 7:
+            doc.add_table(rows=2, cols=2).cell(0, 0).text = f"Table {i}"
+    path = tmp_path / "source.docx"
+    doc.save(path)
+    return path
+
+
+class TestStreaming:
+    """Test rule execution while streaming word/document.xml"""
+
+    def test_matches_in_memory_run(self, source, tmp_path):
+        """Streamed output and fixes equal a fully loaded run"""
+        contexts, stats = stream_document(source, tmp_path / "streamed.docx", plan())
+
+        doc = open_document(source)
+        expected = DocumentProcessor()._execute_rules(doc, plan(), False, None)
+        save_document(doc, tmp_path / "loaded.docx", source_path=source)
+
+        assert all(ctx.error is None for ctx in contexts)
+        assert [fix_to_dict(fix) for ctx in contexts for fix in ctx.fixes] == [
+            fix_to_dict(fix) for fix in expected
+        ]
+        assert stats["blocks"] == len(doc.element.body)
+        with zipfile.ZipFile(tmp_path / "streamed.docx") as streamed, zipfile.ZipFile(
+            tmp_path / "loaded.docx"
+        ) as loaded:
+            assert streamed.namelist() == loaded.namelist()
+            for name in loaded.namelist():
+                assert streamed.read(name) == loaded.read(name), name
+
+    def test_can_stream(self):
+        """Style mode and rules reading the whole document are not streamed"""
+        assert can_stream(plan())
+        assert not can_stream([])
+        assert not can_stream([(FontStandardRule(), {"mode": "style"})])
+        assert not can_stream(plan() + [(TableWidthRule(), {})])
+
+    def test_processor_streams_large_documents(self, source, monkeypatch):
+        """Documents above STREAMING_MIN_BYTES are streamed by the processor"""
+        document_id = "streaming-test.docx"
+        upload = settings.UPLOAD_DIR / document_id
+        upload.write_bytes(source.read_bytes())
+        monkeypatch.setattr(settings, "STREAMING_MIN_BYTES", 0)
+        processor = DocumentProcessor()
+        monkeypatch.setattr(processor.rule_parser, "get_preset_plan", lambda _: plan())
+        try:
+            result = processor.process(document_id, "custom", metrics=True)
+        finally:
+            upload.unlink()
+            for suffix in ("_fixed.docx", "_result.json"):
+                (settings.OUTPUT_DIR / f"{document_id}{suffix}").unlink(missing_ok=True)
+
+        assert "stream" in result["metrics"]["stages"]
+        assert result["total_fixes"] > 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -23,6 +23,9 @@ interface FixItem {
   id: string;
   rule_id: string;
   description: string;
+  // 半开区间 [start, stop) 列表；paragraph_indices/table_indices 为旧格式
+  paragraph_ranges?: number[][];
+  table_ranges?: number[][];
   paragraph_indices?: number[];
   table_indices?: number[];
   before?: string | null;
@@ -38,6 +41,16 @@ interface ProcessResult {
   duration_ms: number;
 }
 
+/** 将区间 (或旧格式的下标列表) 格式化为 "0-11, 15" */
+function formatIndices(ranges?: number[][], indices?: number[]): string {
+  if (ranges) {
+    return ranges
+      .map(([start, stop]) => (stop - start > 1 ? `${start}-${stop - 1}` : `${start}`))
+      .join(', ');
+  }
+  return indices?.join(', ') || '';
+}
+
 export default function ComparisonPreview() {
   const { t } = useTranslation();
   const navigate = useNavigate();
@@ -788,22 +801,22 @@ export default function ComparisonPreview() {
                 </div>
               </div>
 
-              {(selectedFix.paragraph_indices?.length || 0) > 0 && (
+              {formatIndices(selectedFix.paragraph_ranges, selectedFix.paragraph_indices) && (
                 <div>
                   <div className="mb-1 text-xs text-gray-400">
                     {t('comparison.paragraphIndices')}
                   </div>
                   <div className="rounded border border-[#2a2d3e] bg-[#1a1d2e] px-3 py-2 text-sm text-gray-200">
-                    {selectedFix.paragraph_indices?.join(', ')}
+                    {formatIndices(selectedFix.paragraph_ranges, selectedFix.paragraph_indices)}
                   </div>
                 </div>
               )}
 
-              {(selectedFix.table_indices?.length || 0) > 0 && (
+              {formatIndices(selectedFix.table_ranges, selectedFix.table_indices) && (
                 <div>
                   <div className="mb-1 text-xs text-gray-400">{t('comparison.tableIndices')}</div>
                   <div className="rounded border border-[#2a2d3e] bg-[#1a1d2e] px-3 py-2 text-sm text-gray-200">
-                    {selectedFix.table_indices?.join(', ')}
+                    {formatIndices(selectedFix.table_ranges, selectedFix.table_indices)}
                   </div>
                 </div>
               )}
@@ -29,6 +29,7 @@ export interface ProcessRequest {
   preset: string;
   strict?: boolean;
   verbose?: boolean;
+  fix_summary?: boolean;
 }
 
 export const documentApi = {
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""
+Benchmark the LaTeX -> OMML conversion backends.
+
+Converts a set of formulas with the native OMML builder (build_omml) and
+with the MathML path (latex2mathml + XSLT), without any caching, and
+reports the time per formula of each. Formulas the native builder cannot
+compile are marked; in production they fall back to the MathML path.
+
+Usage:
+    python scripts/bench_formula_backend.py
+    python scripts/bench_formula_backend.py --repeat 2000
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.core.latex_converter import (  # noqa: E402
+    LaTeXConverter,
+    LatexSyntaxError,
+    build_omml,
+)
+
+FORMULAS = [
+    r"x^2",
+    r"E=mc^2",
+    r"a_{ij} + b_{ij}",
+    r"\frac{a+b}{c-d}",
+    r"\sqrt[3]{x^2 + y^2}",
+    r"e^{i\pi} + 1 = 0",
+    r"\sum_{i=1}^{n} i^2 = \frac{n(n+1)(2n+1)}{6}",
+    r"\int_0^\infty e^{-x^2}\,dx = \frac{\sqrt{\pi}}{2}",
+    r"\lim_{x \to 0} \frac{\sin x}{x} = 1",
+    r"\left( \frac{\partial f}{\partial x} \right)^2",
+    r"\begin{pmatrix} a & b \\ c & d \end{pmatrix}",
+    r"f(x) = \begin{cases} x & x \geq 0 \\ -x & \text{otherwise} \end{cases}",
+    r"\hat{\theta} = \bar{x} \pm \vec{v}",
+    r"\mathbb{R}^n \to \mathcal{L}(X)",
+    r"\binom{n}{k} p^k (1-p)^{n-k}",
+    r"\overset{!}{=}",
+]
+
+
+def per_formula(convert, latex: str, repeat: int) -> float:
+    """Seconds per conversion."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        convert(latex)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    converter = LaTeXConverter()
+
+    def mathml(latex):
+        return converter.mathml_to_omml(converter.latex_to_mathml(latex))
+
+    native_total = mathml_total = 0.0
+    print(f"{'native':>10} {'mathml':>10} {'speedup':>8}  formula")
+    for latex in FORMULAS:
+        # latex2mathml reports errors on stdout
+        with contextlib.redirect_stdout(io.StringIO()):
+            mathml_time = per_formula(mathml, latex, args.repeat)
+        mathml_total += mathml_time
+        try:
+            native_time = per_formula(build_omml, latex, args.repeat)
+        except LatexSyntaxError:
+            print(f"{'fallback':>10} {mathml_time * 1e6:8.1f}us {'':>8}  {latex}")
+            native_total += mathml_time
+            continue
+        native_total += native_time
+        print(
+            f"{native_time * 1e6:8.1f}us {mathml_time * 1e6:8.1f}us "
+            f"{mathml_time / native_time:7.1f}x  {latex}"
+        )
+    print(
+        f"{native_total * 1e6:8.1f}us {mathml_total * 1e6:8.1f}us "
+        f"{mathml_total / native_total:7.1f}x  total (fallbacks at MathML cost)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
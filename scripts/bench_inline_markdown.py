@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""
+Benchmark the inline Markdown tokenizer on long paragraphs.
+
+Tokenizes paragraphs of increasing size full of bold, italic, code, links and
+escapes with backend.core.markdown_inline.tokenize_inline, and with the
+previous search-and-slice loop of MarkdownConverter._add_formatted_text for
+comparison (only up to --legacy-max-kb: on unclosed brackets it is worse
+than quadratic). The time per KB of the tokenizer must stay flat (linear
+scaling); the script exits with status 1 if the largest paragraph costs more
+than --max-ratio times as much per KB as the smallest.
+
+Usage:
+    python scripts/bench_inline_markdown.py
+    python scripts/bench_inline_markdown.py --sizes 1 10 100 1000 --legacy-max-kb 0
+"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.core.markdown_inline import tokenize_inline  # noqa: E402
+
+SAMPLES = {
+    "mixed": (
+        "Call **`render()`** with *options* and see [the **API** docs](https://x/y). "
+        "Escaped \\*stars\\* stay, ***important*** notes, plain text in between. "
+    ),
+    # Brackets that never form a link: every legacy iteration rescans the rest
+    "brackets": "Read items[i] and **map[key]** with `get(k)`, then *retry*. ",
+}
+
+_LEGACY_PATTERNS = [
+    (r"\*\*\*(.+?)\*\*\*", "bold_italic"),
+    (r"\*\*(.+?)\*\*", "bold"),
+    (r"\*(.+?)\*", "italic"),
+    (r"`(.+?)`", "code"),
+    (r"\[(.+?)\]\((.+?)\)", "link"),
+]
+
+
+def legacy_segments(text: str) -> list:
+    """The loop _add_formatted_text used before, without creating runs."""
+    segments = []
+    remaining = text
+    while remaining:
+        earliest_match = None
+        earliest_type = None
+        earliest_pos = len(remaining)
+        for pattern, fmt_type in _LEGACY_PATTERNS:
+            match = re.search(pattern, remaining)
+            if match and match.start() < earliest_pos:
+                earliest_match = match
+                earliest_type = fmt_type
+                earliest_pos = match.start()
+        if earliest_match is None:
+            segments.append((remaining, None))
+            break
+        if earliest_pos > 0:
+            segments.append((remaining[:earliest_pos], None))
+        segments.append((earliest_match.group(1), earliest_type))
+        remaining = remaining[earliest_match.end() :]
+    return segments
+
+
+def best_time(func, text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1, 10, 25, 50, 100], help="KB"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-ratio", type=float, default=2.0)
+    parser.add_argument(
+        "--legacy-max-kb",
+        type=int,
+        default=10,
+        help="largest size to run the legacy loop on (0 to skip it)",
+    )
+    args = parser.parse_args()
+
+    status = 0
+    for name, sample in SAMPLES.items():
+        print(f"\n{name}")
+        print(f"{'size':>8} {'tokenizer':>12} {'per KB':>10} {'legacy':>12}")
+        per_kb = []
+        for size in args.sizes:
+            text = (sample * (size * 1024 // len(sample) + 1))[: size * 1024]
+            elapsed = best_time(tokenize_inline, text, args.repeat)
+            per_kb.append(elapsed / size)
+            legacy = "-"
+            if size <= args.legacy_max_kb:
+                legacy = f"{best_time(legacy_segments, text, 1) * 1000:9.1f} ms"
+            print(
+                f"{size:>6}KB {elapsed * 1000:9.2f} ms {per_kb[-1] * 1000:7.3f} ms "
+                f"{legacy:>12}"
+            )
+
+        ratio = per_kb[-1] / per_kb[0]
+        print(f"per-KB cost, largest / smallest: {ratio:.2f}")
+        if ratio > args.max_ratio:
+            print("NOT LINEAR: per-KB cost grows with the paragraph size")
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""
+Benchmark the Markdown conversion backends.
+
+Generates a Markdown file with headings, formatted paragraphs, lists, quotes,
+code blocks and tables, converts it with the python-docx backend
+(MarkdownConverter) and the direct OOXML backend (OoxmlMarkdownConverter),
+and checks that both produce the same document XML.
+
+Usage:
+    python scripts/bench_markdown_backend.py
+    python scripts/bench_markdown_backend.py --size-kb 512
+    python scripts/bench_markdown_backend.py --ooxml-only
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.core.markdown_converter import (  # noqa: E402
+    MarkdownConverter,
+    OoxmlMarkdownConverter,
+)
+
+BLOCKS = [
+    "## Section {i} with **bold** and `code`\n",
+    "- item *{i}* with [a link](https://example.com/{i})\n- second **item**\n",
+    "1. first {i}\n2. second\n",
+    "> quoted paragraph {i}\n",
+    "```python\ndef f(x):\n    return x * {i}\n```\n",
+    "| Name | Value | Note |\n|---|---|---|\n| a | {i} | x |\n| b | 2 | y |\n",
+    "Paragraph {i}: call **`render()`** with *options*, read items[i] and see "
+    "[the **API** docs](https://example.com), \\*escaped\\* and ***key*** text.\n",
+    "Plain paragraph {i} without any inline formatting at all, just words.\n",
+]
+
+
+def generate(path: Path, size_kb: int):
+    size = 0
+    i = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while size < size_kb * 1024:
+            block = BLOCKS[i % len(BLOCKS)].format(i=i) + "\n"
+            f.write(block)
+            size += len(block)
+            i += 1
+
+
+def convert(converter_cls, path: Path):
+    converter = converter_cls()
+    start = time.perf_counter()
+    converter.convert(path)
+    return time.perf_counter() - start, converter.doc.element.xml
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-kb", type=int, default=10 * 1024)
+    parser.add_argument(
+        "--ooxml-only",
+        action="store_true",
+        help="skip the python-docx backend (quadratic in the paragraph count)",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.md"
+        generate(path, args.size_kb)
+        print(f"Markdown: {path.stat().st_size / 1024:.0f} KB")
+        ooxml, ooxml_xml = convert(OoxmlMarkdownConverter, path)
+        print(f"ooxml:  {ooxml:8.2f} s")
+        if args.ooxml_only:
+            return 0
+        python_docx, docx_xml = convert(MarkdownConverter, path)
+        print(f"docx:   {python_docx:8.2f} s")
+
+    if ooxml_xml != docx_xml:
+        print("MISMATCH: the backends produced different document XML")
+        return 1
+    print(f"speedup: {python_docx / ooxml:7.1f}x  (identical XML)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+Benchmark streaming Markdown conversion against in-memory conversion.
+
+Generates a Markdown file (see bench_markdown_backend.py) and converts it to
+.docx in a fresh process with StreamingMarkdownConverter and with
+OoxmlMarkdownConverter, reporting the time and peak memory (RSS) of each.
+The streamed peak should stay flat as --size-mb grows.
+
+Usage:
+    python scripts/bench_markdown_streaming.py
+    python scripts/bench_markdown_streaming.py --size-mb 200 --streaming-only
+"""
+
+import argparse
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.core.markdown_converter import (  # noqa: E402
+    OoxmlMarkdownConverter,
+    StreamingMarkdownConverter,
+)
+from scripts.bench_markdown_backend import generate  # noqa: E402
+
+CONVERTERS = {
+    "streaming": StreamingMarkdownConverter,
+    "in-memory": OoxmlMarkdownConverter,
+}
+
+
+def run(name: str, markdown_path: Path, output_path: Path):
+    """Convert in this process and print "seconds peak_kb"."""
+    start = time.perf_counter()
+    CONVERTERS[name]().convert(markdown_path, output_path)
+    elapsed = time.perf_counter() - start
+    print(f"{elapsed} {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}")
+
+
+def measure(name: str, markdown_path: Path, output_path: Path):
+    """(seconds, peak RSS in MB) of a conversion in a fresh process."""
+    out = subprocess.run(
+        [sys.executable, __file__, "--run", name, str(markdown_path), str(output_path)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.split()
+    return float(out[0]), int(out[1]) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=int, default=32)
+    parser.add_argument("--streaming-only", action="store_true")
+    parser.add_argument("--run", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        name, markdown_path, output_path = args.run
+        run(name, Path(markdown_path), Path(output_path))
+        return 0
+
+    names = ["streaming"] if args.streaming_only else list(CONVERTERS)
+    with tempfile.TemporaryDirectory() as tmp:
+        markdown_path = Path(tmp) / "bench.md"
+        generate(markdown_path, args.size_mb * 1024)
+        print(f"Markdown: {markdown_path.stat().st_size / 2**20:.0f} MB")
+        for name in names:
+            output_path = Path(tmp) / f"{name}.docx"
+            elapsed, peak = measure(name, markdown_path, output_path)
+            size = output_path.stat().st_size / 2**20
+            print(
+                f"{name:>10}: {elapsed:8.2f} s  peak RSS {peak:8.1f} MB  "
+                f"(.docx {size:.1f} MB)"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
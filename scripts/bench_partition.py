@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+Benchmark partitioned rule execution on one large document.
+
+Builds a document with many paragraphs and tables, then runs the default
+rule plan of a preset once in-process and once partitioned over a process
+pool (see backend/core/partition.py). Both outputs are compared so the
+benchmark also checks that partitioning does not change the result.
+
+Usage:
+    python scripts/bench_partition.py
+    python scripts/bench_partition.py --paragraphs 100000 --workers 8
+"""
+
+import argparse
+import copy
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from docx import Document
+from docx.shared import Pt
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.core.executor import _init_worker  # noqa: E402
+from backend.core.partition import DocumentPartitioner  # noqa: E402
+from backend.core.processor import DocumentProcessor  # noqa: E402
+from backend.engine.fixes import fix_to_dict  # noqa: E402
+
+
+def build_document(paragraphs: int):
+    doc = Document()
+    fonts = [None, "Arial", "微软雅黑", "Times New Roman"]
+    for i in range(paragraphs):
+        if i % 50 == 0:
+            doc.add_heading(f"第 {i // 50 + 1} 节", level=1 + i // 50 % 3)
+        para = doc.add_paragraph()
+        for j in range(8):
+            run = para.add_run("文本 text ")
+            if j % 3:
+                run.font.name = fonts[(i + j) % len(fonts)]
+                run.font.size = Pt(10 + j % 3)
+        if i % 200 == 100:
+            table = doc.add_table(rows=4, cols=3)
+            for cell in table._cells:
+                cell.text = "cell"
+    return doc
+
+
+def run(doc, plan, partitioner=None):
+    start = time.perf_counter()
+    fixes = DocumentProcessor()._execute_rules(
+        doc, plan, False, None, partitioner=partitioner
+    )
+    return time.perf_counter() - start, [fix_to_dict(fix) for fix in fixes]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--paragraphs", type=int, default=20_000)
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--preset", default="academic")
+    args = parser.parse_args()
+
+    plan = DocumentProcessor().rule_parser.get_preset_plan(args.preset)
+    source = build_document(args.paragraphs)
+    print(f"Document: {len(source.element.body)} blocks, preset {args.preset!r}")
+
+    sequential_doc = copy.deepcopy(source)
+    sequential, expected = run(sequential_doc, plan)
+
+    pool = ProcessPoolExecutor(
+        max_workers=args.workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+    )
+    try:
+        # Start the workers before timing
+        list(pool.map(abs, range(args.workers)))
+        partitioned_doc = copy.deepcopy(source)
+        partitioner = DocumentPartitioner(partitioned_doc, pool, args.workers)
+        try:
+            partitioned, actual = run(partitioned_doc, plan, partitioner)
+        finally:
+            partitioner.close()
+    finally:
+        pool.shutdown()
+
+    if actual != expected or partitioned_doc.element.xml != sequential_doc.element.xml:
+        print("MISMATCH: partitioned output differs from the sequential run")
+        return 1
+    print(f"sequential:             {sequential * 1000:8.1f} ms")
+    print(f"partitioned ({args.workers} procs): {partitioned * 1000:8.1f} ms")
+    print(
+        f"speedup:                {sequential / partitioned:8.2f}x  (outputs identical)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+"""
+Benchmark the lxml rule kernels against python-docx proxy objects.
+
+Builds a document with ~50k runs, then runs the font, paragraph and heading
+rules once through the kernels (the shipped rules) and once through
+reference subclasses that use run.font.* / paragraph_format like the rules
+did before. Both outputs are compared so the benchmark also checks that the
+kernels produce identical XML and fix records.
+
+Usage:
+    python scripts/bench_rule_kernels.py
+    python scripts/bench_rule_kernels.py --runs 100000 --repeat 5
+"""
+
+import argparse
+import copy
+import sys
+import time
+from pathlib import Path
+
+from docx import Document
+from docx.oxml.ns import qn
+from docx.shared import Pt, RGBColor
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.engine.fixes import fix_to_dict  # noqa: E402
+from backend.engine.rules.font import (  # noqa: E402
+    FontColorRule,
+    FontReplacementRule,
+    FontStandardRule,
+)
+from backend.engine.rules.paragraph import (  # noqa: E402
+    HEADING_STYLES,
+    FirstLineIndentRule,
+    HeadingStyleRule,
+    ParagraphSpacingRule,
+    TitleBoldRule,
+)
+from backend.engine.traversal import run_traversal  # noqa: E402
+
+RUNS_PER_PARAGRAPH = 10
+
+
+# ===== Reference implementations on python-docx proxy objects =====
+
+
+class ProxyFontStandardRule(FontStandardRule):
+    def visit_run(self, run, para, index, ctx):
+        state = ctx.state
+        changed = False
+        if run.font.name != state["western_font"]:
+            run.font.name = state["western_font"]
+            changed = True
+        if run._element.rPr is not None:
+            rFonts = run._element.rPr.rFonts
+            if rFonts is not None:
+                rFonts.set(qn("w:eastAsia"), state["chinese_font"])
+        if run.font.size != Pt(state["font_size"]):
+            run.font.size = Pt(state["font_size"])
+            changed = True
+        if changed:
+            state["changed"].add(index)
+
+
+class ProxyFontColorRule(FontColorRule):
+    def visit_run(self, run, para, index, ctx):
+        color = ctx.state["color"]
+        if run.font.color.rgb != color:
+            run.font.color.rgb = color
+            ctx.state["affected"].add(index)
+
+
+class ProxyFontReplacementRule(FontReplacementRule):
+    def visit_run(self, run, para, index, ctx):
+        font_map = ctx.state["font_map"]
+        default_western_font = ctx.state["default_western_font"]
+        default_chinese_font = ctx.state["default_chinese_font"]
+
+        changed = False
+        if run.font.name:
+            current_font = run.font.name
+            if current_font in font_map:
+                new_font = font_map[current_font]
+                if run.font.name != new_font:
+                    run.font.name = new_font
+                    changed = True
+            elif run.font.name != default_western_font:
+                run.font.name = default_western_font
+                changed = True
+        else:
+            run.font.name = default_western_font
+            changed = True
+
+        if run._element.rPr is not None:
+            rFonts = run._element.rPr.rFonts
+            if rFonts is not None:
+                east_asia_font = rFonts.get(qn("w:eastAsia"))
+                if east_asia_font:
+                    if east_asia_font in font_map:
+                        new_font = font_map[east_asia_font]
+                        if rFonts.get(qn("w:eastAsia")) != new_font:
+                            rFonts.set(qn("w:eastAsia"), new_font)
+                            changed = True
+                    elif rFonts.get(qn("w:eastAsia")) != default_chinese_font:
+                        rFonts.set(qn("w:eastAsia"), default_chinese_font)
+                        changed = True
+                else:
+                    rFonts.set(qn("w:eastAsia"), default_chinese_font)
+                    changed = True
+
+        if changed:
+            ctx.state["affected"].add(index)
+
+
+class ProxyParagraphSpacingRule(ParagraphSpacingRule):
+    def visit_paragraph(self, para, index, ctx):
+        pf = para.paragraph_format
+        pf.line_spacing = ctx.state["line_spacing"]
+        pf.space_before = Pt(ctx.state["space_before"])
+        pf.space_after = Pt(ctx.state["space_after"])
+        ctx.state["affected"].add(index)
+
+
+class ProxyFirstLineIndentRule(FirstLineIndentRule):
+    def visit_paragraph(self, para, index, ctx):
+        if ctx.walk.style_name(para) in HEADING_STYLES or not para.text.strip():
+            return
+        pf = para.paragraph_format
+        if pf.first_line_indent != ctx.state["indent_pt"]:
+            pf.first_line_indent = ctx.state["indent_pt"]
+            ctx.state["affected"].add(index)
+
+
+class ProxyTitleBoldRule(TitleBoldRule):
+    def visit_paragraph(self, para, index, ctx):
+        if ctx.walk.style_name(para) not in HEADING_STYLES:
+            return
+        changed = False
+        for run in para.runs:
+            if not run.bold:
+                run.bold = True
+                changed = True
+        if changed:
+            ctx.fixes.append({"id": f"fix_title_bold_{index}"})
+
+
+class ProxyHeadingStyleRule(HeadingStyleRule):
+    def visit_paragraph(self, para, index, ctx):
+        style_name = ctx.walk.style_name(para)
+        if style_name not in ctx.state["size_map"]:
+            return
+        target_size = ctx.state["size_map"][style_name]
+        changed = False
+        for run in para.runs:
+            if run.font.size != Pt(target_size):
+                run.font.size = Pt(target_size)
+                run.bold = True
+                changed = True
+        if changed:
+            ctx.fixes.append({"id": f"fix_heading_{index}"})
+
+
+KERNEL_RULES = [
+    FontStandardRule(),
+    ParagraphSpacingRule(),
+    TitleBoldRule(),
+    FontColorRule(),
+    FontReplacementRule(),
+    FirstLineIndentRule(),
+    HeadingStyleRule(),
+]
+PROXY_RULES = [
+    ProxyFontStandardRule(),
+    ProxyParagraphSpacingRule(),
+    ProxyTitleBoldRule(),
+    ProxyFontColorRule(),
+    ProxyFontReplacementRule(),
+    ProxyFirstLineIndentRule(),
+    ProxyHeadingStyleRule(),
+]
+
+
+def build_document(total_runs: int):
+    """Paragraphs of RUNS_PER_PARAGRAPH runs with mixed existing formatting"""
+    doc = Document()
+    fonts = [None, "Arial", "微软雅黑", "Times New Roman"]
+    for i in range(max(1, total_runs // RUNS_PER_PARAGRAPH)):
+        style = ("Heading 1", "Heading 2", "Title")[i % 3] if i % 20 == 0 else None
+        para = doc.add_paragraph(style=style)
+        if i % 7 == 0:
+            para.paragraph_format.first_line_indent = Pt(-12)
+        for j in range(RUNS_PER_PARAGRAPH):
+            run = para.add_run("文本 text " if (i + j) % 5 else "　")
+            if j % 4:
+                run.font.name = fonts[j % len(fonts)]
+            if j % 3 == 0:
+                run.font.size = Pt(12 if j % 2 else 10.5)
+            if j % 5 == 1:
+                run.font.color.rgb = RGBColor(0xFF, 0, 0)
+            if j % 6 == 2:
+                run.bold = False
+    return doc
+
+
+def run_rules(doc, rules):
+    plan = [(rule, rule.get_default_params()) for rule in rules]
+    start = time.perf_counter()
+    contexts = run_traversal(doc, plan)
+    elapsed = time.perf_counter() - start
+    for ctx in contexts:
+        if ctx.error is not None:
+            raise ctx.error
+    return elapsed, contexts
+
+
+def fix_ids(contexts):
+    return [[fix_to_dict(fix)["id"] for fix in ctx.fixes] for ctx in contexts]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    source = build_document(args.runs)
+    body = source.element.body
+    print(f"Document: {len(body.findall(qn('w:p')))} paragraphs, {args.runs} runs")
+
+    timings = {"proxy": [], "kernel": []}
+    for _ in range(args.repeat):
+        results = {}
+        for label, rules in (("proxy", PROXY_RULES), ("kernel", KERNEL_RULES)):
+            doc = Document()
+            doc.element.replace(doc.element.body, copy.deepcopy(body))
+            elapsed, contexts = run_rules(doc, rules)
+            timings[label].append(elapsed)
+            results[label] = (doc.element.xml, fix_ids(contexts))
+        if results["proxy"] != results["kernel"]:
+            print("MISMATCH: kernel output differs from the proxy reference")
+            return 1
+
+    proxy, kernel = min(timings["proxy"]), min(timings["kernel"])
+    print(f"python-docx proxies: {proxy * 1000:8.1f} ms")
+    print(f"lxml kernels:        {kernel * 1000:8.1f} ms")
+    print(f"speedup:             {proxy / kernel:8.2f}x  (outputs identical)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())